@@ -0,0 +1,282 @@
+"""Benchmark the runner's own hot paths on a synthetic test tree.
+
+Generates a tree of test modules (10k tests by default) with deep fixture
+chains, a large parametrize grid and heavy mock usage, then times each stage
+of the runner: discovery, collection, running, fixture setup, output capture,
+case expansion, mocks and the ``sys.modules`` diff. Every stage is repeated
+and reported with its median time, the memory it left allocated and how much it
+raised the peak memory of the process.
+
+Usage::
+
+    ipy benchmarks/bench_runner.py --json before.json
+    ipy benchmarks/bench_runner.py --compare before.json
+
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import types
+from timeit import default_timer as timer
+
+import pytest
+from pytest.benchmark import compare
+from pytest.benchmark import compute_stats
+from pytest.benchmark import format_time
+from pytest.benchmark import load_baseline
+from pytest.benchmark import save_benchmarks
+from pytest.fixtures import FIXTURE_SCOPES
+from pytest.fixtures import build_kwargs
+from pytest.fixtures import fixture_lookup
+from pytest.fixtures import load_conftest
+from pytest.fixtures import load_module
+from pytest.fixtures import resolve_fixtures
+from pytest.mock import Mock
+from pytest.mock import patch
+from pytest.test_runner import ModuleRetention
+from pytest.test_runner import capture
+from pytest.test_runner import collect_test_module
+from pytest.test_runner import discover_tests
+from pytest.test_runner import parametrized_cases
+from pytest.test_runner import run_test_module
+
+CONFTEST = '''
+import pytest
+
+@pytest.fixture
+def fixture_0():
+    return 0
+{chain}
+'''
+
+CHAINED_FIXTURE = '''
+@pytest.fixture
+def fixture_{index}(fixture_{previous}):
+    return fixture_{previous} + 1
+'''
+
+TEST_MODULE = '''
+import pytest
+
+
+@pytest.mark.parametrize('value', range({cases}))
+def test_parametrized(value, fixture_{depth}):
+    assert fixture_{depth} == {depth}
+
+
+def test_mock(mocker):
+    mocked = mocker.Mock(return_value=1)
+    for _ in range(20):
+        mocked.child.method(1)
+    assert mocked.child.method.call_count == 20
+{plain_tests}
+'''
+
+PLAIN_TEST = '''
+def test_plain_{index}():
+    print('output of test {index}')
+'''
+
+
+def memory_usage():
+    """Current and peak memory of the process in bytes, either is ``None`` if it cannot be measured here."""
+    if sys.platform == 'cli':
+        import System
+        process = System.Diagnostics.Process.GetCurrentProcess()
+        return process.WorkingSet64, process.PeakWorkingSet64
+    current = None
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return current, None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return current, peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _growth(before, after):
+    return after - before if before is not None and after is not None else None
+
+
+def _format_memory(size):
+    return '{:+.1f}MB'.format(size / 1e6) if size is not None else 'n/a'
+
+
+def generate_tree(root, tests, depth, tests_per_module=20, modules_per_directory=25):
+    """Write conftest.py with a fixture chain of ``depth`` and test modules with ``tests`` tests in total."""
+    chain = ''.join(CHAINED_FIXTURE.format(index=index, previous=index - 1) for index in range(1, depth + 1))
+    with open(os.path.join(root, 'conftest.py'), 'w') as f:
+        f.write(CONFTEST.format(chain=chain))
+
+    cases = tests_per_module // 2
+    plain_tests = tests_per_module - cases - 1
+    for module_index in range(max(1, tests // tests_per_module)):
+        directory = os.path.join(root, 'package_{}'.format(module_index // modules_per_directory))
+        if not os.path.isdir(directory):
+            os.mkdir(directory)
+        content = TEST_MODULE.format(cases=cases, depth=depth,
+                                     plain_tests=''.join(PLAIN_TEST.format(index=index) for index in range(plain_tests)))
+        with open(os.path.join(directory, 'test_module_{}.py'.format(module_index)), 'w') as f:
+            f.write(content)
+
+
+class Stages(object):
+    """Runs stages of the benchmark and records their statistics."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = dict()
+        self.memory = dict()
+
+    def measure(self, name, func, iterations=1):
+        # The memory of the process is shared by all stages, only what changed during this one is its own
+        current, peak = memory_usage()
+        durations = []
+        for _ in range(self.repeat):
+            start = timer()
+            func()
+            durations.append(timer() - start)
+        self.results[name] = compute_stats(durations, iterations)
+        current_after, peak_after = memory_usage()
+        self.memory[name] = _growth(current, current_after), _growth(peak, peak_after)
+        print('{:<14} {:>10} per {}'.format(name, format_time(self.results[name]['median']), 'call' if iterations > 1 else 'run'))
+
+
+def run_benchmarks(root, args):
+    stages = Stages(args.repeat)
+    conftest = os.path.join(root, 'conftest.py')
+    test_modules = []
+
+    def discover():
+        del test_modules[:]
+        test_modules.extend(discover_tests(root, 'test_*.py', conftests=[]))
+
+    stages.measure('discover', discover)
+
+    load_conftest(conftest)
+    retention = ModuleRetention()
+
+    def collect():
+        for module_index, test_module in enumerate(test_modules):
+            for _ in collect_test_module(test_module, module_index, retention):
+                pass
+
+    stages.measure('collect', collect)
+
+    def run():
+        for module_index, test_module in enumerate(test_modules):
+            for _ in run_test_module(test_module, module_index, retention):
+                pass
+
+    stages.measure('run', run)
+
+    # Fixture chain of a single test, resolved once and set up many times
+    module = load_module('bench_fixtures', test_modules[0])
+    plan = resolve_fixtures('test_parametrized', module.test_parametrized, fixture_lookup(test_modules[0], module), ['value'])
+    retention.unload('bench_fixtures')
+
+    def fixtures():
+        for _ in range(args.iterations):
+            build_kwargs(plan, dict(value=0))
+            FIXTURE_SCOPES['function'].close()
+
+    stages.measure('fixtures', fixtures, args.iterations)
+
+    def captures():
+        for _ in range(args.iterations):
+            with capture('sys'):
+                pass
+
+    stages.measure('capture', captures, args.iterations)
+
+    @pytest.mark.parametrize('x', range(args.grid))
+    @pytest.mark.parametrize('y', range(args.grid))
+    def grid(x, y):
+        pass
+
+    def expand():
+        for _ in parametrized_cases(grid):
+            pass
+
+    stages.measure('parametrize', expand, args.grid * args.grid)
+
+    mocked = Mock(return_value=1)
+
+    def mocks():
+        for _ in range(args.iterations):
+            mocked.geometry.kernel.intersect(1, 2)
+        mocked.reset_mock()
+
+    stages.measure('mock', mocks, args.iterations)
+
+    def patches():
+        for _ in range(args.iterations):
+            with patch('os.path.exists', return_value=True):
+                pass
+
+    stages.measure('patch', patches, args.iterations)
+
+    # Diff of sys.modules after a test module loaded many modules
+    module_names = ['bench_module_{}'.format(index) for index in range(args.iterations)]
+
+    def unload():
+        for name in module_names:
+            sys.modules[name] = types.ModuleType(name)
+        retention.unload('bench_module_0')
+
+    stages.measure('unload', unload)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the runner on a synthetic test tree.')
+    parser.add_argument('--tests', type=int, default=10000, help='Number of tests to generate (default: 10000)')
+    parser.add_argument('--depth', type=int, default=50, help='Length of the fixture chain (default: 50)')
+    parser.add_argument('--grid', type=int, default=300, help='Size of the side of the parametrize grid (default: 300)')
+    parser.add_argument('--iterations', type=int, default=10000, help='Iterations of the micro-benchmarks (default: 10000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of every stage (default: 3)')
+    parser.add_argument('--json', type=str, metavar='PATH', help='Save timings to PATH')
+    parser.add_argument('--compare', type=str, metavar='PATH', help='Compare timings with those saved to PATH')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Slowdown in percent reported as regression (default: 10)')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='pytest-bench-')
+    try:
+        generate_tree(root, args.tests, args.depth)
+        stages = run_benchmarks(root, args)
+    finally:
+        shutil.rmtree(root)
+
+    print()
+    print('{:<14} {:>10} {:>10} {:>10} {:>10} {:>10}'.format('stage', 'min', 'median', 'max', 'memory', 'peak'))
+    for name in sorted(stages.results):
+        stats = stages.results[name]
+        memory, peak = stages.memory[name]
+        print('{:<14} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(name, format_time(stats['min']), format_time(stats['median']),
+                                                                 format_time(stats['max']), _format_memory(memory), _format_memory(peak)))
+
+    if args.json:
+        save_benchmarks(args.json, stages.results)
+
+    regressions = 0
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        for name in sorted(stages.results):
+            regression = compare(stages.results[name], baseline.get(name), args.threshold)
+            if regression:
+                regressions += 1
+                print('{}: {}'.format(name, regression))
+    sys.exit(regressions)
+
+
+if __name__ == '__main__':
+    main()
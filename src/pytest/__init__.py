@@ -20,4 +20,6 @@ from __future__ import print_function
 from .__version__ import *    # noqa: F401 F403
 from .pytest import *         # noqa: F401 F403
 from .test_runner import *    # noqa: F401 F403
+from .fakes import *          # noqa: F401 F403
 from .mock import mocker      # noqa: F401 F403
+from .benchmark import benchmark  # noqa: F401 F403
@@ -2,19 +2,116 @@ from __future__ import print_function
 
 import argparse
 import os
+import sys
 
+from .test_runner import CAPTURE_LIMIT
 from .test_runner import run
+from .watch import request_run
+from .watch import watch
 
 
 def main():
     parser = argparse.ArgumentParser(description='IronPython pytest runner.')
     parser.add_argument('file_or_dir', type=str, help='Directory or file to test', default=os.path.dirname(__file__))
+    parser.add_argument('-k', type=str, dest='keyword', metavar='EXPRESSION',
+                        help='Only run tests whose name, module or marks match the expression, e.g. "intersection and not slow"')
+    parser.add_argument('-m', type=str, dest='markexpr', metavar='MARKEXPR',
+                        help='Only run tests with marks matching the expression, e.g. "slow or network"')
+    parser.add_argument('-p', type=str, action='append', dest='plugins', metavar='MODULE',
+                        help='Import MODULE and register its hooks as plugin (multiple allowed)')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help='Show a line per test with its outcome')
+    parser.add_argument('-q', '--quiet', action='count', default=0,
+                        help='Only show a character per test')
+    parser.add_argument('--progress', action='store_true',
+                        help='End lines with the percentage of test modules run so far')
+    parser.add_argument('-x', '--exitfirst', action='store_const', const=1, dest='maxfail',
+                        help='Stop after the first failed test')
+    parser.add_argument('--maxfail', type=int, metavar='N',
+                        help='Stop after N failed tests')
     parser.add_argument('--ignore', type=str, action='append',
                         help='Ignore files during testing (multiple allowed)')
+    parser.add_argument('--capture', type=str, choices=['sys', 'tee-sys', 'no'], default='sys', dest='capture_mode',
+                        help='Capture output of tests (sys), also print it live (tee-sys) or not at all (no)')
+    parser.add_argument('-s', action='store_const', const='no', dest='capture_mode',
+                        help='Shortcut for --capture=no')
+    parser.add_argument('--capture-limit', type=int, default=CAPTURE_LIMIT, metavar='BYTES',
+                        help='Bytes of captured output per stream shown for failed tests, split between head and tail')
+    parser.add_argument('-n', '--numprocesses', type=int, default=0, dest='workers',
+                        help='Number of worker interpreters to run test modules on (default: run in-process)')
+    parser.add_argument('--lf', '--last-failed', action='store_true', dest='last_failed',
+                        help='Rerun only the tests that failed in the last run (or all if none failed)')
+    parser.add_argument('--ff', '--failed-first', action='store_true', dest='failed_first',
+                        help='Run the tests that failed in the last run first, then the rest')
+    parser.add_argument('--changed', action='store_true',
+                        help='Run only the test modules depending on files changed since they last ran')
+    parser.add_argument('--norecursedirs', type=str, action='append',
+                        help='Pattern of directory names not to search for tests, replaces the defaults (multiple allowed)')
+    parser.add_argument('--collect-only', action='store_true',
+                        help='Only list the tests that would run, without running them')
+    parser.add_argument('--keep-module', type=str, action='append', dest='keep_modules',
+                        help='Package or pattern of modules to keep loaded across test modules (multiple allowed)')
+    parser.add_argument('--isolate', type=str, action='append', dest='isolate_modules',
+                        help='Package or pattern of the only modules to unload after each test module (multiple allowed)')
+    parser.add_argument('--durations', type=int, metavar='N',
+                        help='Show the N slowest setup, call, teardown and import durations (0 for all)')
+    parser.add_argument('--junitxml', type=str, metavar='PATH',
+                        help='Write a JUnit XML report to PATH as tests finish')
+    parser.add_argument('--jsonl', type=str, metavar='PATH',
+                        help='Write a JSON Lines report (one record per test result) to PATH as tests finish')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='Interrupt and fail tests running longer than SECONDS, reporting their stack')
+    parser.add_argument('--timeout-action', choices=['continue', 'abort'], default='continue',
+                        help='Continue with the next test after a timeout (default), or abort the session')
+    parser.add_argument('--benchmark-json', type=str, metavar='PATH',
+                        help='Save the statistics of benchmarks to PATH')
+    parser.add_argument('--benchmark-compare', type=str, metavar='PATH',
+                        help='Compare benchmarks with those saved to PATH by --benchmark-json, failing tests which regressed')
+    parser.add_argument('--benchmark-compare-threshold', type=float, default=10.0, metavar='PERCENT',
+                        help='Slowdown of the median time over the baseline which fails a benchmark (default: 10)')
+    parser.add_argument('--seed', type=int,
+                        help='Seed of the random order of tests, to reproduce the order of an earlier run')
+    parser.add_argument('--shard', type=str, metavar='I/N',
+                        help='Only run shard I of N, balanced by the durations of the last run (share --cache-dir across machines)')
+    parser.add_argument('--profile', type=str, metavar='DIR',
+                        help='Sample the stacks of tests and write them to DIR as collapsed stacks for flame graphs')
+    parser.add_argument('--profile-interval', type=float, default=0.005, metavar='SECONDS',
+                        help='Seconds between two samples of the stack of a test (default: 0.005)')
+    parser.add_argument('--profile-top', type=int, default=20, metavar='N',
+                        help='Number of functions with the most samples to show (default: 20)')
+    parser.add_argument('--memtrack', type=int, nargs='?', const=10, metavar='N',
+                        help='Track objects and modules retained by every test and show the N that retained the most (default: 10, 0 for all)')
+    parser.add_argument('--cache-dir', type=str, default='.pytest_cache',
+                        help='Directory to keep test outcomes and durations across runs (default: .pytest_cache)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep the interpreter warm and rerun affected tests when files change')
+    parser.add_argument('--watch-port', type=int,
+                        help='With --watch, also rerun tests when a client connects to this local port')
+    parser.add_argument('--connect', type=int, metavar='PORT',
+                        help='Ask the watching interpreter listening on PORT to run the tests')
 
     args = parser.parse_args()
 
-    run(args.file_or_dir, exclude_list=args.ignore, capture_stdout=True)
+    if args.connect:
+        sys.exit(request_run(args.connect, args.file_or_dir, changed=args.changed,
+                             last_failed=args.last_failed, failed_first=args.failed_first))
+
+    options = dict(exclude_list=args.ignore, capture_stdout=True, capture_mode=args.capture_mode, capture_limit=args.capture_limit,
+                   workers=args.workers, last_failed=args.last_failed, failed_first=args.failed_first, cache_dir=args.cache_dir,
+                   changed=args.changed, norecursedirs=args.norecursedirs, collect_only=args.collect_only,
+                   keep_modules=args.keep_modules, isolate_modules=args.isolate_modules, durations=args.durations,
+                   junitxml=args.junitxml, jsonl=args.jsonl, timeout=args.timeout, timeout_action=args.timeout_action,
+                   benchmark_json=args.benchmark_json, benchmark_compare=args.benchmark_compare,
+                   benchmark_compare_threshold=args.benchmark_compare_threshold, seed=args.seed, shard=args.shard,
+                   keyword=args.keyword, markexpr=args.markexpr,
+                   profile=args.profile, profile_interval=args.profile_interval, profile_top=args.profile_top,
+                   memtrack=args.memtrack, plugins=args.plugins,
+                   verbosity=max(-1, min(1, args.verbose - args.quiet)), progress=args.progress, maxfail=args.maxfail)
+
+    if args.watch:
+        watch(args.file_or_dir, port=args.watch_port, **options)
+    else:
+        run(args.file_or_dir, **options)
 
 
 if __name__ == '__main__':
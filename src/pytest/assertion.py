@@ -0,0 +1,302 @@
+"""Explain failed ``assert`` statements, without rewriting them at import.
+
+Test modules are imported as they are, so passing asserts cost nothing. Only
+when a test fails with an ``AssertionError``, the ``assert`` statement is parsed
+again from the source of the frame that raised it, its sub-expressions are
+evaluated again in the locals and globals of that frame, and the values of the
+comparison are diffed. As sub-expressions are evaluated a second time, an
+assert whose expressions have side effects may not fail again; the explanation
+then says so instead of showing misleading values.
+"""
+from __future__ import print_function
+
+import ast
+import difflib
+import linecache
+import pprint
+
+__all__ = []
+
+# Length of the repr of a value, and number of lines of a diff, in explanations
+REPR_LIMIT = 240
+DIFF_LIMIT = 40
+
+_OPERATORS = {
+    ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=',
+    ast.Is: 'is', ast.IsNot: 'is not', ast.In: 'in', ast.NotIn: 'not in',
+    ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.FloorDiv: '//', ast.Mod: '%', ast.Pow: '**',
+    ast.LShift: '<<', ast.RShift: '>>', ast.BitOr: '|', ast.BitXor: '^', ast.BitAnd: '&',
+    ast.And: 'and', ast.Or: 'or', ast.Not: 'not ', ast.USub: '-', ast.UAdd: '+', ast.Invert: '~',
+}
+
+# Precedence of operators, from lowest to highest, to only add parentheses where needed
+_PRECEDENCE = {ast.Or: 1, ast.And: 2, ast.Not: 3, ast.BitOr: 5, ast.BitXor: 6, ast.BitAnd: 7, ast.LShift: 8, ast.RShift: 8,
+               ast.Add: 9, ast.Sub: 9, ast.Mult: 10, ast.Div: 10, ast.FloorDiv: 10, ast.Mod: 10,
+               ast.USub: 11, ast.UAdd: 11, ast.Invert: 11, ast.Pow: 12}
+_COMPARE_PRECEDENCE = 4
+_ATOM_PRECEDENCE = 13
+
+# Literals are not worth explaining
+_LITERALS = tuple(getattr(ast, name) for name in ('Num', 'Str', 'Bytes', 'NameConstant', 'Constant') if hasattr(ast, name))
+# Expressions whose names are bound inside of them
+_SCOPES = tuple(getattr(ast, name) for name in ('Lambda', 'ListComp', 'GeneratorExp', 'DictComp', 'SetComp') if hasattr(ast, name))
+
+
+def saferepr(value, limit=REPR_LIMIT):
+    """Repr of a value, shortened in the middle to ``limit`` characters, which never raises."""
+    try:
+        text = repr(value)
+    except Exception as e:
+        text = '<{} object, repr raised {}>'.format(type(value).__name__, type(e).__name__)
+    if len(text) > limit:
+        text = text[:limit // 2 - 2] + '...' + text[-(limit // 2 - 1):]
+    return text
+
+
+def _precedence(node):
+    if isinstance(node, (ast.BinOp, ast.BoolOp, ast.UnaryOp)):
+        return _PRECEDENCE.get(type(node.op), 0)
+    if isinstance(node, ast.Compare):
+        return _COMPARE_PRECEDENCE
+    if isinstance(node, (ast.IfExp, ast.Lambda)):
+        return 0
+    return _ATOM_PRECEDENCE
+
+
+def _operand(node, precedence, right=False):
+    """Source of an operand, in parentheses if it binds less tightly than its operator."""
+    text = source(node)
+    if _precedence(node) < precedence or right and _precedence(node) == precedence:
+        return '({})'.format(text)
+    return text
+
+
+def source(node):
+    """Source of an expression, rebuilt from its syntax tree (``...`` for unsupported constructs)."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return '{}.{}'.format(_operand(node.value, _ATOM_PRECEDENCE), node.attr)
+    if isinstance(node, ast.Subscript):
+        return '{}[{}]'.format(_operand(node.value, _ATOM_PRECEDENCE), source(node.slice))
+    if isinstance(node, getattr(ast, 'Index', ())):
+        return source(node.value)
+    if isinstance(node, ast.Slice):
+        parts = [source(part) if part else '' for part in (node.lower, node.upper)]
+        if node.step:
+            parts.append(source(node.step))
+        return ':'.join(parts)
+    if isinstance(node, ast.Call):
+        args = [source(arg) for arg in node.args]
+        if len(args) == 1 and not node.keywords and isinstance(node.args[0], ast.GeneratorExp):
+            # The only argument of a call needs no parentheses of its own
+            args[0] = args[0][1:-1]
+        args.extend('**{}'.format(source(keyword.value)) if keyword.arg is None else '{}={}'.format(keyword.arg, source(keyword.value))
+                    for keyword in node.keywords)
+        if getattr(node, 'starargs', None):
+            args.append('*{}'.format(source(node.starargs)))
+        if getattr(node, 'kwargs', None):
+            args.append('**{}'.format(source(node.kwargs)))
+        return '{}({})'.format(_operand(node.func, _ATOM_PRECEDENCE), ', '.join(args))
+    if isinstance(node, getattr(ast, 'Starred', ())):
+        return '*{}'.format(source(node.value))
+    if isinstance(node, ast.Compare):
+        parts = [_operand(node.left, _COMPARE_PRECEDENCE, right=True)]
+        for op, comparator in zip(node.ops, node.comparators):
+            parts.extend([_OPERATORS[type(op)], _operand(comparator, _COMPARE_PRECEDENCE, right=True)])
+        return ' '.join(parts)
+    if isinstance(node, ast.BoolOp):
+        return ' {} '.format(_OPERATORS[type(node.op)]).join(_operand(value, _precedence(node), right=True) for value in node.values)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        precedence = _precedence(node)
+        # ``**`` is the only right-associative operator
+        left_right = isinstance(node.op, ast.Pow)
+        return '{} {} {}'.format(_operand(node.left, precedence, left_right), _OPERATORS[type(node.op)],
+                                 _operand(node.right, precedence, not left_right))
+    if isinstance(node, ast.UnaryOp):
+        return '{}{}'.format(_OPERATORS[type(node.op)], _operand(node.operand, _precedence(node)))
+    if isinstance(node, (ast.List, ast.Tuple, getattr(ast, 'Set', ast.List))):
+        items = ', '.join(source(item) for item in node.elts)
+        if isinstance(node, ast.List):
+            return '[{}]'.format(items)
+        if isinstance(node, ast.Tuple):
+            return '({}{})'.format(items, ',' if len(node.elts) == 1 else '')
+        return '{{{}}}'.format(items)
+    if isinstance(node, _SCOPES) and not isinstance(node, ast.Lambda):
+        generators = ' '.join('for {} in {}{}'.format(source(generator.target), source(generator.iter),
+                                                      ''.join(' if {}'.format(source(test)) for test in generator.ifs))
+                              for generator in node.generators)
+        if isinstance(node, getattr(ast, 'DictComp', ())):
+            return '{{{}: {} {}}}'.format(source(node.key), source(node.value), generators)
+        brackets = {ast.ListComp: '[{}]', ast.GeneratorExp: '({})'}.get(type(node), '{{{}}}')
+        return brackets.format('{} {}'.format(source(node.elt), generators))
+    if isinstance(node, ast.Dict):
+        return '{{{}}}'.format(', '.join('{}: {}'.format(source(key), source(value)) for key, value in zip(node.keys, node.values)))
+    if isinstance(node, _LITERALS):
+        for field in ('n', 's', 'value'):
+            if hasattr(node, field):
+                return saferepr(getattr(node, field))
+    return '...'
+
+
+def _statement_end(node):
+    return max(getattr(child, 'lineno', node.lineno) for child in ast.walk(node))
+
+
+def find_assert(filename, lineno, module_globals=None):
+    """The ``assert`` statement of a source file spanning the given line, or ``None``."""
+    lines = linecache.getlines(filename, module_globals)
+    if not lines:
+        return None
+    try:
+        tree = ast.parse(''.join(lines), filename)
+    except (SyntaxError, ValueError, TypeError):
+        return None
+
+    found = None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assert) and node.lineno <= lineno <= _statement_end(node):
+            if found is None or node.lineno > found.lineno:
+                found = node
+    return found
+
+
+def _evaluate(node, frame):
+    expression = ast.Expression(node)
+    ast.fix_missing_locations(expression)
+    return eval(compile(expression, frame.f_code.co_filename, 'eval'), frame.f_globals, frame.f_locals)
+
+
+def _subexpressions(test):
+    """Sub-expressions of an assert worth showing the value of, outermost first."""
+    skipped = set()
+    for node in ast.walk(test):
+        if isinstance(node, ast.Call):
+            # The function itself, e.g. ``len``, is not interesting
+            skipped.add(node.func)
+        elif isinstance(node, _SCOPES):
+            # Names are bound inside of them, except in the iterable of their first loop
+            outer = set(ast.walk(node.generators[0].iter)) if hasattr(node, 'generators') else set()
+            skipped.update(child for child in ast.walk(node) if child is not node and child not in outer)
+            if isinstance(node, ast.GeneratorExp):
+                skipped.add(node)
+
+    for node in ast.walk(test):
+        if node is test or node in skipped or not isinstance(node, ast.expr) or isinstance(node, _LITERALS + (ast.Slice,)):
+            continue
+        yield node
+
+
+def _lines_diff(left, right):
+    diff = list(difflib.ndiff(left, right))
+    if len(diff) > DIFF_LIMIT:
+        diff = diff[:DIFF_LIMIT] + ['... ({} more lines)'.format(len(diff) - DIFF_LIMIT)]
+    return [line.rstrip('\n') for line in diff]
+
+
+def compare_values(op, left, right):
+    """Lines explaining how two values of a failed comparison differ."""
+    if not isinstance(op, ast.Eq):
+        return []
+
+    text_types = (type(u''), type(b''))
+    if isinstance(left, text_types) and isinstance(right, text_types):
+        return ['Diff:'] + _lines_diff(left.splitlines(True) or [left], right.splitlines(True) or [right])
+
+    explanation = []
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        for index, (left_item, right_item) in enumerate(zip(left, right)):
+            if left_item != right_item:
+                explanation.append('At index {}: {} != {}'.format(index, saferepr(left_item), saferepr(right_item)))
+                break
+        difference = len(left) - len(right)
+        if difference:
+            longer, side = (left, 'Left') if difference > 0 else (right, 'Right')
+            explanation.append('{} contains {} more item(s), first: {}'.format(side, abs(difference), saferepr(longer[min(len(left), len(right))])))
+    elif isinstance(left, dict) and isinstance(right, dict):
+        differing = sorted((key for key in left if key in right and left[key] != right[key]), key=repr)
+        if differing:
+            explanation.append('Differing items:')
+            explanation.extend('  {}: {} != {}'.format(saferepr(key), saferepr(left[key]), saferepr(right[key])) for key in differing)
+        for side, one, other in (('Left', left, right), ('Right', right, left)):
+            extra = sorted((key for key in one if key not in other), key=repr)
+            if extra:
+                explanation.append('{} contains {} more item(s): {}'.format(side, len(extra), saferepr(dict((key, one[key]) for key in extra))))
+    elif isinstance(left, (set, frozenset)) and isinstance(right, (set, frozenset)):
+        for side, one, other in (('left', left, right), ('right', right, left)):
+            extra = one - other
+            if extra:
+                explanation.append('Extra items in the {} set: {}'.format(side, saferepr(sorted(extra, key=repr))))
+
+    left_lines, right_lines = pprint.pformat(left).splitlines(), pprint.pformat(right).splitlines()
+    if len(left_lines) > 1 or len(right_lines) > 1:
+        explanation.append('Full diff:')
+        explanation.extend(_lines_diff(left_lines, right_lines))
+    return explanation
+
+
+def explain(test, frame):
+    """Explain why the test expression of an assert statement is false in a frame, as a list of lines."""
+    try:
+        if _evaluate(test, frame):
+            return ['{} is true when evaluated again, its expressions may have side effects'.format(source(test))]
+    except Exception as e:
+        return ['{} raised {} when evaluated again: {}'.format(source(test), type(e).__name__, e)]
+
+    values = []
+    for node in _subexpressions(test):
+        text = source(node)
+        if '...' in text or any(text == known for known, _ in values):
+            continue
+        if isinstance(node, ast.Name) and node.id not in frame.f_locals and node.id not in frame.f_globals:
+            # Builtins, e.g. ``int``
+            continue
+        try:
+            value = _evaluate(node, frame)
+        except Exception:
+            continue
+        if saferepr(value) != text:
+            values.append((text, value))
+
+    explanation = []
+    if isinstance(test, ast.Compare) and len(test.ops) == 1:
+        # Values of both sides, without evaluating them again if they were already
+        value_of = dict(values)
+        left, right = [value_of[source(node)] if source(node) in value_of else _evaluate(node, frame) for node in (test.left, test.comparators[0])]
+        explanation.append('assert {} {} {}'.format(saferepr(left), _OPERATORS[type(test.ops[0])], saferepr(right)))
+        explanation.extend(compare_values(test.ops[0], left, right))
+
+    if values:
+        explanation.append('where:')
+        explanation.extend('  {} = {}'.format(text, saferepr(value)) for text, value in values)
+    return explanation
+
+
+def explain_assertion(tb):
+    """Explain the ``assert`` statement which raised an ``AssertionError``, given its traceback.
+
+    Returns
+    -------
+    str
+        The explanation, or ``None`` if the error was not raised by an ``assert`` statement.
+    """
+    if tb is None:
+        return None
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+
+    frame = tb.tb_frame
+    statement = find_assert(frame.f_code.co_filename, tb.tb_lineno, frame.f_globals)
+    if statement is None:
+        return None
+
+    try:
+        lines = ['assert {}'.format(source(statement.test))] + explain(statement.test, frame)
+    except Exception as e:
+        lines = ['assert {}'.format(source(statement.test)), 'Explaining the assertion failed: {}'.format(saferepr(e))]
+    finally:
+        del frame
+    if lines[1:2] == lines[:1]:
+        # Values of literals, e.g. ``assert 1 == 2``, are their source
+        del lines[1]
+    return '\n'.join(lines)
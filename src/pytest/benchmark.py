@@ -0,0 +1,147 @@
+"""Measure the speed of code under test, in the spirit of pytest-benchmark.
+
+The ``benchmark`` fixture calls a function in rounds of calibrated iterations.
+Its statistics end up in the result of the test, are printed at the end of the
+session and can be saved to, and compared with, a JSON baseline.
+"""
+from __future__ import print_function
+
+import json
+import math
+import platform
+import sys
+from timeit import default_timer as timer
+
+from .pytest import fixture
+
+__all__ = ['benchmark']
+
+# Statistics of the benchmark of the running test, moved into its result by the runner
+BENCHMARK_STATS = []
+
+# Statistic compared with the baseline, robust to the occasional slow round
+COMPARED_STAT = 'median'
+
+
+def timer_resolution():
+    """Smallest measurable difference between two readings of the timer."""
+    resolution = float('inf')
+    for _ in range(10):
+        start = timer()
+        end = timer()
+        while end == start:
+            end = timer()
+        resolution = min(resolution, end - start)
+    return resolution
+
+
+def compute_stats(durations, iterations):
+    """Statistics of per-iteration times, from the durations of rounds of ``iterations`` calls."""
+    times = sorted(duration / iterations for duration in durations)
+    rounds = len(times)
+    mean = sum(times) / rounds
+    middle = rounds // 2
+    median = times[middle] if rounds % 2 else (times[middle - 1] + times[middle]) / 2.0
+    stddev = math.sqrt(sum((t - mean) ** 2 for t in times) / (rounds - 1)) if rounds > 1 else 0.0
+    return dict(min=times[0], max=times[-1], mean=mean, median=median, stddev=stddev, rounds=rounds, iterations=iterations)
+
+
+class Benchmark(object):
+    """Calls a function repeatedly and records statistics of its duration.
+
+    Iterations per round are doubled until a round takes at least ``min_time``
+    (and many times the resolution of the timer), then rounds are measured until
+    ``max_time`` has elapsed, between ``min_rounds`` and ``max_rounds`` of them.
+    A benchmark can only measure once per test.
+    """
+
+    def __init__(self, max_time=1.0, min_time=0.00005, min_rounds=5, max_rounds=10000):
+        self.max_time = max_time
+        self.min_time = min_time
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.stats = None
+
+    def _measure(self, func, args, kwargs, iterations):
+        loop = range(iterations)
+        start = timer()
+        for _ in loop:
+            result = func(*args, **kwargs)
+        return timer() - start, result
+
+    def _calibrate(self, func, args, kwargs):
+        min_time = max(self.min_time, timer_resolution() * 100)
+        iterations = 1
+        while True:
+            duration, _ = self._measure(func, args, kwargs, iterations)
+            if duration >= min_time:
+                return iterations
+            iterations *= 2
+
+    def _record(self, durations, iterations):
+        if self.stats is not None:
+            raise Exception('The benchmark fixture can only measure once per test')
+        self.stats = compute_stats(durations, iterations)
+
+    def __call__(self, func, *args, **kwargs):
+        """Measure ``func(*args, **kwargs)`` with calibrated rounds and iterations, returns its result."""
+        iterations = self._calibrate(func, args, kwargs)
+        durations = []
+        end = timer() + self.max_time
+        while len(durations) < self.max_rounds and (len(durations) < self.min_rounds or timer() < end):
+            duration, result = self._measure(func, args, kwargs, iterations)
+            durations.append(duration)
+        self._record(durations, iterations)
+        return result
+
+    def pedantic(self, func, args=(), kwargs=None, rounds=1, iterations=1, warmup_rounds=0):
+        """Measure ``func(*args, **kwargs)`` with exactly the given number of rounds and iterations, returns its result."""
+        kwargs = kwargs or dict()
+        for _ in range(warmup_rounds):
+            self._measure(func, args, kwargs, iterations)
+        durations = []
+        for _ in range(rounds):
+            duration, result = self._measure(func, args, kwargs, iterations)
+            durations.append(duration)
+        self._record(durations, iterations)
+        return result
+
+
+def save_benchmarks(path, benchmarks):
+    """Save statistics of benchmarks, by test key, to a JSON file usable as baseline."""
+    machine = dict(python=sys.version.split()[0], implementation=platform.python_implementation(), platform=sys.platform)
+    with open(path, 'w') as f:
+        json.dump(dict(machine=machine, benchmarks=benchmarks), f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """Load statistics of benchmarks, by test key, saved by :func:`save_benchmarks`."""
+    with open(path) as f:
+        return json.load(f)['benchmarks']
+
+
+def compare(stats, baseline, threshold):
+    """Describe the regression of a benchmark over its baseline if it exceeds ``threshold`` percent, otherwise return ``None``."""
+    if not baseline or not baseline.get(COMPARED_STAT):
+        return None
+    change = (stats[COMPARED_STAT] - baseline[COMPARED_STAT]) / baseline[COMPARED_STAT] * 100
+    if change <= threshold:
+        return None
+    return 'Benchmark regressed: {} {} is {:.1f}% slower than baseline {} (threshold {}%)'.format(
+        COMPARED_STAT, format_time(stats[COMPARED_STAT]), change, format_time(baseline[COMPARED_STAT]), threshold)
+
+
+def format_time(seconds):
+    """Format a duration with a unit suited to its magnitude."""
+    for unit, scale in (('s', 1.0), ('ms', 1e3), ('us', 1e6)):
+        if seconds >= 1.0 / scale:
+            return '{:.3f}{}'.format(seconds * scale, unit)
+    return '{:.1f}ns'.format(seconds * 1e9)
+
+
+@fixture
+def benchmark():
+    benchmark = Benchmark()
+    yield benchmark
+    if benchmark.stats is not None:
+        BENCHMARK_STATS.append(benchmark.stats)
@@ -0,0 +1,49 @@
+"""Persist values, e.g. outcomes of the last run, across test sessions."""
+from __future__ import print_function
+
+import json
+import os
+
+__all__ = []
+
+CACHE_DIR = '.pytest_cache'
+
+
+class Cache(object):
+    """Stores JSON values by key in a cache directory.
+
+    Keys are slash separated paths, e.g. ``cache/lastfailed``.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, 'v', *key.split('/'))
+
+    def get(self, key, default=None):
+        """Read the value of a key, or return the default if it is missing or unreadable."""
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return default
+
+    def set(self, key, value):
+        """Write the value of a key, replacing the previous one."""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+            gitignore = os.path.join(self.cache_dir, '.gitignore')
+            if not os.path.exists(gitignore):
+                with open(gitignore, 'w') as f:
+                    f.write('# Created by ironpython-pytest automatically.\n*\n')
+
+        # Write to a temporary file first, so an interrupted run never leaves a truncated value behind
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(value, f, indent=2, sort_keys=True)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
@@ -0,0 +1,227 @@
+"""Static index of test modules, to select tests with ``-k`` and ``-m`` before importing anything.
+
+Test modules are parsed (not imported) to list their ``test_`` functions and the
+marks of their decorators, e.g. ``@pytest.mark.slow`` or ``@pytest.mark.parametrize(...)``.
+Only the test modules with selected tests are imported afterwards. The index of
+a file is kept in the cache until its modification time or size changes.
+
+Parametrized cases can have marks of their own, e.g. ``pytest.param(4, marks=pytest.mark.slow)``.
+A test is kept by the index if some of its cases could be selected, and its cases
+are selected by their own marks once the test module is imported.
+"""
+from __future__ import print_function
+
+import ast
+import itertools
+import os
+import re
+
+__all__ = []
+
+# Marks which can be used without ``mark.``, e.g. ``@pytest.skip``
+BUILTIN_MARKS = ('parametrize', 'skip', 'timeout')
+
+_TOKENS = re.compile(r'\(|\)|[^\s()]+')
+_OPERATORS = ('and', 'or', 'not')
+
+
+def _decorator_mark(decorator):
+    """Name of the mark applied by a decorator, or ``None`` if it is not a mark."""
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+
+    names = []
+    while isinstance(decorator, ast.Attribute):
+        names.append(decorator.attr)
+        decorator = decorator.value
+    if isinstance(decorator, ast.Name):
+        names.append(decorator.id)
+    if not names:
+        return None
+
+    if 'mark' in names[1:] or names[0] in BUILTIN_MARKS:
+        return names[0]
+    return None
+
+
+def _case_marks(decorator):
+    """Names of the marks given to the :func:`~pytest.param` cases of a ``parametrize`` decorator.
+
+    Returns ``None`` if its values are not literal (e.g. a generator function), so their marks are unknown.
+    """
+    if not isinstance(decorator, ast.Call):
+        return []
+    argvalues = decorator.args[1] if len(decorator.args) > 1 else None
+    for keyword in decorator.keywords:
+        if keyword.arg == 'argvalues':
+            argvalues = keyword.value
+    if not isinstance(argvalues, (ast.List, ast.Tuple)):
+        return None
+
+    marks = []
+    for value in argvalues.elts:
+        if not isinstance(value, ast.Call):
+            continue
+        func = value.func
+        if (func.attr if isinstance(func, ast.Attribute) else getattr(func, 'id', None)) != 'param':
+            continue
+        for keyword in value.keywords:
+            if keyword.arg == 'marks':
+                values = keyword.value.elts if isinstance(keyword.value, (ast.List, ast.Tuple)) else [keyword.value]
+                marks.extend(_decorator_mark(mark) for mark in values)
+    return marks
+
+
+def parse_test_module(path):
+    """List the ``test_`` functions of a module with the marks of their decorators, without importing it.
+
+    Returns
+    -------
+    list
+        ``[name, marks, case_marks]`` lists, in order of definition, where ``case_marks`` are the marks
+        of its parametrized cases (``None`` if unknown). Tests which are only assigned or imported under
+        a ``test_`` name have no known marks.
+    """
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+
+    tests = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('test_'):
+            marks = []
+            case_marks = []
+            for decorator in node.decorator_list:
+                mark = _decorator_mark(decorator)
+                marks.append(mark)
+                if mark == 'parametrize' and case_marks is not None:
+                    layer_marks = _case_marks(decorator)
+                    case_marks = case_marks + layer_marks if layer_marks is not None else None
+            if case_marks is not None:
+                case_marks = sorted(set(mark for mark in case_marks if mark))
+            tests.append([node.name, sorted(set(mark for mark in marks if mark)), case_marks])
+        elif isinstance(node, ast.Assign):
+            tests.extend([target.id, [], []] for target in node.targets if isinstance(target, ast.Name) and target.id.startswith('test_'))
+        elif isinstance(node, ast.ImportFrom):
+            tests.extend([alias.asname or alias.name, [], []] for alias in node.names if (alias.asname or alias.name).startswith('test_'))
+    return tests
+
+
+class StaticIndex(object):
+    """Tests of test modules, parsed once per version of each file.
+
+    ``entries`` map paths to ``[mtime, size, tests]`` and can be stored in the cache.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else dict()
+
+    def tests(self, path):
+        """Tests of a test module, or ``None`` if it cannot be parsed (the error is left for its import to report)."""
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        # Entries cached before the marks of parametrized cases were recorded are parsed again
+        if entry is None or entry[0] != stat.st_mtime or entry[1] != stat.st_size or any(len(test) < 3 for test in entry[2] or ()):
+            try:
+                tests = parse_test_module(path)
+            except SyntaxError:
+                tests = None
+            entry = self.entries[path] = [stat.st_mtime, stat.st_size, tests]
+        return entry[2]
+
+
+def compile_expression(expression, option):
+    """Compile a ``-k`` or ``-m`` expression of names combined with ``and``, ``or``, ``not`` and parentheses.
+
+    Returns a function of a predicate telling whether a name of the expression matches,
+    which tells whether the whole expression matches.
+
+    Raises
+    ------
+    ValueError
+        Raised if the expression is not valid.
+    """
+    names = []
+    parts = []
+    for token in _TOKENS.findall(expression):
+        if token in _OPERATORS or token in '()':
+            parts.append(token)
+        else:
+            parts.append('matches(names[{}])'.format(len(names)))
+            names.append(token)
+
+    try:
+        code = compile(' '.join(parts) or 'True', '<{} expression>'.format(option), 'eval')
+    except SyntaxError:
+        raise ValueError('Wrong expression passed to {}: {}'.format(option, expression))
+
+    def evaluate(matches):
+        return eval(code, {'__builtins__': {}}, dict(matches=matches, names=names))
+
+    return evaluate
+
+
+def compile_selection(keyword=None, markexpr=None):
+    """Compile the ``-k`` and ``-m`` expressions into a function telling whether a test is selected.
+
+    The function takes the path of the test module, the name of the test and the names of its marks
+    (including the ones of a parametrized case).
+    """
+    keyword_matches = compile_expression(keyword, '-k') if keyword else None
+    mark_matches = compile_expression(markexpr, '-m') if markexpr else None
+
+    def selects(test_module, name, marks):
+        if keyword_matches:
+            module_name = os.path.splitext(os.path.basename(test_module))[0]
+            words = [name.lower(), module_name.lower()] + [mark.lower() for mark in marks]
+            if not keyword_matches(lambda sub: any(sub.lower() in word for word in words)):
+                return False
+        return not mark_matches or mark_matches(lambda mark: mark in marks)
+
+    return selects
+
+
+def _may_select(selects, test_module, name, marks, case_marks):
+    """Whether a test or some of its parametrized cases (with any combination of ``case_marks``) could be selected."""
+    if selects(test_module, name, marks):
+        return True
+    if case_marks is None:
+        # Cases are only known once the module is imported
+        return True
+    return any(selects(test_module, name, marks + list(added))
+               for count in range(1, len(case_marks) + 1) for added in itertools.combinations(case_marks, count))
+
+
+def select_tests(test_modules, index, keyword=None, markexpr=None):
+    """Select tests by ``-k`` expression (substrings of their name, module or marks) and ``-m`` expression (their marks).
+
+    Tests with parametrized cases which have marks of their own are selected if some of their cases could be,
+    the cases themselves are selected with :func:`compile_selection` when they run.
+
+    Returns
+    -------
+    tuple
+        The test modules with selected tests, the ``module::test`` names of the selected tests (or the module itself,
+        if it cannot be parsed) and the number of deselected tests.
+    """
+    selects = compile_selection(keyword, markexpr)
+
+    selected_modules = []
+    selected = set()
+    deselected = 0
+    for test_module in test_modules:
+        tests = index.tests(test_module)
+        if tests is None:
+            selected_modules.append(test_module)
+            selected.add(test_module)
+            continue
+
+        module_selected = False
+        for name, marks, case_marks in tests:
+            if not _may_select(selects, test_module, name, marks, case_marks):
+                deselected += 1
+                continue
+            selected.add('{}::{}'.format(test_module, name))
+            module_selected = True
+        if module_selected:
+            selected_modules.append(test_module)
+    return selected_modules, selected, deselected
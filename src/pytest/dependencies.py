@@ -0,0 +1,100 @@
+"""Index of the source files each test module depends on.
+
+The runner already knows which modules a test module can use: the ones it
+loads (and unloads afterwards, unless they are kept), the ones kept loaded by
+earlier test modules, and the ones imported by ``conftest.py`` files and plugins.
+Their source files are recorded together with a
+fingerprint (modification time, size and content hash), so that a later run
+can select only the test modules affected by changed files.
+"""
+from __future__ import print_function
+
+import hashlib
+import os
+
+__all__ = []
+
+# Content hashes computed so far, by path, mtime and size
+_CONTENT_HASHES = dict()
+
+
+def source_file(module):
+    """Return the absolute path of the source file of a module, if it has one."""
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    root, ext = os.path.splitext(path)
+    if ext.lower() in ('.pyc', '.pyo') and os.path.exists(root + '.py'):
+        path = root + '.py'
+    return os.path.abspath(path)
+
+
+def _content_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def fingerprint(path):
+    """Return ``[mtime, size, md5]`` of a file, or ``None`` if it does not exist."""
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime, stat.st_size)
+        if key not in _CONTENT_HASHES:
+            _CONTENT_HASHES[key] = _content_hash(path)
+    except (IOError, OSError):
+        return None
+    return [stat.st_mtime, stat.st_size, _CONTENT_HASHES[key]]
+
+
+def has_changed(path, recorded):
+    """Check a file against its recorded fingerprint, hashing it only if its mtime or size differ."""
+    if recorded is None:
+        return True
+    try:
+        stat = os.stat(path)
+    except (IOError, OSError):
+        return True
+    if [stat.st_mtime, stat.st_size] == recorded[:2]:
+        return False
+    current = fingerprint(path)
+    return current is None or current[2] != recorded[2]
+
+
+def fingerprints(paths):
+    """Fingerprint a list of files, by absolute path."""
+    paths = set(os.path.abspath(path) for path in paths)
+    return {path: fingerprint(path) for path in paths}
+
+
+def source_files(module_names, modules):
+    """Return the source files of the named modules which have one."""
+    paths = []
+    for name in module_names:
+        path = source_file(modules.get(name))
+        if path:
+            paths.append(path)
+    return paths
+
+
+def module_dependencies(test_module, module_names, modules):
+    """Fingerprint the source files of a test module and of the modules it loaded."""
+    return fingerprints([test_module] + source_files(module_names, modules))
+
+
+def changed_modules(test_modules, index):
+    """Select the test modules that are new or depend on a file changed since it was recorded."""
+    checked = dict()
+    selected = []
+    for test_module in test_modules:
+        files = index.get(test_module)
+        if files is None:
+            selected.append(test_module)
+            continue
+        for path, recorded in files.items():
+            key = (path, ) + tuple(recorded or ())
+            if key not in checked:
+                checked[key] = has_changed(path, recorded)
+            if checked[key]:
+                selected.append(test_module)
+                break
+    return selected
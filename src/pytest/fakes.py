@@ -0,0 +1,295 @@
+"""Fake module trees loaded lazily from stub manifests.
+
+A manifest describes modules and the types, functions and attributes they
+contain, either as JSON or as ``.pyi`` stub files. Loading it only registers
+an import hook: modules are created when first imported, and their fake types
+and functions when first looked up, so loading a manifest takes the same time
+whatever the size of the faked API.
+"""
+from __future__ import print_function
+
+import json
+import os
+import re
+import sys
+import types
+
+__all__ = ['load_fake_modules']
+
+# Calls to load_fake_modules(), replayed on worker interpreters
+FAKE_MANIFESTS = []
+
+_CLASS = re.compile(r'^class\s+(\w+)')
+_NESTED_CLASS = re.compile(r'^\s+class\s+(\w+)')
+_DEF = re.compile(r'^(\s*)(?:async\s+)?def\s+(\w+)\s*(\(.*)')
+_ATTRIBUTE = re.compile(r'^(\s*)(\w+)\s*[:=]')
+
+
+def _normalize(content):
+    """Turn the content of a module in a JSON manifest into ``types``, ``functions`` and ``attributes`` dictionaries."""
+    normalized = dict(types=dict(), functions=dict(), attributes=dict())
+    for kind in normalized:
+        members = content.get(kind) or dict()
+        if isinstance(members, list):
+            members = dict((name, None) for name in members)
+        normalized[kind] = members
+    for name, members in normalized['types'].items():
+        if isinstance(members, list):
+            normalized['types'][name] = dict((member, None) for member in members)
+        elif members is None:
+            normalized['types'][name] = dict()
+    return normalized
+
+
+def _split_signature(text):
+    """Split the parameters and return annotation of a ``def`` from what follows them."""
+    depth = 0
+    for index, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                returns = text[index + 1:].split(':', 1)[0].strip()
+                return text[:index + 1] + (' ' + returns if returns else '')
+    return text
+
+
+def parse_stub(path):
+    """Parse the classes, functions and attributes of a ``.pyi`` stub file.
+
+    This is a line-based reader, not a Python parser: stubs use Python 3 syntax,
+    which IronPython cannot parse. Method signatures are recorded as text.
+    """
+    content = dict(types=dict(), functions=dict(), attributes=dict())
+    with open(path) as f:
+        lines = iter(f.read().splitlines())
+
+    members = None
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith(('#', '@')):
+            continue
+        if not line[0].isspace():
+            members = None
+
+        match = _CLASS.match(line)
+        if match:
+            members = content['types'][match.group(1)] = dict()
+            continue
+
+        match = _NESTED_CLASS.match(line)
+        if match:
+            if members is not None:
+                members[match.group(1)] = None
+            continue
+
+        match = _DEF.match(line)
+        if match:
+            indent, name, signature = match.groups()
+            while signature.count('(') > signature.count(')'):
+                signature += ' ' + next(lines, ')').strip()
+            signature = _split_signature(signature)
+            if indent and members is not None:
+                members[name] = signature
+            elif not indent:
+                content['functions'][name] = signature
+            continue
+
+        match = _ATTRIBUTE.match(line)
+        if match and not match.group(2).startswith('__'):
+            indent, name = match.groups()
+            if indent and members is not None:
+                members[name] = None
+            elif not indent:
+                content['attributes'][name] = None
+
+    return content
+
+
+class JSONManifest(object):
+    """Modules of a manifest given as a dictionary of module names to their types, functions and attributes."""
+
+    def __init__(self, modules, path=None):
+        self.modules = modules
+        self.path = path
+        self.packages = set()
+        for name in modules:
+            while '.' in name:
+                name = name.rsplit('.', 1)[0]
+                self.packages.add(name)
+
+    def has_module(self, name):
+        return name in self.modules or name in self.packages
+
+    def source_file(self, name):
+        return self.path
+
+    def content(self, name):
+        return _normalize(self.modules.get(name) or dict())
+
+
+class StubManifest(object):
+    """Modules of a ``.pyi`` stub file, or of a directory of stubs laid out like packages.
+
+    The stubs of a directory are listed once, so that the finder answers every later import without
+    touching the file system, and only claims the modules of stubs and their parent packages
+    (i.e. not those of other directories, which could shadow real packages).
+    """
+
+    def __init__(self, path):
+        path = os.path.abspath(path)
+        # Stub files by module name, ``None`` for packages without their own stub
+        self.stubs = dict()
+        if os.path.isdir(path):
+            for root, dirnames, filenames in os.walk(path):
+                package = os.path.relpath(root, path).replace(os.sep, '.') if root != path else ''
+                for filename in filenames:
+                    module_name, ext = os.path.splitext(filename)
+                    if ext != '.pyi':
+                        continue
+                    if module_name == '__init__':
+                        module_name, module_package = package, package.rpartition('.')[0]
+                    else:
+                        module_name, module_package = '.'.join(filter(None, (package, module_name))), package
+                    if not module_name:
+                        continue
+                    self.stubs[module_name] = os.path.join(root, filename)
+                    while module_package and module_package not in self.stubs:
+                        self.stubs[module_package] = None
+                        module_package = module_package.rpartition('.')[0]
+        else:
+            self.stubs[os.path.splitext(os.path.basename(path))[0]] = path
+
+    def has_module(self, name):
+        return name in self.stubs
+
+    def source_file(self, name):
+        return self.stubs.get(name)
+
+    def content(self, name):
+        path = self.source_file(name)
+        if path is None:
+            return dict(types=dict(), functions=dict(), attributes=dict())
+        return parse_stub(path)
+
+
+def _accept_anything(*args, **kwargs):
+    return None
+
+
+def _fake_function(name, signature=None):
+    def fake(*args, **kwargs):
+        return None
+
+    fake.__name__ = str(name)
+    fake.__doc__ = '{}{}'.format(name, signature) if signature else None
+    fake._fake_signature = signature
+    return fake
+
+
+def _fake_type(name, module_name, members):
+    namespace = dict(__module__=module_name, __init__=_accept_anything)
+    for member, signature in members.items():
+        # Static, so that fake methods can be called on the type as well as on instances
+        namespace[str(member)] = staticmethod(_fake_function(member, signature)) if signature else None
+    return type(str(name), (object,), namespace)
+
+
+class FakeModule(types.ModuleType):
+    """Module of a manifest, creating its fake types, functions and submodules on first lookup."""
+
+    def __init__(self, name, manifest):
+        super(FakeModule, self).__init__(name)
+        self.__path__ = []
+        self.__fake_manifest__ = manifest
+        self.__fake_content__ = None
+        source_file = manifest.source_file(name)
+        if source_file:
+            self.__file__ = source_file
+
+    def __getattr__(self, item):
+        # Only called when normal lookup fails, i.e. the first time an item is looked up
+        if item.startswith('__'):
+            raise AttributeError(item)
+
+        content = self.__fake_content__
+        if content is None:
+            content = self.__fake_content__ = self.__fake_manifest__.content(self.__name__)
+
+        if item in content['types']:
+            value = _fake_type(item, self.__name__, content['types'][item])
+        elif item in content['functions']:
+            value = _fake_function(item, content['functions'][item])
+        elif item in content['attributes']:
+            value = None
+        elif FINDER.find_module('{}.{}'.format(self.__name__, item)):
+            __import__('{}.{}'.format(self.__name__, item))
+            return getattr(self, item)
+        else:
+            raise AttributeError('Fake module {!r} has no attribute {!r}'.format(self.__name__, item))
+
+        setattr(self, item, value)
+        return value
+
+
+class FakeModuleFinder(object):
+    """Import hook creating the modules of loaded manifests when they are first imported."""
+
+    def __init__(self):
+        self.manifests = []
+
+    def manifest_of(self, name):
+        for manifest in reversed(self.manifests):
+            if manifest.has_module(name):
+                return manifest
+        return None
+
+    def find_module(self, fullname, path=None):
+        if self.manifests and self.manifest_of(fullname) is not None:
+            return self
+        return None
+
+    def load_module(self, fullname):
+        if fullname in sys.modules:
+            return sys.modules[fullname]
+
+        module = FakeModule(fullname, self.manifest_of(fullname))
+        module.__loader__ = self
+        sys.modules[fullname] = module
+
+        parent, _, child = fullname.rpartition('.')
+        if parent in sys.modules:
+            setattr(sys.modules[parent], child, module)
+        return module
+
+
+FINDER = FakeModuleFinder()
+
+
+def load_fake_modules(manifest):
+    """Fake a tree of modules described by a manifest, creating modules, types and functions only when first used.
+
+    Parameters
+    ----------
+    manifest : str or dict
+        Path of a JSON manifest, of a ``.pyi`` stub file or of a directory of stubs laid out like packages,
+        or a dictionary with the content of a JSON manifest: module names mapped to their ``types``,
+        ``functions`` and ``attributes``. Types map their members to signatures (``None`` for attributes)
+        and functions their names to signatures, or both are lists of names.
+
+    >>> load_fake_modules({'Rhino.Geometry': {'types': {'Point3d': {'DistanceTo': '(self, other)', 'X': None}}}})
+    >>> load_fake_modules('stubs/')
+    """
+    if isinstance(manifest, dict):
+        FINDER.manifests.append(JSONManifest(manifest))
+    elif manifest.lower().endswith('.json'):
+        manifest = os.path.abspath(manifest)
+        with open(manifest) as f:
+            FINDER.manifests.append(JSONManifest(json.load(f), manifest))
+    else:
+        manifest = os.path.abspath(manifest)
+        FINDER.manifests.append(StubManifest(manifest))
+
+    if FINDER not in sys.meta_path:
+        sys.meta_path.insert(0, FINDER)
+    FAKE_MANIFESTS.append(manifest)
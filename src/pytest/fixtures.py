@@ -0,0 +1,224 @@
+"""Fixture registry, resolution and per-scope caching.
+
+Fixtures are looked up nearest-first: the test module itself, then the
+``conftest.py`` files of its directory and all parent directories, and
+finally the globally registered fixtures (e.g. ``mocker``).
+The fixtures needed by a test are resolved once, when its module is
+collected, into a plan that lists them in setup order.
+"""
+from __future__ import print_function
+
+import imp
+import inspect
+import os
+
+from .hooks import PLUGINS
+from .pytest import FIXTURES
+from .pytest import SCOPES
+
+__all__ = []
+
+# Fixtures defined in conftest.py files, by absolute directory path
+CONFTEST_FIXTURES = dict()
+
+
+class FixtureScope(object):
+    """Cached fixture values and pending teardowns of one fixture scope."""
+
+    def __init__(self, name):
+        self.name = name
+        self.values = dict()
+        self.finalizers = []
+
+    def close(self):
+        """Run teardowns in reverse order of setup and forget all cached values."""
+        first_error = None
+        while self.finalizers:
+            finalizer = self.finalizers.pop()
+            try:
+                finalizer()
+            except Exception as e:
+                first_error = first_error or e
+        self.values.clear()
+        if first_error:
+            raise first_error
+
+
+FIXTURE_SCOPES = {name: FixtureScope(name) for name in SCOPES}
+
+
+class FixturePlan(object):
+    """Fixtures needed by a test function, resolved in setup order.
+
+    Each step is a tuple of fixture name, fixture function, scope and argument names.
+    """
+
+    def __init__(self, argnames, steps):
+        self.argnames = argnames
+        self.steps = steps
+
+
+class FixtureRequest(object):
+    """The ``request`` argument of fixtures, holding the ``param`` given to the fixture by indirect parametrization."""
+
+    def __init__(self, fixturename, params):
+        self.fixturename = fixturename
+        self._params = params
+
+    @property
+    def param(self):
+        try:
+            return self._params[self.fixturename]
+        except KeyError:
+            raise AttributeError('Fixture "{}" is not parametrized indirectly'.format(self.fixturename))
+
+
+def _cache_key(fixture_function, name, params):
+    # Fixtures given a param by indirect parametrization are cached per param
+    if name not in params:
+        return fixture_function
+    param = params[name]
+    try:
+        hash(param)
+    except TypeError:
+        param = id(param)
+    return fixture_function, param
+
+
+def argument_names(func):
+    func = getattr(func, '__wrapped__', func)
+    return func.__code__.co_varnames[0:func.__code__.co_argcount]
+
+
+def module_fixtures(module):
+    """Collect the fixtures defined in (or imported into) a module."""
+    fixtures = dict()
+    for value in vars(module).values():
+        if callable(value) and isinstance(getattr(value, '_fixture_scope', None), str):
+            fixtures[value.__name__] = value
+    return fixtures
+
+
+def load_module(name, path):
+    """Load a test or conftest module without leaking its fixtures into the global registry."""
+    global_fixtures = dict(FIXTURES)
+    try:
+        return imp.load_source(name, path)
+    finally:
+        FIXTURES.clear()
+        FIXTURES.update(global_fixtures)
+
+
+def load_conftest(path):
+    """Load a conftest.py file, register its fixtures for its directory and its hooks as plugin."""
+    module = load_module('conftest_{}'.format(len(CONFTEST_FIXTURES)), path)
+    CONFTEST_FIXTURES[os.path.dirname(os.path.abspath(path))] = module_fixtures(module)
+    PLUGINS.register(module, os.path.abspath(path))
+    return module
+
+
+def fixture_lookup(test_module, module):
+    """Build the nearest-first list of fixture dictionaries visible to a test module."""
+    lookup = [module_fixtures(module)]
+
+    directory = os.path.dirname(os.path.abspath(test_module))
+    while True:
+        if directory in CONFTEST_FIXTURES:
+            lookup.append(CONFTEST_FIXTURES[directory])
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+
+    lookup.append(FIXTURES)
+    return lookup
+
+
+def resolve_fixtures(test_method_name, test_method, lookup, provided=()):
+    """Resolve the fixtures of a test function into a :class:`FixturePlan`.
+
+    Raises
+    ------
+    Exception
+        Raised if a fixture is missing, fixtures depend on each other in a cycle
+        or a fixture depends on a fixture with a narrower scope.
+    """
+    steps = []
+    resolved = set()
+
+    def visit(name, requesting_scope, path):
+        if name == 'request':
+            return
+        if name in path:
+            raise Exception('Test method "{}" has a fixture dependency cycle: {}'.format(test_method_name, ' -> '.join(path + (name,))))
+
+        for fixtures in lookup:
+            if name in fixtures:
+                fixture_function = fixtures[name]
+                break
+        else:
+            raise Exception('Test method "{}" needs argument "{}" but no fixture with that name'.format(test_method_name, name))
+
+        scope = getattr(fixture_function, '_fixture_scope', 'function')
+        if SCOPES.index(scope) > SCOPES.index(requesting_scope):
+            raise Exception('Test method "{}" uses {} scoped fixture "{}" from a {} scoped fixture'.format(
+                test_method_name, scope, name, requesting_scope))
+
+        if name in resolved:
+            return
+
+        fixture_argnames = argument_names(fixture_function)
+        for argname in fixture_argnames:
+            visit(argname, scope, path + (name,))
+
+        resolved.add(name)
+        steps.append((name, fixture_function, scope, fixture_argnames))
+
+    argnames = [argname for argname in argument_names(test_method) if argname not in provided]
+    for argname in argnames:
+        visit(argname, 'function', ())
+
+    return FixturePlan(argnames, steps)
+
+
+def _finish_generator_fixture(name, generator):
+    try:
+        next(generator)
+    except StopIteration:
+        pass
+    else:
+        raise Exception('Fixture "{}" yielded more than once'.format(name))
+
+
+def build_kwargs(plan, kwargs, params=None):
+    """Set up the fixtures of a plan (reusing cached values of their scope) and add them to kwargs.
+
+    ``params`` are the values of indirectly parametrized arguments, given to the fixture
+    of the same name as ``request.param``.
+    """
+    params = params or dict()
+    values = dict(request=FixtureRequest(None, params))
+
+    for name, fixture_function, scope_name, fixture_argnames in plan.steps:
+        scope = FIXTURE_SCOPES[scope_name]
+        cache_key = _cache_key(fixture_function, name, params)
+        if cache_key in scope.values:
+            values[name] = scope.values[cache_key]
+            continue
+
+        fixture_kwargs = {argname: values[argname] for argname in fixture_argnames}
+        if 'request' in fixture_kwargs:
+            fixture_kwargs['request'] = FixtureRequest(name, params)
+        if inspect.isgeneratorfunction(fixture_function):
+            generator = fixture_function(**fixture_kwargs)
+            value = next(generator)
+            scope.finalizers.append(lambda name=name, generator=generator: _finish_generator_fixture(name, generator))
+        else:
+            value = fixture_function(**fixture_kwargs)
+
+        scope.values[cache_key] = value
+        values[name] = value
+
+    for argname in plan.argnames:
+        if argname not in kwargs:
+            kwargs[argname] = values[argname]
@@ -0,0 +1,101 @@
+"""Hooks of the test session, implemented by plugins.
+
+A plugin is a module (or any object) with functions named after hooks, e.g.
+``pytest_runtest_setup(key)``. The ``conftest.py`` files are plugins, and other
+modules are loaded as plugins with ``-p module``. Like in pytest, an implementation
+only declares the arguments of the hook it needs.
+
+Every hook has the list of its implementations, with their arguments, built
+when a plugin is registered rather than looked up on each call, so that a hook
+nobody implements costs a single check on the path of every test.
+"""
+from __future__ import print_function
+
+import inspect
+import sys
+
+__all__ = []
+
+# Hooks, with the arguments passed to their implementations
+HOOKS = {
+    # The session starts, with the test modules found
+    'pytest_sessionstart': ('test_modules',),
+    # The test modules to run were selected, the list can be reordered or filtered in place
+    'pytest_collection': ('test_modules',),
+    # Before the fixtures of a test are set up, before it is called and before its fixtures are torn down
+    'pytest_runtest_setup': ('key',),
+    'pytest_runtest_call': ('key',),
+    'pytest_runtest_teardown': ('key',),
+    # A test finished, its result dictionary can be updated
+    'pytest_runtest_logreport': ('result',),
+    # The session finished, the exit status is the number of failed tests
+    'pytest_sessionfinish': ('exitstatus', 'counts'),
+}
+
+
+def _argnames(func):
+    func = getattr(func, '__wrapped__', func)
+    if inspect.isclass(func) or not hasattr(func, '__code__') and not hasattr(func, '__func__'):
+        return None
+    code = getattr(func, '__func__', func).__code__
+    argnames = code.co_varnames[0:code.co_argcount]
+    return argnames[1:] if inspect.ismethod(func) else argnames
+
+
+class PluginManager(object):
+    """Registered plugins and the implementations of every hook.
+
+    ``hooks`` maps hook names to lists of implementations and their argument names. Implementations
+    with arguments this runner does not provide (e.g. ``session`` of pytest) are not called, but listed
+    in ``unsupported``.
+    """
+
+    def __init__(self):
+        self.plugins = []
+        self.hooks = dict((name, []) for name in HOOKS)
+        self.unsupported = []
+
+    def register(self, plugin, name=None):
+        """Register a plugin, replacing the one registered under the same name (e.g. a reloaded conftest.py)."""
+        name = name or getattr(plugin, '__name__', None) or repr(plugin)
+        self.plugins = [(plugin_name, registered) for plugin_name, registered in self.plugins if plugin_name != name]
+        self.plugins.append((name, plugin))
+        self._build()
+
+    def unregister(self, name):
+        self.plugins = [(plugin_name, plugin) for plugin_name, plugin in self.plugins if plugin_name != name]
+        self._build()
+
+    def _build(self):
+        hooks = dict((name, []) for name in HOOKS)
+        unsupported = []
+        for plugin_name, plugin in self.plugins:
+            for hook_name, provided in HOOKS.items():
+                implementation = getattr(plugin, hook_name, None)
+                if not callable(implementation):
+                    continue
+                argnames = _argnames(implementation)
+                if argnames is None or any(argname not in provided for argname in argnames):
+                    unsupported.append((plugin_name, hook_name))
+                    continue
+                hooks[hook_name].append((implementation, argnames))
+
+        # New lists, as the runner keeps references to the lists of the hooks it calls for every test
+        self.hooks = hooks
+        self.unsupported = unsupported
+
+    def call(self, hook_name, **kwargs):
+        """Call the implementations of a hook in order of registration."""
+        for implementation, argnames in self.hooks[hook_name]:
+            implementation(*[kwargs[argname] for argname in argnames])
+
+
+PLUGINS = PluginManager()
+
+
+def load_plugin(name):
+    """Import a module by name and register it as plugin."""
+    __import__(name)
+    module = sys.modules[name]
+    PLUGINS.register(module, name)
+    return module
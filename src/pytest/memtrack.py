@@ -0,0 +1,80 @@
+"""Track the memory retained by tests, to find the ones that leak in long sessions.
+
+Before and after every test and test module, garbage is collected and live
+objects are counted by type name (with ``gc.get_objects``), along with the
+number of loaded modules and, on IronPython, the size of the managed heap.
+The difference is what the test retained: e.g. ``Mock`` objects with their
+recorded calls, patches never restored or values cached by fixtures.
+"""
+from __future__ import print_function
+
+import gc
+import sys
+
+__all__ = []
+
+
+def _managed_heap():
+    """Bytes allocated on the .NET heap after a full collection, or ``None`` outside of IronPython."""
+    if sys.platform != 'cli':
+        return None
+    import System
+    return System.GC.GetTotalMemory(True)
+
+
+class MemoryTracker(object):
+    """Takes snapshots of the memory of the process and computes what was retained between two of them.
+
+    ``modules`` holds the growth of each test module, from before its import to after it was unloaded.
+    """
+
+    def __init__(self, types=5):
+        self.types = types
+        self.modules = dict()
+        try:
+            gc.get_objects()
+            self.count_objects = True
+        except (AttributeError, NotImplementedError):
+            self.count_objects = False
+
+    def snapshot(self):
+        gc.collect()
+        counts = None
+        if self.count_objects:
+            counts = dict()
+            for obj in gc.get_objects():
+                name = type(obj).__name__
+                counts[name] = counts.get(name, 0) + 1
+        return dict(objects=counts, modules=len(sys.modules), bytes=_managed_heap())
+
+    def growth(self, before, after):
+        """What was retained between two snapshots: numbers of objects, modules and bytes, and the types that grew most."""
+        growth = dict(objects=None, types={}, modules=after['modules'] - before['modules'], bytes=None)
+        if after['objects'] is not None:
+            deltas = dict((name, count - before['objects'].get(name, 0)) for name, count in after['objects'].items())
+            for name in before['objects']:
+                deltas.setdefault(name, -before['objects'][name])
+            growth['objects'] = sum(deltas.values())
+            grown = sorted((name for name in deltas if deltas[name] > 0), key=lambda name: (-deltas[name], name))
+            growth['types'] = dict((name, deltas[name]) for name in grown[:self.types])
+        if after['bytes'] is not None:
+            growth['bytes'] = after['bytes'] - before['bytes']
+        return growth
+
+
+def retained(growth):
+    """Measure of the growth to rank tests by: bytes if known, otherwise objects, then modules."""
+    return growth.get('bytes') or growth.get('objects') or 0, growth.get('modules', 0)
+
+
+def format_growth(growth):
+    """Describe a growth in one line, e.g. ``+120 objects (Mock +40, dict +40), +2 modules``."""
+    parts = []
+    if growth.get('bytes') is not None:
+        parts.append('{:+.1f}kB'.format(growth['bytes'] / 1e3))
+    if growth.get('objects') is not None:
+        types = ', '.join('{} {:+d}'.format(name, count)
+                          for name, count in sorted(growth['types'].items(), key=lambda item: (-item[1], item[0])))
+        parts.append('{:+d} objects{}'.format(growth['objects'], ' ({})'.format(types) if types else ''))
+    parts.append('{:+d} modules'.format(growth.get('modules', 0)))
+    return ', '.join(parts)
@@ -1,55 +1,112 @@
 """Add mock and patch functionality in the same minimal, assuming, spirit of this package"""
+import functools
+import sys
+from collections import deque
 from collections import namedtuple
 
 from pytest import fixture
 
-__all__ = ["mocker"]
+__all__ = ["mocker", "patch"]
+
+try:
+    from types import ClassType
+    class_types = (type, ClassType)
+except ImportError:
+    class_types = (type,)
 
 
 MockFuncCall = namedtuple("MockFuncCall", ["args", "kwargs"])
 
 
+def call(*args, **kwargs):
+    """Build an expected call, to compare with :attr:`Mock.call_args_list` or pass to :meth:`Mock.assert_has_calls`."""
+    return MockFuncCall(args, kwargs)
+
+
 class Mock(object):
     """Accepts any call or dot lookup without causing trouble.
 
-    side_effect allows executing callables
+    side_effect allows executing callables, raising an exception or returning the items of an iterable one per call.
     return_value, if set, is returned for any call using the call operator.
     Any dot lookup which comes back empty sets an attribute with the looked-up name with a Mock() instance as value.
+
+    Parameters
+    ----------
+    spec : object or list, optional
+        Type or object (or list of attribute names) the mock stands in for. Looking up an attribute
+        it does not have raises ``AttributeError``, and if it is a type, the mock is an instance of it.
+    side_effect : callable, exception or iterable, optional
+        See :attr:`side_effect`.
+    return_value : object, optional
+        Value returned by calls when there is no ``side_effect``.
+    autospec : bool, optional
+        Also restrict attributes of child mocks to the attributes of ``spec``, recursively.
+    max_calls : int, optional
+        Only record the arguments of the last ``max_calls`` calls, :attr:`call_count` still counts all of them.
+    kwargs
+        Attributes to set on the mock.
     """
 
-    def __init__(self, *_, **kwargs):
-        self.return_value = None
-        self._side_effect = None
-        self._func_calls = []
+    __slots__ = ('__dict__', 'return_value', '_mock_side_effect', '_mock_calls', '_mock_call_count',
+                 '_mock_spec', '_mock_spec_names', '_mock_autospec', '_mock_max_calls')
+
+    def __init__(self, spec=None, side_effect=None, return_value=None, autospec=False, max_calls=None, **kwargs):
+        self.return_value = return_value
+        self._mock_calls = deque(maxlen=max_calls)
+        self._mock_call_count = 0
+        self._mock_max_calls = max_calls
+        self._mock_spec = spec
+        self._mock_autospec = autospec and spec is not None
+        if spec is None:
+            self._mock_spec_names = None
+        elif isinstance(spec, (list, tuple, set, frozenset)):
+            self._mock_spec_names = frozenset(spec)
+        else:
+            self._mock_spec_names = frozenset(dir(spec))
+        self.side_effect = side_effect
 
-        try:
-            side_effect = kwargs.pop("side_effect")
-            self.side_effect = side_effect
-        except KeyError:
-            pass
+        for key, value in kwargs.items():
+            setattr(self, key, value)
 
-        for key_value in kwargs.items():
-            object.__setattr__(self, *key_value)
+    @property
+    def __class__(self):
+        if self._mock_spec is not None and isinstance(self._mock_spec, class_types):
+            return self._mock_spec
+        return type(self)
 
     @property
     def side_effect(self):
-        return self._side_effect
+        return self._mock_side_effect
+
+    @side_effect.setter
+    def side_effect(self, value):
+        # Exceptions are iterable :(
+        if value is not None and not callable(value) and not isinstance(value, BaseException):
+            try:
+                value = iter(value)
+            except TypeError:
+                pass
+        self._mock_side_effect = value
 
     @property
     def call_count(self):
-        return len(self._func_calls)
+        return self._mock_call_count
 
-    @side_effect.setter
-    def side_effect(self, value):
-        self._side_effect = None
-        self._func_calls.clear()
-        try:
-            # Exceptions are iterable :(
-            if not isinstance(self._side_effect, BaseException):
-                self._side_effect = iter(value)
-        except TypeError:
-            pass
-        self._side_effect = self._side_effect or value
+    @property
+    def called(self):
+        return self._mock_call_count > 0
+
+    @property
+    def call_args(self):
+        """Arguments of the last call, ``None`` if the mock has not been called."""
+        if not self._mock_calls:
+            return None
+        return MockFuncCall(*self._mock_calls[-1])
+
+    @property
+    def call_args_list(self):
+        """Arguments of the recorded calls, oldest first."""
+        return [MockFuncCall(*recorded) for recorded in self._mock_calls]
 
     def __call__(self, *args, **kwargs):
         """Calls the next side_effect if set. If not, returns the set return_value (default: None).
@@ -60,23 +117,46 @@ class Mock(object):
             Raised when side_effect is set but no more items are available.
 
         """
-        self._func_calls.append(MockFuncCall(args, kwargs))
-        if self.side_effect:
-            if isinstance(self._side_effect, BaseException):
-                raise self._side_effect
-            if callable(self._side_effect):
-                return self._side_effect(*args, **kwargs)
-            return next(self._side_effect)
-        return self.return_value
-
-    def __getattribute__(self, item):
-        try:
-            value = object.__getattribute__(self, item)
-        except AttributeError:
-            value = Mock()
-            object.__setattr__(self, item, value)
+        self._mock_call_count += 1
+        self._mock_calls.append((args, kwargs))
+
+        side_effect = self._mock_side_effect
+        if side_effect is None:
+            return self.return_value
+        if isinstance(side_effect, BaseException) or isinstance(side_effect, type) and issubclass(side_effect, BaseException):
+            raise side_effect
+        if callable(side_effect):
+            return side_effect(*args, **kwargs)
+        value = next(side_effect)
+        if isinstance(value, BaseException):
+            raise value
         return value
 
+    def __getattr__(self, item):
+        # Only called when normal lookup fails, so set attributes and existing children cost nothing
+        if item.startswith('_mock_') or item.startswith('__') and item.endswith('__'):
+            raise AttributeError(item)
+
+        spec_names = self._mock_spec_names
+        if spec_names is not None and item not in spec_names:
+            raise AttributeError('Mock object has no attribute {!r}'.format(item))
+
+        if self._mock_autospec and not isinstance(self._mock_spec, (list, tuple, set, frozenset)):
+            value = Mock(spec=getattr(self._mock_spec, item), autospec=True, max_calls=self._mock_max_calls)
+        else:
+            value = Mock(max_calls=self._mock_max_calls)
+        self.__dict__[item] = value
+        return value
+
+    def reset_mock(self):
+        """Forget the calls of this mock and of its child mocks, keeping return values and side effects."""
+        self._mock_calls.clear()
+        self._mock_call_count = 0
+        children = list(self.__dict__.values()) + [self.return_value]
+        for value in children:
+            if isinstance(value, Mock) and value is not self:
+                value.reset_mock()
+
     def assert_called_once(self):
         """Asserts if this mock has been called exactly once. If not, an assertion error is raised.
 
@@ -107,7 +187,7 @@ class Mock(object):
             Raised if this mock has not been called.
 
         """
-        return self.call_count > 0
+        assert self.call_count > 0
 
     def assert_called_with(self, *args, **kwargs):
         """Asserts if this mock has been called with the given combination of arguments. If not, an assertion error is raised.
@@ -125,19 +205,226 @@ class Mock(object):
             Raised if this mock's has not been called with the expected arguments.
 
         """
-        is_called_with = any([call.args == args and call.kwargs == kwargs for call in self._func_calls])
-        if not is_called_with:
+        if (args, kwargs) not in self._mock_calls:
             raise AssertionError("Call with args: {} kwargs: {} not found in call list!".format(args, kwargs))
 
+    def assert_has_calls(self, calls, any_order=False):
+        """Asserts if this mock has been called with the given calls. If not, an assertion error is raised.
+
+        Parameters
+        ----------
+        calls : list
+            Expected calls, built with :func:`call`.
+        any_order : bool, optional
+            If ``False`` (default), the calls must be consecutive and in the given order,
+            otherwise they only must all have been made.
+
+        Raises
+        ------
+        AssertionError
+            Raised if this mock's recorded calls do not contain the expected calls.
+
+        """
+        expected = [tuple(expected_call) for expected_call in calls]
+        recorded = list(self._mock_calls)
+
+        if any_order:
+            missing = []
+            for expected_call in expected:
+                if expected_call in recorded:
+                    recorded.remove(expected_call)
+                else:
+                    missing.append(expected_call)
+            if missing:
+                raise AssertionError("Calls {} not found in call list!".format(missing))
+            return
+
+        for start in range(len(recorded) - len(expected) + 1):
+            if recorded[start:start + len(expected)] == expected:
+                return
+        raise AssertionError("Calls {} not found in call list {}!".format(expected, recorded))
+
+
+def create_autospec(spec, **kwargs):
+    """Create a :class:`Mock` whose attributes, and the attributes of its child mocks, are restricted to those of ``spec``."""
+    return Mock(spec=spec, autospec=True, **kwargs)
+
+
+# Module name and attribute path of patch targets already resolved once (see _resolve)
+_RESOLVED_TARGETS = dict()
+
+# Sentinel for patches that replace their target with a new Mock
+DEFAULT = object()
+
+
+def _split_target(target):
+    """Import a dotted path, returns the name of its innermost loaded module and the attributes to look up from it."""
+    components = target.split('.')
+    import_path = components.pop(0)
+    thing = __import__(import_path)
+    module_name, attributes = None, []
+    if sys.modules.get(import_path) is thing:
+        module_name = import_path
+
+    for comp in components:
+        import_path += ".{}".format(comp)
+        try:
+            thing = getattr(thing, comp)
+        except AttributeError:
+            __import__(import_path)
+            thing = getattr(thing, comp)
+        if sys.modules.get(import_path) is thing:
+            module_name, attributes = import_path, []
+        else:
+            attributes.append(comp)
+    return module_name, attributes, thing
+
+
+def _resolve(target):
+    """Import the object at a dotted path.
+
+    Splitting the path into module and attributes (and importing them) is done once per path,
+    later calls look the module up in ``sys.modules``, so they also see modules imported again
+    after being unloaded between test modules.
+    """
+    resolved = _RESOLVED_TARGETS.get(target)
+    if resolved is not None:
+        module_name, attributes = resolved
+        thing = sys.modules.get(module_name)
+        if thing is not None:
+            for attribute in attributes:
+                thing = getattr(thing, attribute)
+            return thing
+
+    module_name, attributes, thing = _split_target(target)
+    if module_name is not None:
+        _RESOLVED_TARGETS[target] = module_name, attributes
+    return thing
+
+
+class _Patch(object):
+    """Patch of an attribute, applied by start() and undone by stop().
+
+    Also works as a context manager, returning the new value, and as a decorator
+    applying the patch for the duration of each call of the decorated function.
+    """
+
+    def __init__(self, get_target, attribute, new=DEFAULT, **kwargs):
+        self.get_target = get_target
+        self.attribute = attribute
+        self.new = new
+        self.kwargs = kwargs
+        self.target = None
+        self.original = None
+        self.local = False
+
+    def start(self):
+        target = self.get_target()
+        try:
+            # Keep the raw attribute (e.g. a staticmethod), if it is not inherited
+            self.original = vars(target)[self.attribute]
+            self.local = True
+        except (KeyError, TypeError):
+            self.original = getattr(target, self.attribute)
+            self.local = False
+
+        new = Mock(**self.kwargs) if self.new is DEFAULT else self.new
+        setattr(target, self.attribute, new)
+        self.target = target
+        return new
+
+    def stop(self):
+        target, self.target = self.target, None
+        if target is None:
+            return
+        if not self.local:
+            try:
+                delattr(target, self.attribute)
+                return
+            except (AttributeError, TypeError):
+                pass
+        setattr(target, self.attribute, self.original)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def patched(*args, **kwargs):
+            with self:
+                return func(*args, **kwargs)
+
+        # Fixtures are resolved from the arguments of the decorated function
+        patched.__wrapped__ = func
+        return patched
+
+
+class _PatchDict(_Patch):
+    """Patch of the items of a dictionary, restored to their original values by stop()."""
+
+    def __init__(self, in_dict, values=(), clear=False, **kwargs):
+        self.in_dict = in_dict
+        self.values = dict(values, **kwargs)
+        self.clear = clear
+        self.target = None
+        self.original = None
+
+    def start(self):
+        in_dict = _resolve(self.in_dict) if isinstance(self.in_dict, str) else self.in_dict
+        self.original = in_dict.copy()
+        if self.clear:
+            in_dict.clear()
+        in_dict.update(self.values)
+        self.target = in_dict
+        return in_dict
+
+    def stop(self):
+        in_dict, self.target = self.target, None
+        if in_dict is None:
+            return
+        in_dict.clear()
+        in_dict.update(self.original)
+
+
+def patch(target, new=DEFAULT, **kwargs):
+    """Patch the attribute at a dotted path, replacing it with ``new`` or a Mock() built with ``kwargs``.
+
+    Returns an unstarted patch, to use as a context manager or a decorator.
+
+    >>> with patch("path.to.module.Type.attribute", return_value=10) as mocked:
+    ...     pass
+    """
+    if not isinstance(target, str):
+        raise TypeError("target is expected to be a string")
+    target_path, attribute = target.rsplit(".", 1)
+    return _Patch(lambda: _resolve(target_path), attribute, new, **kwargs)
+
+
+def _patch_object(target, attribute, new=DEFAULT, **kwargs):
+    """Patch an attribute of an object, replacing it with ``new`` or a Mock() built with ``kwargs``."""
+    return _Patch(lambda: target, attribute, new, **kwargs)
+
+
+def _patch_dict(in_dict, values=(), clear=False, **kwargs):
+    """Patch items of a dictionary (or of the dictionary at a dotted path), optionally clearing it first."""
+    return _PatchDict(in_dict, values, clear, **kwargs)
+
+
+patch.object = _patch_object
+patch.dict = _patch_dict
+
 
 class Patcher(object):
     """
     Patches attributes/methods of types, replacing them with a Mock() object.
+
+    Patches are applied right away and kept on a stack, stop() undoes all of them in reverse order.
     """
     def __init__(self):
-        self.original = None
-        self.target = None
-        self.attribute_name = None
+        self._patches = []
 
     def __call__(self, *args, **kwargs):
         """
@@ -145,52 +432,51 @@ class Patcher(object):
         ----------
         target : str
             The target attribute or method to mock. A complete path to target including package and module.
+        new : object, optional
+            Value to patch the target with, instead of a Mock().
+        kwargs
+            Arguments of the Mock() replacing the target, e.g. ``return_value`` or ``spec``.
+
+        Returns
+        -------
+        object
+            The value the target is patched with.
 
         >>> patcher = Patcher()
         >>> patcher("path.to.module.Type.attribute")
         """
         if "target" in kwargs:
-            target = kwargs["target"]
+            target = kwargs.pop("target")
         elif len(args) > 0:
-            target = args[0]
+            target, args = args[0], args[1:]
         else:
             raise ValueError("Expected at least argument `target`")
 
-        if not isinstance(target, str):
-            raise TypeError("target is expected to be a string")
-        self._patch_target(target)
-
-    def _patch_target(self, target):
-        target_path, self.attribute_name = target.rsplit(".", 1)
-        self.target = self._importer(target_path)
-        self.original = getattr(self.target, self.attribute_name)
-        setattr(self.target, self.attribute_name, Mock())
+        return self._start(patch(target, *args, **kwargs))
 
-    @staticmethod
-    def _dot_lookup(thing, comp, import_path):
-        try:
-            return getattr(thing, comp)
-        except AttributeError:
-            __import__(import_path)
-            return getattr(thing, comp)
+    def object(self, target, attribute, new=DEFAULT, **kwargs):
+        """Patch an attribute of an object, replacing it with ``new`` or a Mock() built with ``kwargs``."""
+        return self._start(_patch_object(target, attribute, new, **kwargs))
 
-    @staticmethod
-    def _importer(target):
-        components = target.split('.')
-        import_path = components.pop(0)
-        thing = __import__(import_path)
+    def dict(self, in_dict, values=(), clear=False, **kwargs):
+        """Patch items of a dictionary (or of the dictionary at a dotted path), optionally clearing it first."""
+        return self._start(_patch_dict(in_dict, values, clear, **kwargs))
 
-        for comp in components:
-            import_path += ".{}".format(comp)
-            thing = Patcher._dot_lookup(thing, comp, import_path)
-        return thing
+    def _start(self, a_patch):
+        new = a_patch.start()
+        self._patches.append(a_patch)
+        return new
 
     def stop(self):
-        """Restore the patched attribute to its original state"""
-        if self.target:
-            setattr(self.target, self.attribute_name, self.original)
-            del self.target
-            del self.original
+        """Restore all patched attributes to their original state, the last patched first"""
+        first_error = None
+        while self._patches:
+            try:
+                self._patches.pop().stop()
+            except Exception as error:
+                first_error = first_error or error
+        if first_error is not None:
+            raise first_error
 
 
 class Mocker(object):
@@ -201,6 +487,8 @@ class Mocker(object):
     def __init__(self):
         self.patch = Patcher()
         self.Mock = Mock
+        self.create_autospec = create_autospec
+        self.call = call
 
     def stop(self):
         """Reset all patched attributes"""
@@ -209,4 +497,6 @@ class Mocker(object):
 
 @fixture
 def mocker():
-    return Mocker()
+    mocker = Mocker()
+    yield mocker
+    mocker.stop()
@@ -0,0 +1,144 @@
+"""Sampling profiler for tests, writing collapsed stacks ready for flame graphs.
+
+IronPython has no usable ``cProfile``, so instead of tracing every call, a
+daemon thread samples the stack of the running test with ``sys._current_frames``
+at a fixed interval. Samples are counted per collapsed stack (``root;...;leaf``)
+and per test, with the phase (``setup``, ``call`` or ``teardown``) as root frame.
+"""
+from __future__ import print_function
+
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    from thread import get_ident
+except ImportError:
+    from _thread import get_ident
+
+__all__ = []
+
+
+def frame_label(code):
+    """Label of a frame in collapsed stacks: function name, file name and first line."""
+    return '{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class SamplingProfiler(object):
+    """Samples the stack of the thread running a test, below the frame of ``root_code``.
+
+    ``sample(phase)`` starts (or continues) sampling the calling thread and ``collect()``
+    stops it and returns the counts of the collapsed stacks sampled since the last collect.
+    """
+
+    def __init__(self, root_code, interval=0.005):
+        self.root_code = root_code
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.thread = None
+        self.phase = None
+        self.ident = None
+        self.samples = dict()
+        self.labels = dict()
+
+    @staticmethod
+    def is_supported():
+        try:
+            sys._current_frames()
+        except (AttributeError, NotImplementedError):
+            return False
+        return True
+
+    def sample(self, phase):
+        """Sample the calling thread, with ``phase`` as root frame of its stacks."""
+        with self.condition:
+            self.phase = phase
+            self.ident = get_ident()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._sample)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+    def collect(self):
+        """Stop sampling and return the counts of the stacks sampled since the last collect."""
+        with self.condition:
+            self.phase = None
+            samples, self.samples = self.samples, dict()
+            return samples
+
+    def _label(self, code):
+        label = self.labels.get(code)
+        if label is None:
+            label = self.labels[code] = frame_label(code)
+        return label
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None and frame.f_code is not self.root_code:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(self.phase)
+        labels.reverse()
+        return ';'.join(labels)
+
+    def _sample(self):
+        while True:
+            with self.condition:
+                while self.phase is None:
+                    self.condition.wait()
+            time.sleep(self.interval)
+
+            with self.condition:
+                if self.phase is None:
+                    continue
+                frame = sys._current_frames().get(self.ident)
+                if frame is not None:
+                    stack = self._stack(frame)
+                    self.samples[stack] = self.samples.get(stack, 0) + 1
+                del frame
+
+
+class ProfileReport(object):
+    """Writes the samples of every test to ``<directory>/<test key>.collapsed`` and all of them,
+    with the test key as root frame, to ``<directory>/all.collapsed``, while tests finish.
+
+    Also counts samples per function, where it ran itself (``own``) or in anything it called (``total``).
+    """
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.all = open(os.path.join(directory, 'all.collapsed'), 'w')
+        self.own = dict()
+        self.total = dict()
+        self.count = 0
+
+    def add(self, key, samples):
+        if not samples:
+            return
+        filename = re.sub(r'[^\w.\-\[\]]+', '_', key).lstrip('._') + '.collapsed'
+        with open(os.path.join(self.directory, filename), 'w') as f:
+            for stack, count in sorted(samples.items()):
+                f.write('{} {}\n'.format(stack, count))
+                self.all.write('{};{} {}\n'.format(key, stack, count))
+
+                frames = stack.split(';')[1:]
+                self.count += count
+                if frames:
+                    self.own[frames[-1]] = self.own.get(frames[-1], 0) + count
+                for label in set(frames):
+                    self.total[label] = self.total.get(label, 0) + count
+        self.all.flush()
+
+    def hot_functions(self, top):
+        """The ``top`` functions with the most samples of their own, with their own and total samples."""
+        functions = sorted(self.own, key=lambda label: (-self.own[label], label))[:top]
+        return [(label, self.own[label], self.total[label]) for label in functions]
+
+    def close(self):
+        self.all.close()
@@ -1,38 +1,81 @@
 """Emulate pytest API."""
 from __future__ import print_function
 
-import argparse
 import contextlib
-import itertools
+from collections import namedtuple
 
 FIXTURES = dict()
 
-__all__ = ['fixture', 'mark', 'parametrize', 'raises', 'skip']
+# Fixture scopes, from the widest to the narrowest
+SCOPES = ('session', 'module', 'function')
 
+__all__ = ['fixture', 'mark', 'param', 'parametrize', 'raises', 'skip']
 
-def fixture(func):
-    FIXTURES[func.__name__] = func
-    return func
 
+def fixture(func=None, scope='function'):
+    """Register a fixture, either as ``@fixture`` or as ``@fixture(scope='module')``.
+
+    The fixture value is created once per scope (``function``, ``module`` or ``session``).
+    Generator fixtures yield their value and run the code after the ``yield`` as teardown
+    when the scope ends.
+    """
+    if scope not in SCOPES:
+        raise ValueError('Unknown fixture scope "{}", expected one of {}'.format(scope, ', '.join(SCOPES)))
+
+    def decorator_fixture(func):
+        func._fixture_scope = scope
+        FIXTURES[func.__name__] = func
+        return func
+
+    if func is not None:
+        return decorator_fixture(func)
+    return decorator_fixture
+
+
+ParameterSet = namedtuple('ParameterSet', ['values', 'marks', 'id'])
+
+
+def param(*values, **kwargs):
+    """Wrap the values of one parametrized case, to give it ``marks`` (e.g. ``marks=mark.skip``) and an ``id``."""
+    marks = kwargs.pop('marks', ())
+    if not isinstance(marks, (list, tuple)):
+        marks = (marks,)
+    return ParameterSet(values, tuple(marks), kwargs.pop('id', None))
+
+
+def parametrize(argnames='', argvalues=None, ids=None, indirect=False):
+    """Run a test once per value (or tuple of values, for several comma-separated argnames).
+
+    Stacked ``parametrize`` decorators run the test for every combination of their values.
+    Cases are expanded lazily while tests run: ``argvalues`` can be a list, or a generator
+    function called at each expansion, so that large grids are never held in memory.
+
+    Parameters
+    ----------
+    argnames : str or list
+        Name, or comma-separated names, of the test arguments.
+    argvalues : iterable or callable
+        Values of the arguments, or a callable returning an iterable of them.
+        Values wrapped in :func:`param` can have their own marks and id.
+    ids : list or callable, optional
+        Ids of the cases, used in test keys instead of case numbers, or a callable building an id from a value.
+    indirect : bool or list, optional
+        Names of the arguments (``True`` for all) passed to the fixture of the same name,
+        as ``request.param``, instead of to the test.
+    """
+    names = [name.strip() for name in argnames.split(',')] if isinstance(argnames, str) else list(argnames)
+    if indirect is True:
+        indirect = names
+    if not callable(argvalues) and iter(argvalues) is argvalues:
+        # One-shot iterators could not be expanded again, e.g. for collection and then for the run
+        argvalues = list(argvalues)
+    layer = dict(argnames=names, argvalues=argvalues, ids=ids, indirect=frozenset(indirect or ()))
 
-def parametrize(argnames='', argvalues=None):
     def decorator_param(func):
-        # If the argnames are single arguments, we assume it is a stacked parametrize decorator
-        if isinstance(argnames, str) and ',' not in argnames:
-            if not hasattr(func, '_stacked_parametrized_names'):
-                func._stacked_parametrized_names = []
-                func._stacked_parametrized_values = []
-            func._stacked_parametrized_names.append(argnames)
-            func._stacked_parametrized_values.append(argvalues)
-            if len(func._stacked_parametrized_names) == 1:
-                func._parametrized_arguments = dict(argnames=argnames, argvalues=argvalues)
-            else:
-                func._parametrized_arguments = dict(
-                    argnames=func._stacked_parametrized_names,
-                    argvalues=list(itertools.product(*func._stacked_parametrized_values))
-                )
-        else:
-            func._parametrized_arguments = dict(argnames=argnames, argvalues=argvalues)
+        # Stacked decorators are applied bottom-up, and the bottom one varies slowest
+        if not hasattr(func, '_parametrize_layers'):
+            func._parametrize_layers = []
+        func._parametrize_layers.append(layer)
         return func
 
     return decorator_param
@@ -49,6 +92,15 @@ def skip(test_method=None, reason=None):
         return wrapped
 
 
+def timeout(seconds):
+    """Fail the test if it takes longer than the given number of seconds, overriding the ``timeout`` option."""
+    def decorator_timeout(func):
+        func._timeout = seconds
+        return func
+
+    return decorator_timeout
+
+
 @contextlib.contextmanager
 def raises(exception_type):
     did_raise = False
@@ -62,4 +114,37 @@ def raises(exception_type):
             raise AssertionError('Did not raise exception of type {}'.format(exception_type))
 
 
-mark = argparse.Namespace(parametrize=parametrize, skip=skip)
+class MarkDecorator(object):
+    """Custom mark, usable as ``@mark.name`` or ``@mark.name(*args)``, recorded in the ``_marks`` of the test function."""
+
+    def __init__(self, name, args=()):
+        self.name = name
+        self.args = args
+
+    def __call__(self, *args):
+        if len(args) == 1 and callable(args[0]) and not self.args:
+            return self.apply(args[0])
+        return MarkDecorator(self.name, args)
+
+    def apply(self, target):
+        """Record the mark in the ``_marks`` of a test function, or of the marks of a :func:`param` set."""
+        if not hasattr(target, '_marks'):
+            target._marks = dict()
+        target._marks[self.name] = self.args
+        return target
+
+
+class MarkGenerator(object):
+    """Namespace of marks: ``parametrize``, ``skip``, ``timeout`` and any custom mark, e.g. ``mark.slow``."""
+
+    parametrize = staticmethod(parametrize)
+    skip = staticmethod(skip)
+    timeout = staticmethod(timeout)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return MarkDecorator(name)
+
+
+mark = MarkGenerator()
@@ -0,0 +1,183 @@
+"""Machine-readable reporters, writing one record per test result as it finishes.
+
+Records are buffered and flushed to disk regularly. Files stay valid if the
+process is killed mid-run: JSON Lines are only ever written as whole lines,
+and the JUnit XML is closed after every flush (and reopened by the next one).
+"""
+from __future__ import print_function
+
+import io
+import json
+import os
+import re
+import time
+from xml.sax.saxutils import escape
+from xml.sax.saxutils import quoteattr
+
+__all__ = []
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+OUTCOMES = {'.': 'passed', 'F': 'failed', 's': 'skipped'}
+
+# Characters that are not allowed in XML 1.0 documents
+_INVALID_XML = re.compile(u'[\\x00-\\x08\\x0b\\x0c\\x0e-\\x1f]')
+
+
+def _text(value):
+    if value is None:
+        return u''
+    if not isinstance(value, text_type):
+        try:
+            value = str(value)
+        except UnicodeError:
+            # E.g. an exception with a unicode message on Python 2
+            value = text_type(value)
+        if not isinstance(value, text_type):
+            value = value.decode('utf-8', 'replace')
+    return value
+
+
+def _clean(text):
+    return _INVALID_XML.sub(u'\ufffd', text)
+
+
+def _captured(result):
+    out = result.get('out')
+    if isinstance(out, (list, tuple)) and len(out) == 2:
+        return _text(out[0]), _text(out[1])
+    return u'', u''
+
+
+class StreamingReporter(object):
+    """Base class of reporters which write buffered records to a file."""
+
+    def __init__(self, path, flush_interval=1.0, flush_count=100):
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_count = flush_count
+        self.buffer = []
+        self.last_flush = time.time()
+        self.file = io.open(path, 'w+b')
+
+    def add(self, result):
+        """Add the result of a test, writing it to disk if the buffer is due."""
+        self.buffer.append(self.format(result))
+        if len(self.buffer) >= self.flush_count or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def format(self, result):
+        raise NotImplementedError
+
+    def flush(self):
+        self.write(u''.join(self.buffer).encode('utf-8'))
+        self.buffer = []
+        self.file.flush()
+        self.last_flush = time.time()
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self, duration):
+        """Write all remaining records and close the file."""
+        self.flush()
+        self.file.close()
+
+
+class JSONLinesReporter(StreamingReporter):
+    """Writes one JSON object per line and test result, followed by a session record."""
+
+    def format(self, result):
+        stdout, stderr = _captured(result)
+        record = dict(
+            type='result',
+            key=_text(result['key']),
+            module=_text(result['test_module']),
+            test=_text(result['test_method']),
+            outcome=OUTCOMES.get(result['result'], result['result']),
+            duration=result.get('duration', 0.0),
+            durations=result.get('durations', {}),
+        )
+        if 'memory' in result:
+            record['memory'] = result['memory']
+        if result['result'] == 'F':
+            record['message'] = _text(result.get('exception_message'))
+            record['longrepr'] = _text(result.get('exception'))
+            record['stdout'] = stdout
+            record['stderr'] = stderr
+        return _text(json.dumps(record)) + u'\n'
+
+    def close(self, duration):
+        self.buffer.append(_text(json.dumps(dict(type='session', duration=duration))) + u'\n')
+        super(JSONLinesReporter, self).close(duration)
+
+
+class JUnitXMLReporter(StreamingReporter):
+    """Writes a JUnit XML report which is valid after every flush."""
+
+    # Room reserved for the attributes of <testsuite>, which are rewritten in place
+    HEADER_SIZE = 256
+
+    def __init__(self, path, **kwargs):
+        super(JUnitXMLReporter, self).__init__(path, **kwargs)
+        self.counts = dict(tests=0, failures=0, skipped=0)
+        self.start_time = time.time()
+        self.file.write(b'<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n')
+        self.header_position = self.file.tell()
+        self.position = self.header_position + self.HEADER_SIZE
+        self.flush()
+
+    def format(self, result):
+        self.counts['tests'] += 1
+        if result['result'] == 'F':
+            self.counts['failures'] += 1
+        elif result['result'] == 's':
+            self.counts['skipped'] += 1
+
+        module, _, name = _text(result['key']).partition(u'::')
+        classname = os.path.splitext(module.replace(u'\\', u'/').lstrip(u'./'))[0].replace(u'/', u'.')
+        xml = u'  <testcase classname={} name={} time="{:.3f}"'.format(
+            quoteattr(_clean(classname)), quoteattr(_clean(name)), result.get('duration', 0.0))
+
+        if result['result'] == '.':
+            return xml + u'/>\n'
+
+        xml += u'>\n'
+        if result['result'] == 's':
+            xml += u'    <skipped/>\n'
+        else:
+            stdout, stderr = _captured(result)
+            xml += u'    <failure message={}>{}</failure>\n'.format(
+                quoteattr(_clean(_text(result.get('exception_message')))), escape(_clean(_text(result.get('exception')))))
+            if stdout:
+                xml += u'    <system-out>{}</system-out>\n'.format(escape(_clean(stdout)))
+            if stderr:
+                xml += u'    <system-err>{}</system-err>\n'.format(escape(_clean(stderr)))
+        return xml + u'  </testcase>\n'
+
+    def header(self, duration):
+        header = u'<testsuite name="pytest" tests="{tests}" failures="{failures}" skipped="{skipped}" errors="0"'.format(**self.counts)
+        header += u' time="{:.3f}"'.format(duration)
+        return header.encode('utf-8').ljust(self.HEADER_SIZE - 2) + b'>\n'
+
+    def write(self, data):
+        # Overwrite the closing tags of the previous flush, then close the document again
+        self.file.seek(self.position)
+        self.file.write(data)
+        self.position = self.file.tell()
+        self.file.write(b'</testsuite>\n</testsuites>\n')
+        self.file.truncate()
+        self.file.seek(self.header_position)
+        self.file.write(self.header(time.time() - self.start_time))
+
+    def close(self, duration):
+        self.flush()
+        self.file.seek(self.header_position)
+        self.file.write(self.header(duration))
+        self.file.close()
@@ -0,0 +1,69 @@
+"""Split test modules into shards of about the same duration, to run on several machines.
+
+Test modules are the unit of sharding, as they are of distribution to workers.
+Their weight is the sum of the durations their tests took in the last run (from
+the cache), and modules without history weigh the average of the others. The
+modules are packed greedily, longest first, into the least loaded shard. The
+assignment only depends on the list of modules and the cached durations, so
+every machine computes the same shards given the same cache.
+"""
+from __future__ import print_function
+
+__all__ = []
+
+
+def parse_shard(shard):
+    """Parse ``i/N`` (or an ``(i, N)`` tuple) into a 1-based shard index and a shard count.
+
+    Raises
+    ------
+    ValueError
+        Raised if the shard is not of the form ``i/N`` with ``1 <= i <= N``.
+    """
+    try:
+        index, count = shard.split('/') if isinstance(shard, str) else shard
+        index, count = int(index), int(count)
+    except (TypeError, ValueError):
+        raise ValueError('Shard "{}" is not of the form i/N'.format(shard))
+    if not 1 <= index <= count:
+        raise ValueError('Shard index {} is not between 1 and {}'.format(index, count))
+    return index, count
+
+
+def module_weights(test_modules, durations):
+    """Estimate the duration of each test module from the cached durations of its tests."""
+    weights = dict((test_module, 0.0) for test_module in test_modules)
+    known = set()
+    for key, duration in durations.items():
+        test_module = key.split('::')[0]
+        if test_module in weights:
+            weights[test_module] += duration
+            known.add(test_module)
+
+    default = sum(weights[test_module] for test_module in known) / len(known) if known else 1.0
+    for test_module in weights:
+        if test_module not in known:
+            weights[test_module] = default
+    return weights
+
+
+def assign_shards(test_modules, count, durations):
+    """Pack test modules into ``count`` shards of similar estimated duration.
+
+    Returns
+    -------
+    list
+        The test modules of each shard, in their original order, and the estimated duration of each shard.
+    """
+    weights = module_weights(test_modules, durations)
+    loads = [0.0] * count
+    shard_of = dict()
+    for test_module in sorted(test_modules, key=lambda test_module: (-weights[test_module], test_module)):
+        shard = loads.index(min(loads))
+        shard_of[test_module] = shard
+        loads[shard] += weights[test_module]
+
+    shards = [[] for _ in range(count)]
+    for test_module in test_modules:
+        shards[shard_of[test_module]].append(test_module)
+    return shards, loads
@@ -0,0 +1,115 @@
+"""Progress of the test session on the terminal, buffered to keep writes few.
+
+Writing to the console of some hosts (e.g. Rhino or Grasshopper) is slow enough
+that a write per test shows in the duration of the session. The reporter keeps
+what it is given in a buffer, and writes it to the stream at most once every
+``flush_interval`` seconds, and when asked to.
+"""
+from __future__ import print_function
+
+import sys
+import time
+from contextlib import contextmanager
+
+__all__ = []
+
+# Seconds between two writes to the terminal
+FLUSH_INTERVAL = 0.1
+
+# Width of lines, which progress is aligned to
+WIDTH = 80
+
+OUTCOMES = {'.': 'PASSED', 'F': 'FAILED', 's': 'SKIPPED'}
+
+
+class TerminalReporter(object):
+    """Reports the result of every test, by ``verbosity``.
+
+    * ``-1`` (quiet): one character per test, on a single line.
+    * ``0``: a line per test module with one character per test.
+    * ``1`` (verbose): a line per test with its key and outcome.
+
+    With ``progress``, lines end with the percentage of the ``modules`` run so far (including the
+    one running, for lines of tests).
+    """
+
+    def __init__(self, stream=None, verbosity=0, progress=False, modules=0, flush_interval=FLUSH_INTERVAL):
+        self.stream = stream or sys.stdout
+        self.encoding = getattr(self.stream, 'encoding', None)
+        self.verbosity = verbosity
+        self.progress = progress
+        self.modules = modules
+        self.flush_interval = flush_interval
+        self.started_modules = 0
+        self.finished_modules = 0
+        self.buffer = []
+        self.column = 0
+        self.last_flush = time.time()
+
+    def write(self, text):
+        self.buffer.append(text)
+        newline = text.rfind('\n')
+        self.column = self.column + len(text) if newline < 0 else len(text) - newline - 1
+        if time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(''.join(self.buffer))
+            self.buffer = []
+        self.stream.flush()
+        self.last_flush = time.time()
+
+    def line(self, text=''):
+        if self.column:
+            self.write('\n')
+        self.write(text + '\n')
+
+    def _progress(self, modules):
+        if not self.progress:
+            return ''
+        percentage = 100 * modules // self.modules if self.modules else 100
+        return '[{:3d}%]'.format(percentage).rjust(max(WIDTH - self.column, 7))
+
+    def module_start(self, test_module):
+        self.started_modules += 1
+        if self.verbosity == 0:
+            self.write('{} '.format(test_module))
+        # Show what ran so far and which module runs, however long its import or first test take
+        self.flush()
+
+    def test_result(self, result):
+        if self.verbosity > 0:
+            self.write('{} {}'.format(result['key'], OUTCOMES.get(result['result'], result['result'])))
+            self.write('{}\n'.format(self._progress(self.started_modules)))
+        else:
+            self.write(result['result'])
+
+    def module_end(self):
+        self.finished_modules += 1
+        if self.verbosity == 0:
+            self.write('{}\n'.format(self._progress(self.finished_modules)))
+        elif self.verbosity < 0 and self.progress and self.column >= WIDTH - 7:
+            self.write('{}\n'.format(self._progress(self.finished_modules)))
+
+    def session_end(self):
+        if self.verbosity < 0 and self.column:
+            self.write('{}\n'.format(self._progress(self.finished_modules)))
+        self.flush()
+
+    def __getattr__(self, name):
+        # Stand in for the stream while redirected (e.g. ``isatty`` or ``fileno``)
+        if name == 'stream':
+            raise AttributeError(name)
+        return getattr(self.stream, name)
+
+    @contextmanager
+    def redirect(self):
+        """Buffer whatever is printed to ``sys.stdout`` meanwhile, in order with the results."""
+        stdout = sys.stdout
+        sys.stdout = self
+        try:
+            yield self
+        finally:
+            sys.stdout = stdout
+            self.flush()
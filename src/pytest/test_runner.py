@@ -2,44 +2,230 @@ from __future__ import print_function
 
 import contextlib
 import fnmatch
-import imp
 import os
 import random
 import sys
+import tempfile
 import time
 import traceback
 import types
+import zlib
+from collections import namedtuple
+from timeit import default_timer as timer
 
-from StringIO import StringIO
+from .assertion import explain_assertion
+from .benchmark import BENCHMARK_STATS
+from .benchmark import compare
+from .benchmark import format_time
+from .benchmark import load_baseline
+from .benchmark import save_benchmarks
+from .cache import CACHE_DIR
+from .cache import Cache
+from .collection import StaticIndex
+from .collection import compile_selection
+from .collection import select_tests
+from .dependencies import changed_modules
+from .dependencies import fingerprints
+from .dependencies import module_dependencies
+from .dependencies import source_files
+from .fixtures import FIXTURE_SCOPES
+from .fixtures import build_kwargs
+from .fixtures import fixture_lookup
+from .fixtures import load_conftest
+from .fixtures import load_module
+from .fixtures import resolve_fixtures
+from .hooks import PLUGINS
+from .hooks import load_plugin
+from .memtrack import MemoryTracker
+from .memtrack import format_growth
+from .memtrack import retained
+from .profiling import ProfileReport
+from .profiling import SamplingProfiler
+from .pytest import MarkDecorator
+from .pytest import ParameterSet
+from .reporting import JSONLinesReporter
+from .reporting import JUnitXMLReporter
+from .sharding import assign_shards
+from .sharding import parse_shard
+from .terminal import FLUSH_INTERVAL
+from .terminal import TerminalReporter
+from .timeout import Watchdog
 
-from .pytest import FIXTURES
+# Calls to load_fake_module(), replayed on worker interpreters
+FAKE_MODULES = []
 
-__all__ = ['discover_tests', 'load_fake_module', 'run']
+# Captured output is kept in memory up to this size, then spooled to a temporary file
+CAPTURE_SPOOL_SIZE = 1024 * 1024
 
+# Captured output of a failed test shown in the report, split between its head and tail
+CAPTURE_LIMIT = 64 * 1024
+
+try:
+    text_type = unicode
+except NameError:
+    text_type = str
+
+# Directories never searched for tests
+NORECURSEDIRS = ['.*', '*.egg', '_darcs', 'build', 'CVS', 'dist', 'node_modules', 'venv', '{arch}', '__pycache__']
+
+__all__ = ['discover_tests', 'load_fake_module', 'run', 'NORECURSEDIRS']
+
+
+def _parent_conftests(directory):
+    """List conftest.py files from the current directory down to the given directory."""
+    conftests = []
+    directory = os.path.abspath(directory)
+    cwd = os.getcwd()
+    while directory == cwd or directory.startswith(os.path.join(cwd, '')):
+        conftest = os.path.join(directory, 'conftest.py')
+        if os.path.isfile(conftest):
+            conftests.insert(0, conftest)
+        if directory == cwd:
+            break
+        directory = os.path.dirname(directory)
+    return conftests
+
+
+def _list_directory(root, pattern, norecursedirs, collection):
+    """List the subdirectories, test modules and whether there is a conftest.py in a directory.
+
+    The listing is reused from the collection cache as long as the directory's mtime does not change.
+    """
+    try:
+        mtime = os.stat(root).st_mtime
+    except OSError:
+        return [], [], False
+
+    if collection is not None:
+        entry = collection.get(root)
+        if entry and entry[0] == mtime:
+            return entry[1], entry[2], entry[3]
+
+    dirnames = []
+    filenames = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            if not os.path.islink(path) and not any(fnmatch.fnmatch(name, norecursedir) for norecursedir in norecursedirs):
+                dirnames.append(name)
+        else:
+            filenames.append(name)
+    test_filenames = fnmatch.filter(filenames, pattern)
+    has_conftest = 'conftest.py' in filenames
+
+    # Entries modified just now are not cached, a change within the mtime resolution would go unnoticed
+    if collection is not None and time.time() - mtime > 2:
+        collection[root] = [mtime, dirnames, test_filenames, has_conftest]
+    return dirnames, test_filenames, has_conftest
+
+
+def discover_tests(directory, pattern, conftests=None, norecursedirs=None, collection=None):
+    """Yield test modules in a directory (or the file itself).
+
+    If a ``conftests`` list is given, the conftest.py files that apply to the
+    discovered test modules are appended to it, parents before children.
+    Subdirectories matching any of the ``norecursedirs`` patterns (by default
+    :data:`NORECURSEDIRS`) are not searched. If a ``collection`` dictionary is
+    given, it is used as cache of directory listings and updated in place.
+    """
+    if norecursedirs is None:
+        norecursedirs = NORECURSEDIRS
 
-def discover_tests(directory, pattern):
     if os.path.isfile(directory):
+        if conftests is not None:
+            conftests.extend(_parent_conftests(os.path.dirname(directory)))
         yield directory
     else:
-        for root, _dirnames, filenames in os.walk(directory):
-            for filename in fnmatch.filter(filenames, pattern):
+        if conftests is not None:
+            conftests.extend(_parent_conftests(os.path.dirname(os.path.abspath(directory))))
+        roots = [directory]
+        while roots:
+            root = roots.pop()
+            dirnames, test_filenames, has_conftest = _list_directory(root, pattern, norecursedirs, collection)
+            if conftests is not None and has_conftest:
+                conftests.append(os.path.join(root, 'conftest.py'))
+            for filename in test_filenames:
                 yield os.path.join(root, filename)
+            roots.extend(os.path.join(root, dirname) for dirname in reversed(dirnames))
+
+
+class SpooledCapture(object):
+    """File-like object capturing a stream in memory, spooled to a temporary file past ``max_memory`` bytes.
+
+    If ``tee`` is given, everything written is also passed on to it (e.g. the real stdout).
+    """
+
+    encoding = 'utf-8'
+
+    def __init__(self, tee=None, max_memory=CAPTURE_SPOOL_SIZE):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.tee = tee
+        self.size = 0
+
+    def write(self, data):
+        encoded = data.encode('utf-8') if isinstance(data, text_type) else data
+        self.file.write(encoded)
+        self.size += len(encoded)
+        if self.tee is not None:
+            self.tee.write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if self.tee is not None:
+            self.tee.flush()
+
+    def isatty(self):
+        return False
+
+    def getvalue(self, limit=None):
+        """Return the captured output, only its head and tail if it is longer than ``limit`` bytes."""
+        self.file.seek(0)
+        if limit is None or self.size <= limit:
+            data = self.file.read()
+        else:
+            head_size = limit // 2
+            tail_size = limit - head_size
+            head = self.file.read(head_size)
+            self.file.seek(self.size - tail_size)
+            tail = self.file.read()
+            marker = '\n... {} bytes truncated ...\n'.format(self.size - head_size - tail_size)
+            data = head + marker.encode('utf-8') + tail
+        if bytes is not str:
+            data = data.decode('utf-8', 'replace')
+        return data
+
+    def close(self):
+        self.file.close()
 
 
 @contextlib.contextmanager
-def capture(enable=True):
-    if not enable:
+def capture(mode='sys', limit=CAPTURE_LIMIT):
+    """Capture stdout and stderr while running a test.
+
+    Modes are ``sys`` (capture), ``tee-sys`` (capture and print live) and ``no``
+    (do not capture, ``True`` and ``False`` stand for ``sys`` and ``no``).
+    Yields a list of both streams, replaced by their (head and tail of at most
+    ``limit`` bytes of) captured output on exit.
+    """
+    if mode is True:
+        mode = 'sys'
+    if not mode or mode == 'no':
         yield sys.stdout
     else:
         oldout, olderr = sys.stdout, sys.stderr
+        tee = mode == 'tee-sys'
+        out = [SpooledCapture(oldout if tee else None), SpooledCapture(olderr if tee else None)]
         try:
-            out = [StringIO(), StringIO()]
             sys.stdout, sys.stderr = out
             yield out
         finally:
             sys.stdout, sys.stderr = oldout, olderr
-            out[0] = out[0].getvalue()
-            out[1] = out[1].getvalue()
+            for i, stream in enumerate(out):
+                out[i] = stream.getvalue(limit)
+                stream.close()
 
 
 def print_title(title, sep='='):
@@ -47,6 +233,58 @@ def print_title(title, sep='='):
     print(sep * size, title, sep * size)
 
 
+def print_durations(timings, count, threshold=0.005):
+    """Print the slowest ``(duration, phase, key)`` timings, all of them if count is ``0``."""
+    timings = sorted(timings, reverse=True)
+    print_title('slowest {}durations'.format('{} '.format(count) if count else ''))
+    shown = timings[:count] if count else timings
+    hidden = 0
+    for duration, phase, key in shown:
+        if duration < threshold:
+            hidden += 1
+            continue
+        print('{:.2f}s {:<8} {}'.format(duration, phase, key))
+    if hidden:
+        print('({} durations < {}s hidden)'.format(hidden, threshold))
+
+
+def print_benchmarks(benchmarks, baseline=None):
+    """Print statistics of benchmarks by test key, and their change from the baseline if there is one."""
+    print_title('benchmarks')
+    columns = ('min', 'mean', 'median', 'stddev')
+    width = max(len(key) for key in benchmarks)
+    header = ' '.join('{:>10}'.format(c) for c in columns)
+    print('{:<{}} {}    rounds x iterations{}'.format('name', width, header, '  change' if baseline else ''))
+    for key in sorted(benchmarks):
+        stats = benchmarks[key]
+        line = '{:<{}} {}  {:>8} x {:<10}'.format(key, width, ' '.join('{:>10}'.format(format_time(stats[c])) for c in columns),
+                                                  stats['rounds'], stats['iterations'])
+        if baseline and baseline.get(key, dict()).get('median'):
+            line += ' {:+.1f}%'.format((stats['median'] - baseline[key]['median']) / baseline[key]['median'] * 100)
+        print(line.rstrip())
+
+
+def print_profile(report, top):
+    """Print the functions of tests with the most samples, and where the collapsed stacks were written."""
+    print_title('profile: {} samples every {}s'.format(report.count, report.interval))
+    if report.count:
+        print('{:>8} {:>8}  function'.format('own %', 'total %'))
+        for label, own, total in report.hot_functions(top):
+            print('{:>7.1f}% {:>7.1f}%  {}'.format(100.0 * own / report.count, 100.0 * total / report.count, label))
+    print('collapsed stacks written to {}'.format(report.directory))
+
+
+def print_memory(tests, modules, session, top):
+    """Print the tests and test modules which retained the most memory, and what the whole session retained."""
+    print_title('memory: largest retained growth')
+    for title, growths in (('tests', tests), ('test modules', modules)):
+        print('{} of {}:'.format(top, title) if top else '{}:'.format(title))
+        keys = sorted(growths, key=lambda key: retained(growths[key]), reverse=True)
+        for key in keys[:top or None]:
+            print('  {}: {}'.format(key, format_growth(growths[key])))
+    print('session: {}'.format(format_growth(session)))
+
+
 def load_fake_module(name, fake_types=None, stubs=None):
     module = types.ModuleType(name)
     types_dict = dict()
@@ -58,138 +296,847 @@ def load_fake_module(name, fake_types=None, stubs=None):
             types_dict[stub_key] = stub_type
     module.__dict__.update(types_dict)
     sys.modules[name] = module
+    parent, _, child = name.rpartition('.')
+    if parent in sys.modules:
+        setattr(sys.modules[parent], child, module)
+    FAKE_MODULES.append((name, fake_types, stubs))
 
 
-def build_kwargs(test_method_name, test_method, kwargs):
-    argument_names = test_method.__code__.co_varnames[0:test_method.__code__.co_argcount]
+# One invocation of a test: its id (if given with ``ids`` or ``param``), keyword arguments, parameters of indirect fixtures and marks
+ParametrizedCase = namedtuple('ParametrizedCase', ['id', 'kwargs', 'params', 'marks'])
 
-    # Inject fixture (recursively) if needed
-    for argkey in argument_names:
-        if argkey in kwargs:
-            continue
-        if argkey not in FIXTURES:
-            raise Exception('Test method "{}" needs argument "{}" but no fixture with that name'.format(test_method_name, argkey))
-        fixture_kwargs = dict()
-        build_kwargs(test_method_name, FIXTURES[argkey], fixture_kwargs)
-        kwargs[argkey] = FIXTURES[argkey](**fixture_kwargs)
 
+class _CaseMarks(object):
+    """Receives the attributes marks of a :func:`~pytest.param` set, as they would on a test function."""
 
-def run(test_dir, exclude_list=None, pattern='test_*.py', capture_stdout=True):
-    loaded_modules = list(sys.modules)
 
-    counter = 0
-    errors = 0
-    skips = 0
-    collected_errors = dict()
+def _parametrized_argnames(test_method):
+    """Names of the arguments parametrize passes to a test (i.e. not to its fixtures)."""
+    argnames = []
+    for layer in getattr(test_method, '_parametrize_layers', ()):
+        argnames.extend(name for name in layer['argnames'] if name not in layer['indirect'])
+    return argnames
 
-    start_time = time.time()
-    print_title('test session starts')
 
-    for test_module in discover_tests(test_dir, pattern):
-        if exclude_list:
-            test_module_replaced = test_module.replace('\\', '/')
-            if test_module_replaced in exclude_list:
-                print('Skipping {} module'.format(test_module_replaced))
-                continue
+def _layer_cases(layer):
+    argnames, argvalues, ids = layer['argnames'], layer['argvalues'], layer['ids']
+    if callable(argvalues):
+        argvalues = argvalues()
+    for index, value in enumerate(argvalues):
+        marks, case_id = (), None
+        if isinstance(value, ParameterSet):
+            marks, case_id = value.marks, value.id
+            value = value.values if len(argnames) > 1 else value.values[0]
+        if case_id is None and ids is not None:
+            case_id = ids(value) if callable(ids) else ids[index]
+        if len(argnames) == 1:
+            yield index + 1, case_id, {argnames[0]: value}, marks
+        else:
+            yield index + 1, case_id, dict(zip(argnames, value)), marks
+
+
+def _combinations(layers):
+    # Like itertools.product, without materializing the values of every layer up front
+    if not layers:
+        yield ()
+        return
+    for case in _layer_cases(layers[0]):
+        for others in _combinations(layers[1:]):
+            yield (case,) + others
+
+
+def parametrized_cases(test_method):
+    """Lazily build the :class:`ParametrizedCase` of every invocation of a test method."""
+    layers = getattr(test_method, '_parametrize_layers', None)
+    if not layers:
+        # Default invocation without arguments
+        yield ParametrizedCase(None, dict(), dict(), dict())
+        return
+
+    for combination in _combinations(layers):
+        kwargs, params, case_marks = dict(), dict(), None
+        for layer, (_, _, values, marks) in zip(layers, combination):
+            for name, value in values.items():
+                if name in layer['indirect']:
+                    params[name] = value
+                else:
+                    kwargs[name] = value
+            if marks:
+                case_marks = case_marks or _CaseMarks()
+                for mark in marks:
+                    if isinstance(mark, MarkDecorator):
+                        # Called with the marks object, a custom mark would take it for its arguments
+                        mark.apply(case_marks)
+                    else:
+                        mark(case_marks)
+
+        case_id = None
+        if any(case[1] is not None for case in combination):
+            case_id = '-'.join(str(case[1]) if case[1] is not None else str(case[0]) for case in combination)
+        yield ParametrizedCase(case_id, kwargs, params, vars(case_marks) if case_marks else dict())
+
+
+def _matches_any(name, patterns):
+    """Check a module name against package names (matching their submodules too) or fnmatch patterns."""
+    for pattern in patterns:
+        if name == pattern or name.startswith(pattern + '.') or fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+class ModuleRetention(object):
+    """Snapshot of ``sys.modules`` and the policy of which modules loaded since then are unloaded again.
+
+    By default every module loaded by a test module is unloaded after it ran. Modules matching
+    ``keep_modules`` (e.g. heavy third-party packages) stay loaded for the following test modules
+    instead. If ``isolate_modules`` is given, only the test module itself and modules matching
+    it (e.g. the package under test) are unloaded.
+    """
+
+    def __init__(self, keep_modules=None, isolate_modules=None):
+        self.loaded_modules = set(sys.modules)
+        self.retained_modules = set()
+        self.keep_modules = keep_modules or []
+        self.isolate_modules = isolate_modules or []
+
+    def should_unload(self, name):
+        if self.isolate_modules:
+            return _matches_any(name, self.isolate_modules)
+        return not _matches_any(name, self.keep_modules)
+
+    def unload(self, test_module_name):
+        """Remove modules loaded since the snapshot from ``sys.modules`` as per policy.
+
+        Returns the names of all modules loaded since the snapshot, i.e. the ones the test module
+        could use: those just unloaded, and those retained for this or an earlier test module.
+        Retained modules become part of the snapshot, so they are not checked again.
+        """
+        loaded_modules = []
+        for name in [m for m in sys.modules if m not in self.loaded_modules]:
+            if name == test_module_name or self.should_unload(name):
+                sys.modules.pop(name)
+            else:
+                self.loaded_modules.add(name)
+                self.retained_modules.add(name)
+            loaded_modules.append(name)
+        return loaded_modules + [name for name in self.retained_modules if name not in loaded_modules]
+
+
+def prune_results(values, completed_modules=(), reported_keys=()):
+    """Remove the values of tests which no longer exist from a dictionary by test key, and return it.
+
+    Tests of test modules which were deleted are removed, and so are tests of ``completed_modules``
+    (which ran all their tests) missing from ``reported_keys``.
+    """
+    completed_modules = set(completed_modules)
+    for key in list(values):
+        test_module = key.split('::')[0]
+        if test_module in completed_modules and key not in reported_keys or not os.path.exists(test_module):
+            del values[key]
+    return values
+
+
+def failed_selection(test_modules, lastfailed, last_failed=False, failed_first=False):
+    """Select the tests which failed in the last run with ``last_failed``, or run them first with ``failed_first``.
+
+    Returns the test modules to run, the keys of the tests to select (``None`` for all) and the keys of the
+    tests to run first. Without failures in the last run, all tests run in the usual order.
+    """
+    if not lastfailed or not (last_failed or failed_first):
+        return test_modules, None, None
+    failed_modules = set(key.split('::')[0] for key in lastfailed)
+    if last_failed:
+        return [test_module for test_module in test_modules if test_module in failed_modules], set(lastfailed), None
+    return sorted(test_modules, key=lambda test_module: test_module not in failed_modules), None, set(lastfailed)
+
+
+def _is_selected(key, select):
+    """Whether a test key is selected by a collection of keys, ``module::test`` names and modules."""
+    return select is None or key in select or key.split('[')[0] in select or key.split('::')[0] in select
+
+
+def _mark_names(test_method, case):
+    """Names of the marks of a test function and of one of its parametrized cases, as matched by ``-k`` and ``-m``."""
+    names = set(getattr(test_method, '_marks', ()))
+    names.update(case.marks.get('_marks', ()))
+    for name, attribute in (('skip', '_skip'), ('timeout', '_timeout'), ('parametrize', '_parametrize_layers')):
+        if hasattr(test_method, attribute) or attribute in case.marks:
+            names.add(name)
+    return names
+
+
+def _methods_of(keys, test_module):
+    """Names of the test methods of a module which appear in a collection of test keys."""
+    prefix = '{}::'.format(test_module)
+    return set(key[len(prefix):].split('[')[0] for key in keys if key.startswith(prefix))
+
+
+def collect_test_module(test_module, module_index, retention, selection=None):
+    """Import a test module and yield the keys of its tests (i.e. of every parametrized case) without running them.
+
+    If a ``selection`` function of :func:`~pytest.collection.compile_selection` is given, only the keys of the
+    cases it selects by their marks are yielded.
+    """
+    module_name = '{}_{}'.format(test_module, module_index)
+    try:
+        module = load_module(module_name, test_module)
+        for test_method_name in sorted(fname for fname in dir(module) if fname.startswith('test_')):
+            test_method = getattr(module, test_method_name)
+            for parametrize_counter, case in enumerate(parametrized_cases(test_method), 1):
+                if selection and not selection(test_module, test_method_name, _mark_names(test_method, case)):
+                    continue
+                yield '{}::{}[{}]'.format(test_module, test_method_name, case.id or parametrize_counter)
+    finally:
+        retention.unload(module_name)
+
+
+def run_test_module(test_module, module_index, retention, capture_mode='sys', select=None, first=None, dependencies=None,
+                    import_durations=None, capture_limit=CAPTURE_LIMIT, watchdog=None, seed=None, profiler=None,
+                    memtracker=None, selection=None):
+    """Import a test module, run its tests and unload what it imported as per the :class:`ModuleRetention` policy.
+
+    Yields one result dictionary per test invocation (i.e. per parametrized case).
+    If ``select`` is given, only tests whose key is in it are run (all of them if
+    the module key itself is in it). Tests whose key is in ``first`` run first.
+    If a ``selection`` function of :func:`~pytest.collection.compile_selection` is
+    given, only the cases it selects by their marks (and the ones of their test) run.
+    If a ``dependencies`` dictionary is given, the source files the test module
+    depends on are recorded in it, and if an ``import_durations`` dictionary is
+    given, the time it took to import the test module.
+
+    Besides the total ``duration``, results hold the ``durations`` of the
+    ``setup`` (fixtures), ``call`` and ``teardown`` phases of the test.
+
+    Tests run in random order, reproducible if a ``seed`` is given: the order of the tests
+    of a module only depends on the seed and the module path.
+
+    If a :class:`~pytest.profiling.SamplingProfiler` is given, the stacks it sampled
+    during setup, call and teardown of a test are added to its result as ``profile``.
+
+    If a :class:`~pytest.memtrack.MemoryTracker` is given, what a test retained is added
+    to its result as ``memory``, and what the whole module retained to ``memtracker.modules``.
+
+    If a :class:`~pytest.timeout.Watchdog` is given, tests running longer than its
+    timeout (or the one of their ``timeout`` mark) are interrupted and fail with
+    ``timeout`` set in their result.
+    """
+    module_name = '{}_{}'.format(test_module, module_index)
+    module_memory = memtracker.snapshot() if memtracker else None
+    import_start = timer()
+    try:
+        try:
+            module = load_module(module_name, test_module)
+        except Exception:
+            # E.g. a syntax error, reported for the module as a whole so that --lf reruns all of it
+            yield error_result(test_module, test_module)
+            return
+        if import_durations is not None:
+            import_durations[test_module] = timer() - import_start
 
-        print(test_module, end=' ')
-        module = imp.load_source('{}_{}'.format(test_module, counter), test_module)
         test_methods = [fname for fname in dir(module) if fname.startswith('test_')]
-        random.shuffle(test_methods)
+        if seed is not None:
+            path = test_module if isinstance(test_module, bytes) else test_module.encode('utf-8')
+            random.Random(seed + (zlib.crc32(path) & 0xffffffff)).shuffle(test_methods)
+        else:
+            random.shuffle(test_methods)
+
+        if select is not None and test_module in select:
+            select = None
+        if select is not None:
+            selected_methods = _methods_of(select, test_module)
+            test_methods = [name for name in test_methods if name in selected_methods]
+        if first:
+            first_methods = _methods_of(first, test_module)
+            test_methods.sort(key=lambda name: name not in first_methods)
 
+        runtest_setup = PLUGINS.hooks['pytest_runtest_setup']
+        runtest_call = PLUGINS.hooks['pytest_runtest_call']
+        runtest_teardown = PLUGINS.hooks['pytest_runtest_teardown']
+
+        # Resolve fixtures of all tests up front, so that missing fixtures and cycles are reported at collection
+        lookup = fixture_lookup(test_module, module)
+        plans = dict()
+        collection_errors = dict()
         for test_method_name in test_methods:
             test_method = getattr(module, test_method_name)
+            try:
+                plans[test_method_name] = resolve_fixtures(test_method_name, test_method, lookup, _parametrized_argnames(test_method))
+            except Exception:
+                collection_errors[test_method_name] = (traceback.format_exc(), sys.exc_info()[1])
 
-            # Build argument sets
-            parametrized_arguments = []
-            if hasattr(test_method, '_parametrized_arguments'):
-                argnames = test_method._parametrized_arguments['argnames']
-                argnames = argnames.split(',') if isinstance(argnames, str) else argnames
-                for argvalues in test_method._parametrized_arguments['argvalues']:
-                    partial_args = dict()
-                    # Special handling for just one argument
-                    if len(argnames) == 1:
-                        partial_args[argnames[0]] = argvalues
-                    else:
-                        partial_args = {k: v for k, v in zip(argnames, argvalues)}
-                    parametrized_arguments.append(partial_args)
-            else:
-                # Default invocation without arguments
-                parametrized_arguments = [dict()]
+        for test_method_name in test_methods:
+            test_method = getattr(module, test_method_name)
+            plan = plans.get(test_method_name)
 
+            cases = parametrized_cases(test_method)
             parametrize_counter = 0
-            for kwargs in parametrized_arguments:
-                counter += 1
+            while True:
+                try:
+                    case = next(cases)
+                except StopIteration:
+                    break
+                except Exception:
+                    # E.g. argvalues which cannot be computed or fewer ids than values, reported for the test as a whole
+                    yield error_result(test_module, '{}::{}'.format(test_module, test_method_name), test_method_name)
+                    break
                 parametrize_counter += 1
 
+                key = '{}::{}[{}]'.format(test_module, test_method_name, case.id or parametrize_counter)
+                if not _is_selected(key, select):
+                    continue
+                if selection and not selection(test_module, test_method_name, _mark_names(test_method, case)):
+                    continue
+
                 # Invoke test
-                result = dict(test_module=test_module, test_method=test_method_name)
+                result = dict(test_module=test_module, test_method=test_method_name, key=key, durations=dict())
+                kwargs = case.kwargs
+                test_timeout = case.marks.get('_timeout', getattr(test_method, '_timeout', watchdog.timeout)) if watchdog else None
+                memory = memtracker.snapshot() if memtracker else None
+                start_time = timer()
+                if test_timeout:
+                    watchdog.arm(key, test_timeout)
 
-                with capture(capture_stdout) as out:
+                with capture(capture_mode, capture_limit) as out:
+                    result['out'] = out
+                    stack = None
                     try:
-                        if hasattr(test_method, '_skip') and test_method._skip:
-                            skips += 1
-                            result['result'] = 's'
-                        else:
-                            build_kwargs(test_method_name, test_method, kwargs)
-
-                            # Invoke test method
-                            test_method(**kwargs)
-
-                            # reset any patched attributes
-                            if "mocker" in kwargs:
-                                kwargs["mocker"].stop()
-
-                            result['result'] = '.'
-                    except:   # noqa: E722
-                        errors += 1
+                        try:
+                            if case.marks.get('_skip', getattr(test_method, '_skip', False)):
+                                result['result'] = 's'
+                            elif test_method_name in collection_errors:
+                                result['result'] = 'F'
+                                result['exception'], result['exception_message'] = collection_errors[test_method_name]
+                            else:
+                                phase_durations = result['durations']
+                                phase_start = timer()
+                                if profiler:
+                                    profiler.sample('setup')
+                                try:
+                                    if runtest_setup:
+                                        PLUGINS.call('pytest_runtest_setup', key=key)
+                                    build_kwargs(plan, kwargs, case.params)
+                                    phase_durations['setup'] = timer() - phase_start
+                                    phase_start = timer()
+                                    if profiler:
+                                        profiler.sample('call')
+                                    if runtest_call:
+                                        PLUGINS.call('pytest_runtest_call', key=key)
+
+                                    # Invoke test method
+                                    test_method(**kwargs)
+                                finally:
+                                    phase_durations['call' if 'setup' in phase_durations else 'setup'] = timer() - phase_start
+                                    phase_start = timer()
+                                    if profiler:
+                                        profiler.sample('teardown')
+                                    try:
+                                        try:
+                                            if runtest_teardown:
+                                                PLUGINS.call('pytest_runtest_teardown', key=key)
+                                        finally:
+                                            # Tear down function scoped fixtures (e.g. reset any patched attributes)
+                                            FIXTURE_SCOPES['function'].close()
+                                    finally:
+                                        phase_durations['teardown'] = timer() - phase_start
+
+                                result['result'] = '.'
+                        except:   # noqa: E722
+                            result['result'] = 'F'
+                            result['exception'] = traceback.format_exc()
+                            result['exception_message'] = sys.exc_info()[1]
+                            if isinstance(result['exception_message'], AssertionError):
+                                # Only failed asserts pay for their introspection, under the watchdog as it evaluates code again
+                                _explain_failure(result, sys.exc_info()[2])
+                        finally:
+                            stack = test_timeout and watchdog.disarm()
+                            if profiler:
+                                result['profile'] = profiler.collect()
+                        if stack and not isinstance(result.get('exception_message'), KeyboardInterrupt):
+                            # The test timed out just as it finished, let the interrupt on its way land here
+                            watchdog.wait_interrupt()
+                    except KeyboardInterrupt:
+                        stack = test_timeout and watchdog.disarm()
+                        if not stack:
+                            raise
+
+                    if stack:
                         result['result'] = 'F'
-                        result['exception'] = traceback.format_exc()
-                        result['exception_message'] = sys.exc_info()[1]
-                    finally:
-                        result['out'] = out
-
-                print(result['result'], end='')
-                if result['result'] == 'F':
-                    key = '{}::{}[{}]'.format(test_module, test_method_name, parametrize_counter)
-                    collected_errors[key] = result
-
-        # Unload modules loaded by the test
-        modules_loaded_by_test = [m for m in sys.modules if m not in loaded_modules]
-        for module_to_unload in modules_loaded_by_test:
-            sys.modules.pop(module_to_unload)
-
-        print()
-
-    end_time = time.time()
-
-    if errors > 0:
-        print()
-        print_title('FAILURES')
-        for key, result in collected_errors.items():
-            print_title(key, sep='_')
-            print(result['exception'])
-
-            if capture_stdout:
-                needs_title = True
-                for o in result['out']:
-                    if len(o):
-                        if needs_title:
-                            print_title('Captured stdout', sep='-')
-                            needs_title = False
-                        print(o)
-
-        print_title('short test summary info')
-        for key, result in collected_errors.items():
-            print('FAILED {} - {}'.format(key, result['exception_message']))
-
-    passes = counter - errors - skips
+                        result['timeout'] = True
+                        result['exception'], result['exception_message'] = _timeout_failure(test_timeout, stack)
+
+                result['duration'] = timer() - start_time
+                if memtracker:
+                    result['memory'] = memtracker.growth(memory, memtracker.snapshot())
+                if BENCHMARK_STATS:
+                    result['benchmark'] = BENCHMARK_STATS.pop()
+                yield result
+
+        try:
+            FIXTURE_SCOPES['module'].close()
+        except Exception:
+            # Reported for the module as a whole, so that --lf reruns all of it
+            yield error_result(test_module, test_module)
+    finally:
+        try:
+            # Only left to do if the session stopped early and closed this generator, errors then go to whoever closed it
+            FIXTURE_SCOPES['module'].close()
+        finally:
+            # Unload modules loaded by the test
+            modules = dict(sys.modules)
+            modules_loaded_by_test = retention.unload(module_name)
+            if dependencies is not None:
+                dependencies[test_module] = module_dependencies(test_module, modules_loaded_by_test, modules)
+            if memtracker:
+                del modules
+                memtracker.modules[test_module] = memtracker.growth(module_memory, memtracker.snapshot())
+
+
+def run(test_dir, exclude_list=None, pattern='test_*.py', capture_stdout=True, workers=0,
+        capture_mode='sys', capture_limit=CAPTURE_LIMIT,
+        last_failed=False, failed_first=False, cache_dir=CACHE_DIR, changed=False, norecursedirs=None, collect_only=False,
+        keep_modules=None, isolate_modules=None, durations=None, junitxml=None, jsonl=None, timeout=None, timeout_action='continue',
+        benchmark_json=None, benchmark_compare=None, benchmark_compare_threshold=10.0, seed=None, shard=None,
+        keyword=None, markexpr=None, profile=None, profile_interval=0.005, profile_top=20,
+        memtrack=None, plugins=None, verbosity=0, progress=False, maxfail=None):
+    """Discover and run tests, print a report and exit with the number of failures.
+
+    Parameters
+    ----------
+    test_dir : str
+        Directory or file to test.
+    exclude_list : list, optional
+        Test module paths (using forward slashes) to skip.
+    pattern : str, optional
+        Filename pattern of test modules.
+    capture_stdout : bool, optional
+        Capture output of tests and show it only for failures.
+        If ``False``, ``capture_mode`` is ignored and output is not captured.
+    capture_mode : str, optional
+        ``sys`` to capture output, ``tee-sys`` to capture it and also print it live, or ``no``.
+    capture_limit : int, optional
+        Bytes of captured output per stream shown for a failed test, split between head and tail.
+    workers : int, optional
+        Number of worker interpreters to distribute test modules to.
+        Defaults to ``0``, which runs all tests in the current process.
+    last_failed : bool, optional
+        Only run the tests that failed in the last run (or all of them if none failed).
+    failed_first : bool, optional
+        Run the tests that failed in the last run first, then all the others.
+    cache_dir : str, optional
+        Directory in which outcomes, durations and dependencies of tests are kept across runs.
+    changed : bool, optional
+        Only run the test modules which depend on files changed since they last ran.
+    norecursedirs : list, optional
+        Patterns of directory names not to search for tests, defaults to :data:`NORECURSEDIRS`.
+    collect_only : bool, optional
+        Only list the keys of the selected tests, without running them.
+    keep_modules : list, optional
+        Packages or patterns of module names that stay loaded once a test module imported them,
+        instead of being imported again by every test module.
+    isolate_modules : list, optional
+        Packages or patterns of module names to unload after each test module, all others stay loaded.
+    durations : int, optional
+        Show the given number of slowest setup, call, teardown and import durations (``0`` for all).
+    junitxml : str, optional
+        Path of a JUnit XML report, written as tests finish.
+    jsonl : str, optional
+        Path of a JSON Lines report (one record per test result), written as tests finish.
+    timeout : float, optional
+        Seconds after which a test is interrupted and fails, unless it has its own ``timeout`` mark.
+        A test which cannot be interrupted ends the session with the report of the tests run so far.
+    timeout_action : str, optional
+        ``continue`` with the next test after a timeout, or ``abort`` the session.
+    benchmark_json : str, optional
+        Path of a JSON file to save the statistics of ``benchmark`` fixtures to.
+    benchmark_compare : str, optional
+        Path of a JSON file saved with ``benchmark_json`` by an earlier run, to compare benchmarks with.
+    benchmark_compare_threshold : float, optional
+        Percentage by which the median time of a benchmark can exceed its baseline before its test fails.
+    seed : int, optional
+        Seed of the random order of tests, to reproduce the order of an earlier run (which prints its seed).
+    shard : str or tuple, optional
+        Only run the test modules of shard ``i/N`` (or ``(i, N)``), with shards balanced by cached durations.
+    keyword : str, optional
+        Only run tests whose name, module name or marks contain the names of this expression,
+        combined with ``and``, ``or``, ``not`` and parentheses, e.g. ``intersection and not slow``.
+    markexpr : str, optional
+        Only run tests with the marks of this expression, e.g. ``slow or network``.
+    profile : str, optional
+        Directory to write the stacks sampled during setup, call and teardown of every test to, as collapsed stacks.
+        On IronPython, stacks are only available with ``-X:Frames`` or ``-X:FullFrames``.
+    profile_interval : float, optional
+        Seconds between two samples of the stack of a test.
+    profile_top : int, optional
+        Number of functions with the most samples to show at the end of the session.
+    memtrack : int, optional
+        Track the objects and modules retained by every test and test module, and show the given number
+        of tests and modules which retained the most. The growth is also written to the ``jsonl`` report.
+    plugins : list, optional
+        Names of modules to import and register as plugins, see :mod:`pytest.hooks`.
+    verbosity : int, optional
+        ``-1`` to only show a character per test, ``0`` for a line per test module, ``1`` for a line per test.
+    progress : bool, optional
+        End lines with the percentage of test modules run so far.
+    maxfail : int, optional
+        Stop the session after this number of failed tests.
+    """
+    counts = dict(tests=0, failed=0, skipped=0)
+    collected_errors = dict()
+
+    if not capture_stdout:
+        capture_mode = 'no'
+
+    start_time = time.time()
+    print_title('test session starts')
+
+    cache = Cache(cache_dir)
+    if norecursedirs is None:
+        norecursedirs = NORECURSEDIRS
+
+    # Directory listings are only valid for the same pattern and pruned directories
+    collection_key = [pattern, sorted(norecursedirs)]
+    collection_cache = cache.get('cache/collection', {})
+    collection = collection_cache.get('directories', {}) if collection_cache.get('key') == collection_key else {}
+
+    test_modules = []
+    conftests = []
+    for test_module in discover_tests(test_dir, pattern, conftests, norecursedirs, collection):
+        if exclude_list:
+            test_module_replaced = test_module.replace('\\', '/')
+            if test_module_replaced in exclude_list:
+                print('Skipping {} module'.format(test_module_replaced))
+                continue
+        test_modules.append(test_module)
+
+    cache.set('cache/collection', dict(key=collection_key, directories=collection))
+
+    # Plugins and conftest.py files are loaded once for the whole session, before taking the snapshot of loaded modules
+    session_modules = set(sys.modules)
+    for plugin in plugins or []:
+        load_plugin(plugin)
+    for conftest in conftests:
+        load_conftest(conftest)
+    # What they imported is visible to every test module, so it is a dependency of all of them, like the conftest.py files
+    session_files = conftests + source_files([name for name in sys.modules if name not in session_modules], sys.modules)
+    for plugin_name, hook_name in PLUGINS.unsupported:
+        print('plugin {}: {} is not called, it takes arguments this runner does not provide'.format(plugin_name, hook_name))
+    PLUGINS.call('pytest_sessionstart', test_modules=test_modules)
+
+    lastfailed = prune_results(cache.get('cache/lastfailed', {}))
+    cached_durations = prune_results(cache.get('cache/durations', {}))
+
+    if seed is None:
+        seed = random.randint(0, 2 ** 31 - 1)
+    print('random seed: {}'.format(seed))
+
+    if shard:
+        shard_index, shard_count = parse_shard(shard)
+        shards, loads = assign_shards(test_modules, shard_count, cached_durations)
+        print('shard {}/{}: {} of {} test modules (estimated {:.2f}s of {:.2f}s)'.format(
+            shard_index, shard_count, len(shards[shard_index - 1]), len(test_modules), loads[shard_index - 1], sum(loads)))
+        test_modules = shards[shard_index - 1]
+
+    failed_modules = set(key.split('::')[0] for key in lastfailed)
+    dependency_index = cache.get('cache/dependencies', {})
+    dependencies = dict()
+    import_durations = dict()
+    timings = []
+
+    if changed:
+        # Modules that failed last time are rerun too, even if nothing they depend on changed
+        affected_modules = set(changed_modules(test_modules, dependency_index)) | failed_modules
+        print('changed: {} of {} test modules affected'.format(len(affected_modules & set(test_modules)), len(test_modules)))
+        test_modules = [test_module for test_module in test_modules if test_module in affected_modules]
+
+    if last_failed and lastfailed:
+        print('run-last-failure: rerun previous {} failure(s)'.format(len(lastfailed)))
+    test_modules, select, first = failed_selection(test_modules, lastfailed, last_failed, failed_first)
+
+    selection = None
+    if keyword or markexpr:
+        # Select tests from a static index of the test modules, so that only the modules with selected tests are imported
+        index = StaticIndex(cache.get('cache/static-index', {}))
+        test_modules, selected, deselected = select_tests(test_modules, index, keyword, markexpr)
+        cache.set('cache/static-index', index.entries)
+        print('deselected: {} test(s), {} test modules selected'.format(deselected, len(test_modules)))
+        select = selected if select is None else set(key for key in select if _is_selected(key, selected))
+        # Parametrized cases are selected by their own marks too, once their test module is imported
+        selection = compile_selection(keyword, markexpr)
+
+    PLUGINS.call('pytest_collection', test_modules=test_modules)
+
+    if collect_only:
+        retention = ModuleRetention(keep_modules, isolate_modules)
+        errors = 0
+
+        for module_index, test_module in enumerate(test_modules):
+            try:
+                for key in collect_test_module(test_module, module_index, retention, selection):
+                    if _is_selected(key, select):
+                        counts['tests'] += 1
+                        print(key)
+            except Exception:
+                # E.g. a syntax error, the other test modules are still collected
+                errors += 1
+                print('ERROR {} - {}'.format(test_module, sys.exc_info()[1]))
+
+        print_title('{} tests collected{} in {:.2f}s'.format(counts['tests'], ', {} errors'.format(errors) if errors else '', time.time() - start_time))
+        sys.exit(errors)
+
+    reporters = []
+    if junitxml:
+        reporters.append(JUnitXMLReporter(junitxml))
+    if jsonl:
+        reporters.append(JSONLinesReporter(jsonl))
+
+    profile_report = None
+    if profile:
+        if SamplingProfiler.is_supported():
+            profile_report = ProfileReport(profile, profile_interval)
+        else:
+            print('profile: stacks of threads are not available, run IronPython with -X:FullFrames')
+
+    memtracker = MemoryTracker() if memtrack is not None else None
+    tests_memory = dict()
+
+    baseline = load_baseline(benchmark_compare) if benchmark_compare else None
+    # Tests of the modules which ran all their tests, to forget the ones which no longer exist
+    reported_keys = set()
+    completed_modules = []
+    benchmarks = dict()
+
+    def add_result(result):
+        if 'benchmark' in result:
+            benchmarks[result['key']] = result['benchmark']
+            regression = compare(result['benchmark'], baseline.get(result['key']), benchmark_compare_threshold) if baseline else None
+            if regression and result['result'] == '.':
+                result.update(result='F', exception=regression, exception_message=regression)
+
+        PLUGINS.call('pytest_runtest_logreport', result=result)
+
+        if profile_report and 'profile' in result:
+            profile_report.add(result['key'], result.pop('profile'))
+
+        counts['tests'] += 1
+        if result['result'] == 's':
+            counts['skipped'] += 1
+        elif result['result'] == 'F':
+            counts['failed'] += 1
+            collected_errors[result['key']] = result
+
+        if 'memory' in result:
+            tests_memory[result['key']] = result['memory']
+
+        if result['result'] == 'F':
+            lastfailed[result['key']] = True
+        else:
+            lastfailed.pop(result['key'], None)
+        cached_durations[result['key']] = result.get('duration', 0.0)
+        reported_keys.add(result['key'])
+        for phase, duration in result.get('durations', {}).items():
+            timings.append((duration, phase, result['key']))
+        for reporter in reporters:
+            reporter.add(result)
+
+    def finish_session():
+        end_time = time.time()
+
+        for reporter in reporters:
+            reporter.close(end_time - start_time)
+
+        cache.set('cache/lastfailed', prune_results(lastfailed, completed_modules, reported_keys))
+        cache.set('cache/durations', prune_results(cached_durations, completed_modules, reported_keys))
+
+        # conftest.py files, plugins and what they imported are dependencies of every test module
+        shared_files = fingerprints(session_files)
+        for test_module, files in dependencies.items():
+            files.update(shared_files)
+            dependency_index[test_module] = files
+        cache.set('cache/dependencies', dependency_index)
+
+        if benchmark_json:
+            save_benchmarks(benchmark_json, benchmarks)
+
+        # The report is printed through the terminal, in as few writes as possible
+        with terminal.redirect():
+            print_report(collected_errors, capture_mode != 'no')
+
+            if durations is not None:
+                timings.extend((duration, 'import', test_module) for test_module, duration in import_durations.items())
+                print_durations(timings, durations)
+
+            if benchmarks:
+                print_benchmarks(benchmarks, baseline)
+
+            if profile_report:
+                profile_report.close()
+                print_profile(profile_report, profile_top)
+
+            if memtracker:
+                print_memory(tests_memory, memtracker.modules, memtracker.growth(session_memory, memtracker.snapshot()), memtrack)
+
+            PLUGINS.call('pytest_sessionfinish', exitstatus=counts['failed'], counts=counts)
+            print_summary(counts, end_time - start_time)
+        return counts['failed']
+
+    # Output of tests which is not captured has to show in order with their results
+    terminal = TerminalReporter(sys.stdout, verbosity, progress, len(test_modules), FLUSH_INTERVAL if capture_mode == 'sys' else 0)
+    session_streams = sys.stdout, sys.stderr
+
+    def on_hang(key, seconds, stack):
+        # The test could not be interrupted, report what we have and leave (its output is still being captured)
+        sys.stdout, sys.stderr = session_streams
+        terminal.line('Test {} did not stop after timing out, aborting'.format(key))
+        test_module, _, test_method_name = key.partition('::')
+        add_result(timeout_result(test_module, test_method_name.split('[')[0], key, seconds, stack))
+        failed = finish_session()
+        sys.stdout.flush()
+        os._exit(failed)
+
+    def add_teardown_failure(result):
+        add_result(result)
+        terminal.line('{} teardown FAILED'.format(result['key']))
+
+    session_memory = memtracker.snapshot() if memtracker else None
+
+    if workers > 0:
+        from .workers import run_parallel
+        module_results = run_parallel(test_modules, workers, conftests=conftests, capture_mode=capture_mode, capture_limit=capture_limit,
+                                      select=select, first=first, dependencies=dependencies, import_durations=import_durations,
+                                      keep_modules=keep_modules, isolate_modules=isolate_modules, timeout=timeout, seed=seed,
+                                      profile_interval=profile_interval if profile_report else None,
+                                      module_memory=memtracker.modules if memtracker else None, plugins=plugins,
+                                      keyword=keyword, markexpr=markexpr)
+    else:
+        retention = ModuleRetention(keep_modules, isolate_modules)
+        watchdog = Watchdog(timeout, on_hang)
+        profiler = SamplingProfiler(run_test_module.__code__, profile_interval) if profile_report else None
+
+        module_results = ((test_module, run_test_module(test_module, module_index, retention, capture_mode, select, first,
+                                                        dependencies, import_durations, capture_limit, watchdog, seed, profiler,
+                                                        memtracker, selection))
+                          for module_index, test_module in enumerate(test_modules))
+
+    stop = None
+    # Output outside of captures (e.g. of imports or module teardowns) goes through the terminal, in order with results
+    with terminal.redirect():
+        try:
+            for test_module, results in module_results:
+                if test_module is None:
+                    # Failed teardown of session scoped fixtures of a worker
+                    for result in results:
+                        add_teardown_failure(result)
+                    continue
+
+                terminal.module_start(test_module)
+
+                for result in results:
+                    add_result(result)
+                    terminal.test_result(result)
+
+                    if result.get('timeout') and timeout_action == 'abort':
+                        stop = 'Aborted after test {} timed out'.format(result['key'])
+                    elif maxfail and counts['failed'] >= maxfail:
+                        stop = 'Stopped after {} failure(s)'.format(counts['failed'])
+                    if stop:
+                        break
+
+                terminal.module_end()
+                if not stop and (select is None or test_module in select):
+                    completed_modules.append(test_module)
+                if stop:
+                    terminal.line(stop)
+                    if hasattr(results, 'close'):
+                        # Tear down the module scoped fixtures of the module and unload it
+                        try:
+                            results.close()
+                        except Exception:
+                            add_teardown_failure(error_result(test_module, test_module))
+                    module_results.close()
+                    break
+        finally:
+            try:
+                FIXTURE_SCOPES['session'].close()
+            except Exception:
+                add_teardown_failure(error_result('', 'session'))
+
+    terminal.session_end()
+    sys.exit(finish_session())
+
+
+def _explain_failure(result, tb):
+    explanation = explain_assertion(tb)
+    if explanation:
+        result['exception'] = '{}\n{}'.format(result['exception'], explanation)
+        if not result['exception_message'].args:
+            # Summarize bare asserts with their values, e.g. ``assert 6 == 7``, or their source
+            lines = explanation.splitlines()
+            result['exception_message'] = lines[1] if lines[1:2] and lines[1].startswith('assert ') else lines[0]
+
+
+def _timeout_failure(seconds, stack):
+    message = 'Timeout: test took longer than {}s'.format(seconds)
+    return '{}\n\nStack of the test when it timed out:\n{}'.format(message, stack), message
+
+
+def timeout_result(test_module, test_method_name, key, seconds, stack):
+    """Build the result of a test which timed out and could not be interrupted."""
+    exception, message = _timeout_failure(seconds, stack)
+    return dict(test_module=test_module, test_method=test_method_name, key=key, result='F', timeout=True,
+                exception=exception, exception_message=message, out=['', ''], duration=seconds, durations=dict())
+
+
+def exception_text(value):
+    """Message of an exception as ``str``, with the characters Python 2 cannot convert to it escaped."""
+    try:
+        return str(value)
+    except UnicodeError:
+        # E.g. ValueError(u'caf\xe9') on Python 2
+        return text_type(value).encode('ascii', 'backslashreplace')
+
+
+def error_result(test_module, key, test_method=''):
+    """Build the failed result of a module, a test or the session as a whole (e.g. of its import, the
+    expansion of its parameters or the teardown of its fixtures) from the exception being handled."""
+    return dict(test_module=test_module, test_method=test_method, key=key, result='F', exception=traceback.format_exc(),
+                exception_message=sys.exc_info()[1], out=['', ''], duration=0.0, durations=dict())
+
+
+def print_report(collected_errors, show_output=True):
+    """Print tracebacks (and captured output) of failed tests and the short summary of failures."""
+    if not collected_errors:
+        return
+
+    print()
+    print_title('FAILURES')
+    for key, result in collected_errors.items():
+        print_title(key, sep='_')
+        print(result['exception'])
+
+        if show_output:
+            needs_title = True
+            for o in result['out']:
+                if len(o):
+                    if needs_title:
+                        print_title('Captured stdout', sep='-')
+                        needs_title = False
+                    print(o)
+
+    print_title('short test summary info')
+    for key, result in collected_errors.items():
+        print('FAILED {} - {}'.format(key, exception_text(result['exception_message'])))
+
+
+def print_summary(counts, duration):
+    """Print the final line with the number of failed, passed and skipped tests."""
+    passes = counts['tests'] - counts['failed'] - counts['skipped']
     texts = []
-    if errors:
-        texts.append('{} failed'.format(errors))
+    if counts['failed']:
+        texts.append('{} failed'.format(counts['failed']))
     if passes:
         texts.append('{} passed'.format(passes))
-    if skips:
-        texts.append('{} skipped'.format(skips))
-    print_title('{} in {:.2f}s'.format(', '.join(texts), end_time - start_time))
-    sys.exit(errors)
+    if counts['skipped']:
+        texts.append('{} skipped'.format(counts['skipped']))
+    if not texts:
+        texts.append('no tests ran')
+    print_title('{} in {:.2f}s'.format(', '.join(texts), duration))
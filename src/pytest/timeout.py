@@ -0,0 +1,108 @@
+"""Watchdog interrupting tests which exceed their timeout."""
+from __future__ import print_function
+
+import sys
+import threading
+import time
+import traceback
+
+try:
+    from thread import get_ident
+    from thread import interrupt_main
+except ImportError:
+    from _thread import get_ident
+    from _thread import interrupt_main
+
+__all__ = []
+
+
+def format_stack(ident):
+    """Format the current stack of a thread."""
+    try:
+        frame = sys._current_frames().get(ident)
+    except AttributeError:
+        return 'Stack unavailable, run IronPython with -X:FullFrames to get it\n'
+    if frame is None:
+        return 'Stack unavailable\n'
+    return ''.join(traceback.format_stack(frame))
+
+
+class Watchdog(object):
+    """Interrupts the test running on the main thread when it exceeds its timeout.
+
+    A single daemon thread waits for the deadline of the armed test. When it passes,
+    the stack of the test is dumped and a ``KeyboardInterrupt`` is raised in the main
+    thread, which the runner reports as a timeout. If the test is stuck somewhere it
+    cannot be interrupted and still runs ``grace`` seconds later, ``on_hang`` is called
+    with the key, timeout and stack of the test, from the watchdog thread.
+    """
+
+    def __init__(self, timeout=None, on_hang=None, grace=5.0):
+        self.timeout = timeout
+        self.on_hang = on_hang
+        self.grace = grace
+        self.condition = threading.Condition()
+        self.thread = None
+        self.generation = 0
+        self.deadline = None
+        self.key = None
+        self.armed_timeout = None
+        self.ident = None
+        self.expired = None
+
+    def arm(self, key, timeout):
+        """Start the clock for a test running on the current thread."""
+        with self.condition:
+            self.generation += 1
+            self.key = key
+            self.armed_timeout = timeout
+            self.ident = get_ident()
+            self.expired = None
+            self.deadline = time.time() + timeout
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._watch)
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+
+    def disarm(self):
+        """Stop the clock, returns the stack dumped at timeout if the test timed out."""
+        with self.condition:
+            self.generation += 1
+            self.deadline = None
+            self.condition.notify()
+            return self.expired
+
+    def wait_interrupt(self, timeout=1.0):
+        """Wait for the ``KeyboardInterrupt`` sent to a test which timed out just as it finished.
+
+        The interrupt reaches the main thread a few instructions after it was sent, so the caller
+        waits for it where it catches it, rather than have it raised anywhere later on.
+        """
+        end = time.time() + timeout
+        while time.time() < end:
+            time.sleep(0.001)
+
+    def _watch(self):
+        with self.condition:
+            while True:
+                if self.deadline is None:
+                    self.condition.wait()
+                    continue
+
+                remaining = self.deadline - time.time()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+
+                self.deadline = None
+                self.expired = format_stack(self.ident)
+                generation = self.generation
+                interrupt_main()
+
+                # Give the test some time to react to the interrupt
+                end_of_grace = time.time() + self.grace
+                while self.generation == generation and time.time() < end_of_grace:
+                    self.condition.wait(end_of_grace - time.time())
+                if self.generation == generation and self.on_hang:
+                    self.on_hang(self.key, self.armed_timeout, self.expired)
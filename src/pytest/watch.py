@@ -0,0 +1,240 @@
+"""Keep a warm interpreter around and rerun tests on demand.
+
+IronPython startup plus importing heavy packages often costs more than the
+tests themselves. In watch mode one interpreter stays alive: third-party
+modules (whose source lives outside of the watched directories) are kept
+imported between sessions, while the user code is unloaded after every test
+module as usual. Sessions are triggered by file changes, or by a client
+connecting to a local socket.
+"""
+from __future__ import print_function
+
+import json
+import os
+import re
+import socket
+import sys
+import time
+import traceback
+
+from .cache import Cache
+from .test_runner import NORECURSEDIRS
+from .test_runner import discover_tests
+from .test_runner import run
+
+__all__ = ['watch', 'request_run']
+
+# Last line sent to clients, followed by the exit code of the session
+EXIT_MARKER = '#pytest-exit '
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _is_under(path, roots):
+    return any(path == root or path.startswith(os.path.join(root, '')) for root in roots)
+
+
+def _source_mtimes(roots):
+    """Modification times of all python files in the watched directories."""
+    mtimes = dict()
+    for root in roots:
+        for path in discover_tests(root, '*.py', norecursedirs=NORECURSEDIRS):
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+    return mtimes
+
+
+def module_name(path, search_paths):
+    """Find the importable name of a source file, based on the entries of ``sys.path``."""
+    root, ext = os.path.splitext(os.path.abspath(path))
+    if ext != '.py':
+        return None
+    entries = sorted(set(os.path.abspath(entry or '.') for entry in search_paths), key=len, reverse=True)
+    for entry in entries:
+        if root.startswith(os.path.join(entry, '')):
+            parts = os.path.relpath(root, entry).split(os.sep)
+            if parts[-1] == '__init__':
+                parts.pop()
+            if parts and all(_IDENTIFIER.match(part) for part in parts):
+                return '.'.join(parts)
+    return None
+
+
+def warm_up(cache_dir, roots):
+    """Import the third-party modules the test modules depend on, so later sessions keep them loaded.
+
+    Returns the names of the modules that were imported.
+    """
+    index = Cache(cache_dir).get('cache/dependencies', {})
+    paths = set(path for files in index.values() for path in files)
+
+    imported = []
+    for path in sorted(paths):
+        if _is_under(path, roots):
+            continue
+        name = module_name(path, sys.path)
+        if not name or name in sys.modules:
+            continue
+        try:
+            __import__(name)
+            imported.append(name)
+        except Exception:
+            # Modules that cannot be imported on their own are simply loaded by each session again
+            pass
+    return imported
+
+
+def _watched_roots(test_dir):
+    """The test directory and the current directory, where the user code lives."""
+    roots = [os.path.abspath(test_dir if os.path.isdir(test_dir) else os.path.dirname(test_dir) or '.'), os.getcwd()]
+    return [root for i, root in enumerate(roots) if root not in roots[:i]]
+
+
+def unload_user_modules(loaded_modules, roots):
+    """Unload the modules imported since the snapshot ``loaded_modules`` whose source is in the watched directories.
+
+    Test modules are unloaded by the session itself, but not conftest.py files, plugins and
+    what they imported. Modules from elsewhere stay loaded, like the ones :func:`warm_up` imports,
+    and so do the modules of this runner (e.g. when watching its own source).
+    Returns the names of the modules that were unloaded.
+    """
+    package = __name__.split('.')[0]
+    unloaded = []
+    for name in [name for name in sys.modules if name not in loaded_modules]:
+        if name == package or name.startswith(package + '.'):
+            continue
+        path = getattr(sys.modules[name], '__file__', None)
+        if path and _is_under(os.path.abspath(path), roots):
+            del sys.modules[name]
+            unloaded.append(name)
+    return unloaded
+
+
+def _session(test_dir, options, stdout=None, roots=None):
+    """Run a test session without leaving the interpreter, return its exit code."""
+    loaded_modules = set(sys.modules)
+    oldout = sys.stdout
+    if stdout is not None:
+        sys.stdout = stdout
+    try:
+        run(test_dir, **options)
+    except SystemExit as e:
+        return e.code
+    except Exception:
+        # Keep watching, the next change may fix it
+        traceback.print_exc(file=sys.stdout)
+        return 1
+    finally:
+        sys.stdout = oldout
+        # The next session imports the user code again, as it may have changed
+        unload_user_modules(loaded_modules, roots or _watched_roots(test_dir))
+    return 0
+
+
+def _serve(server, test_dir, options, roots):
+    """Handle one client request: run the requested tests and stream the output back."""
+    try:
+        connection, _ = server.accept()
+    except socket.timeout:
+        return False
+
+    try:
+        stream = connection.makefile('rw')
+        request = json.loads(stream.readline() or '{}')
+
+        requested_dir = request.get('test_dir') or test_dir
+        if os.path.isabs(requested_dir) and _is_under(requested_dir, [os.getcwd()]):
+            requested_dir = os.path.relpath(requested_dir)
+
+        session_options = dict(options)
+        for option in ('changed', 'last_failed', 'failed_first'):
+            if request.get(option):
+                session_options[option] = True
+
+        exit_code = _session(requested_dir, session_options, stream, roots)
+        stream.write('{}{}\n'.format(EXIT_MARKER, exit_code))
+        stream.flush()
+    finally:
+        connection.close()
+    return True
+
+
+def watch(test_dir, port=None, interval=1.0, **options):
+    """Run tests in a warm interpreter, again and again.
+
+    After a first full session, the test modules affected by changed files are
+    rerun whenever python files in the current or test directory change.
+
+    Parameters
+    ----------
+    test_dir : str
+        Directory or file to test.
+    port : int, optional
+        If given, also listen on this local port for :func:`request_run` clients.
+    interval : float, optional
+        Seconds between checks for changed files.
+    options : dict
+        Other options passed to :func:`pytest.run` for every session.
+    """
+    options['workers'] = 0
+    cache_dir = options.get('cache_dir') or Cache().cache_dir
+    roots = _watched_roots(test_dir)
+
+    server = None
+    if port:
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('127.0.0.1', port))
+        server.listen(1)
+        server.settimeout(interval)
+
+    _session(test_dir, options, roots=roots)
+    print('Warmed up {} modules'.format(len(warm_up(cache_dir, roots))))
+    mtimes = _source_mtimes(roots)
+
+    try:
+        while True:
+            print('Watching {} for changes{}, press Ctrl+C to stop'.format(
+                ', '.join(roots), ' and listening on port {}'.format(port) if server else ''))
+
+            triggered = False
+            while not triggered:
+                if server:
+                    triggered = _serve(server, test_dir, options, roots)
+                else:
+                    time.sleep(interval)
+
+                current_mtimes = _source_mtimes(roots)
+                if current_mtimes != mtimes:
+                    mtimes = current_mtimes
+                    if not triggered:
+                        _session(test_dir, dict(options, changed=True), roots=roots)
+                        triggered = True
+
+            warm_up(cache_dir, roots)
+    except KeyboardInterrupt:
+        print('Stopped watching')
+    finally:
+        if server:
+            server.close()
+
+
+def request_run(port, test_dir=None, changed=False, last_failed=False, failed_first=False):
+    """Ask a watching interpreter to run tests, print its output and return the exit code."""
+    connection = socket.create_connection(('127.0.0.1', port))
+    try:
+        stream = connection.makefile('rw')
+        request = dict(test_dir=os.path.abspath(test_dir) if test_dir else None,
+                       changed=changed, last_failed=last_failed, failed_first=failed_first)
+        stream.write(json.dumps(request) + '\n')
+        stream.flush()
+
+        for line in iter(stream.readline, ''):
+            if line.startswith(EXIT_MARKER):
+                return int(line[len(EXIT_MARKER):])
+            sys.stdout.write(line)
+    finally:
+        connection.close()
+    return 1
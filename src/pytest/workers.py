@@ -0,0 +1,350 @@
+"""Distribute test modules to a pool of worker interpreters.
+
+IronPython has no ``multiprocessing``, so every worker is a plain subprocess
+of the current interpreter. Workers read test modules from their ``stdin``,
+one JSON line at a time, and answer with one JSON line per test result on a
+private duplicate of their ``stdout``. The file descriptor 1 itself (and the
+.NET console, on IronPython) is pointed at ``stderr``, so that output which
+bypasses ``sys.stdout`` cannot corrupt the results.
+"""
+from __future__ import print_function
+
+import json
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import traceback
+
+from Queue import Queue
+
+from .collection import compile_selection
+from .fakes import FAKE_MANIFESTS
+from .fakes import load_fake_modules
+from .fixtures import FIXTURE_SCOPES
+from .fixtures import load_conftest
+from .hooks import load_plugin
+from .memtrack import MemoryTracker
+from .profiling import SamplingProfiler
+from .test_runner import CAPTURE_LIMIT
+from .test_runner import FAKE_MODULES
+from .test_runner import ModuleRetention
+from .test_runner import error_result
+from .test_runner import exception_text
+from .test_runner import load_fake_module
+from .test_runner import run_test_module
+from .test_runner import timeout_result
+from .timeout import Watchdog
+
+__all__ = ['run_parallel']
+
+WORKER_COMMAND = 'from pytest.workers import worker_main; worker_main()'
+
+
+def _worker_args():
+    args = [sys.executable]
+    if sys.platform == 'cli':
+        args.append('-X:Frames')
+    args.extend(['-c', WORKER_COMMAND])
+    return args
+
+
+def _worker_env():
+    env = dict(os.environ)
+    path = os.pathsep.join([os.getcwd()] + [p for p in sys.path if p])
+    env['PYTHONPATH'] = path
+    env['IRONPYTHONPATH'] = path
+    return env
+
+
+def _fake_modules():
+    fake_modules = []
+    for name, fake_types, stubs in FAKE_MODULES:
+        try:
+            stubs = pickle.dumps(stubs, 0) if stubs else None
+        except (pickle.PicklingError, TypeError, AttributeError):
+            raise ValueError('Stubs of fake module "{}" must be importable to be used with workers'.format(name))
+        fake_modules.append([name, fake_types, stubs])
+    return fake_modules
+
+
+def _serialize(result):
+    result = dict(result)
+    if 'exception_message' in result:
+        result['exception_message'] = exception_text(result['exception_message'])
+    if not isinstance(result['out'], list):
+        result['out'] = []
+    return json.dumps(dict(type='result', result=result))
+
+
+def _crash_result(test_module, exception, exception_message, key=None, test_method=''):
+    return dict(test_module=test_module, test_method=test_method, key=key or test_module, result='F',
+                exception=exception, exception_message=exception_message, out=[])
+
+
+class Worker(object):
+    """A worker interpreter and the thread feeding it test modules."""
+
+    def __init__(self, options, modules, results, dependencies=None, import_durations=None, module_memory=None):
+        self.options = options
+        self.modules = modules
+        self.results = results
+        self.dependencies = dependencies
+        self.import_durations = import_durations
+        self.module_memory = module_memory
+        self.process = None
+        self.thread = threading.Thread(target=self.loop)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+
+    def spawn(self):
+        self.process = subprocess.Popen(_worker_args(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=_worker_env())
+        self.send(self.options)
+
+    def send(self, message):
+        self.process.stdin.write(json.dumps(message) + '\n')
+        self.process.stdin.flush()
+
+    def kill(self):
+        process = self.process
+        if process and process.poll() is None:
+            process.kill()
+
+    def stop(self):
+        if self.process:
+            self.process.stdin.close()
+            # The worker reports a failed teardown of its session scoped fixtures before it exits
+            results = []
+            for line in iter(self.process.stdout.readline, ''):
+                try:
+                    results.append(json.loads(line)['result'])
+                except (ValueError, KeyError, TypeError):
+                    message = 'Worker wrote an unexpected line while exiting: {!r}'.format(line[:200])
+                    results.append(_crash_result('', message, message))
+            if results:
+                self.results.put((None, results))
+            self.process.wait()
+            self.process = None
+
+    def loop(self):
+        try:
+            while True:
+                item = self.modules.get()
+                if item is None:
+                    break
+                module_index, test_module = item
+                try:
+                    module_results = self.run_module(module_index, test_module)
+                except Exception:
+                    # Never lose a module: report what went wrong and start a fresh worker for the next one
+                    module_results = [_crash_result(test_module, traceback.format_exc(), exception_text(sys.exc_info()[1]))]
+                    self.kill()
+                    self.process = None
+                self.results.put((test_module, module_results))
+        finally:
+            try:
+                self.stop()
+            finally:
+                self.results.put(None)
+
+    def run_module(self, module_index, test_module):
+        if not self.process:
+            self.spawn()
+        self.send(dict(module=test_module, index=module_index))
+
+        module_results = []
+        while True:
+            line = self.process.stdout.readline()
+            if not line:
+                # Worker died, report it (unless it exited on a hung test) and start a fresh one for the next module
+                self.process.wait()
+                if not (module_results and module_results[-1].get('timeout')):
+                    message = 'Worker crashed with exit code {} while running {}'.format(self.process.returncode, test_module)
+                    module_results.append(_crash_result(test_module, message, message))
+                self.process = None
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                message = 'Worker wrote an unexpected line while running {}: {!r}'.format(test_module, line[:200])
+                module_results.append(_crash_result(test_module, message, message))
+                continue
+            if record['type'] == 'done':
+                if self.dependencies is not None and record.get('dependencies') is not None:
+                    self.dependencies[test_module] = record['dependencies']
+                if self.import_durations is not None and record.get('import_duration') is not None:
+                    self.import_durations[test_module] = record['import_duration']
+                if self.module_memory is not None and record.get('memory') is not None:
+                    self.module_memory[test_module] = record['memory']
+                break
+            module_results.append(record['result'])
+        return module_results
+
+
+def run_parallel(test_modules, workers, conftests=None, capture_mode='sys', select=None, first=None, dependencies=None,
+                 import_durations=None, keep_modules=None, isolate_modules=None, capture_limit=CAPTURE_LIMIT, timeout=None, seed=None,
+                 profile_interval=None, module_memory=None, plugins=None, keyword=None, markexpr=None):
+    """Run test modules on a pool of worker interpreters.
+
+    Parameters
+    ----------
+    test_modules : list
+        Paths of the test modules to run.
+    workers : int
+        Number of worker interpreters.
+    conftests : list, optional
+        Paths of the conftest.py files each worker loads at start.
+    capture_mode : str, optional
+        How to capture output of tests: ``sys``, ``tee-sys`` or ``no``.
+    select : set, optional
+        Keys of the tests to run, all tests if not given.
+    first : set, optional
+        Keys of the tests to run first within their module.
+    dependencies : dict, optional
+        Filled with the source files each test module depends on, as recorded by the workers.
+    import_durations : dict, optional
+        Filled with the time it took the workers to import each test module.
+    keep_modules : list, optional
+        Packages or patterns of module names the workers keep loaded across test modules.
+    isolate_modules : list, optional
+        Packages or patterns of the only module names the workers unload after each test module.
+    capture_limit : int, optional
+        Bytes of captured output per stream kept for a test, split between head and tail.
+    timeout : float, optional
+        Seconds after which a test is interrupted. A worker stuck in a test which
+        cannot be interrupted reports it as timed out and is replaced.
+    seed : int, optional
+        Seed of the random order of tests within their module.
+    profile_interval : float, optional
+        Seconds between two samples of the stack of tests, which are not profiled if not given.
+    module_memory : dict, optional
+        If given, workers track the memory retained by tests (in their ``memory`` result) and fill
+        it with the memory retained by each test module.
+    plugins : list, optional
+        Names of modules each worker registers as plugins at start.
+    keyword : str, optional
+        ``-k`` expression the parametrized cases run by the workers are selected with, by their marks.
+    markexpr : str, optional
+        ``-m`` expression the parametrized cases run by the workers are selected with.
+
+    Yields
+    ------
+    tuple
+        Test module and the list of its results, in order of completion.
+    """
+    options = dict(capture_mode=capture_mode, capture_limit=capture_limit, conftests=conftests or [], fake_modules=_fake_modules(),
+                   fake_manifests=FAKE_MANIFESTS,
+                   select=sorted(select) if select is not None else None, first=sorted(first or []),
+                   keep_modules=keep_modules or [], isolate_modules=isolate_modules or [], timeout=timeout, seed=seed,
+                   profile_interval=profile_interval, memtrack=module_memory is not None,
+                   plugins=plugins or [], keyword=keyword, markexpr=markexpr)
+    modules = Queue()
+    results = Queue()
+
+    for item in enumerate(test_modules):
+        modules.put(item)
+
+    pool = [Worker(options, modules, results, dependencies, import_durations, module_memory) for _ in range(min(workers, len(test_modules)))]
+    for worker in pool:
+        modules.put(None)
+        worker.start()
+
+    running = len(pool)
+    try:
+        while running:
+            item = results.get()
+            if item is None:
+                running -= 1
+            else:
+                yield item
+    finally:
+        # Stop all workers if the session ends early (e.g. after a timeout)
+        if running:
+            while not modules.empty():
+                modules.get_nowait()
+            for worker in pool:
+                modules.put(None)
+                worker.kill()
+            for worker in pool:
+                worker.thread.join()
+
+
+def _result_channel():
+    """Move the real stdout of the worker to a private file for results, and point stdout at stderr."""
+    sys.stdout.flush()
+    sys.stdout = sys.stderr
+    try:
+        channel = os.fdopen(os.dup(1), 'w')
+        os.dup2(2, 1)
+    except (AttributeError, OSError, ValueError):
+        channel = sys.__stdout__
+    if sys.platform == 'cli':
+        import System
+        System.Console.SetOut(System.Console.Error)
+    return channel
+
+
+def worker_main():
+    """Entry point of worker interpreters."""
+    # Keep the channel for results only, anything written outside of captures goes to stderr
+    channel = _result_channel()
+
+    options = json.loads(sys.stdin.readline())
+    for name, fake_types, stubs in options['fake_modules']:
+        fake_types = [str(type_name) for type_name in fake_types] if fake_types else None
+        load_fake_module(str(name), fake_types, pickle.loads(str(stubs)) if stubs else None)
+    for manifest in options['fake_manifests']:
+        load_fake_modules(manifest)
+    for plugin in options['plugins']:
+        load_plugin(str(plugin))
+    for conftest in options['conftests']:
+        load_conftest(conftest)
+
+    retention = ModuleRetention([str(name) for name in options['keep_modules']], [str(name) for name in options['isolate_modules']])
+    select = set(options['select']) if options['select'] is not None else None
+    first = set(options['first'])
+
+    def on_hang(key, seconds, stack):
+        test_module, _, test_method_name = key.partition('::')
+        result = timeout_result(test_module, test_method_name.split('[')[0], key, seconds, stack)
+        channel.write(json.dumps(dict(type='result', result=result)) + '\n')
+        channel.flush()
+        os._exit(1)
+
+    watchdog = Watchdog(options['timeout'], on_hang)
+    profiler = SamplingProfiler(run_test_module.__code__, options['profile_interval']) if options['profile_interval'] else None
+    memtracker = MemoryTracker() if options['memtrack'] else None
+    selection = compile_selection(options['keyword'], options['markexpr']) if options['keyword'] or options['markexpr'] else None
+
+    for line in iter(sys.stdin.readline, ''):
+        message = json.loads(line)
+        test_module = message['module']
+        dependencies = dict()
+        import_durations = dict()
+        try:
+            for result in run_test_module(test_module, message['index'], retention, options['capture_mode'], select, first,
+                                          dependencies, import_durations, options['capture_limit'], watchdog, options['seed'],
+                                          profiler, memtracker, selection):
+                try:
+                    line = _serialize(result)
+                except Exception:
+                    # Only this result is lost, the other tests of the module still run
+                    line = _serialize(_crash_result(test_module, traceback.format_exc(), exception_text(sys.exc_info()[1]),
+                                                    result.get('key'), result.get('test_method', '')))
+                channel.write(line + '\n')
+        except Exception:
+            error = _crash_result(test_module, traceback.format_exc(), exception_text(sys.exc_info()[1]))
+            channel.write(json.dumps(dict(type='result', result=error)) + '\n')
+        done = dict(type='done', dependencies=dependencies.get(test_module), import_duration=import_durations.get(test_module),
+                    memory=memtracker.modules.pop(test_module, None) if memtracker else None)
+        channel.write(json.dumps(done) + '\n')
+        channel.flush()
+
+    try:
+        FIXTURE_SCOPES['session'].close()
+    except Exception:
+        channel.write(_serialize(error_result('', 'session')) + '\n')
+        channel.flush()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture
+def conftest_data():
+    return dict(name='conftest fixture')
+
+
+@pytest.fixture
+def overridden():
+    return 'conftest'
@@ -0,0 +1,67 @@
+import ast
+import sys
+
+from pytest.assertion import compare_values
+from pytest.assertion import explain_assertion
+from pytest.assertion import source
+
+
+def _explanation(func):
+    try:
+        func()
+    except AssertionError:
+        return explain_assertion(sys.exc_info()[2])
+
+
+def test_explain_comparison():
+    def failing():
+        items = [1, 2, 3]
+        expected = [1, 2, 4]
+        assert items[:2] + [3] == expected
+
+    assert _explanation(failing).splitlines() == [
+        'assert items[:2] + [3] == expected',
+        'assert [1, 2, 3] == [1, 2, 4]',
+        'At index 2: 3 != 4',
+        'where:',
+        '  items[:2] + [3] = [1, 2, 3]',
+        '  expected = [1, 2, 4]',
+        '  items[:2] = [1, 2]',
+        '  items = [1, 2, 3]',
+    ]
+
+
+def test_explain_side_effects():
+    def failing():
+        items = [1, 2]
+        assert items.pop() == 1
+
+    assert _explanation(failing).splitlines()[1] == 'items.pop() == 1 is true when evaluated again, its expressions may have side effects'
+
+
+def test_no_explanation_without_assert():
+    def failing():
+        raise AssertionError('explicit')
+
+    assert _explanation(failing) is None
+
+
+def test_compare_values():
+    assert compare_values(ast.Eq(), {'a': 1, 'b': 2}, {'a': 2, 'c': 3}) == [
+        'Differing items:', "  'a': 1 != 2", "Left contains 1 more item(s): {'b': 2}", "Right contains 1 more item(s): {'c': 3}"]
+    assert compare_values(ast.Eq(), set([1, 2]), set([2, 3])) == ['Extra items in the left set: [1]', 'Extra items in the right set: [3]']
+    assert compare_values(ast.Eq(), 'spam\neggs\n', 'spam\nham\n')[:3] == ['Diff:', '  spam', '- eggs']
+    assert compare_values(ast.Lt(), 2, 1) == []
+
+
+def test_source():
+    for expression in ('not all(x.y[0] > -1 for x in f(a, k=1)) or {1: [2, (3,)]}', '(a - (b - c)) * 2 ** d == (e < f)',
+                       '[v for v in values if v] and not (x or y)'):
+        assert source(ast.parse(expression, mode='eval').body) == expression
+
+
+def test_explain_literals():
+    def failing():
+        assert 1 == 2
+
+    assert _explanation(failing).splitlines() == ['assert 1 == 2']
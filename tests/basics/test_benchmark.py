@@ -0,0 +1,39 @@
+import pytest
+from pytest.benchmark import Benchmark
+from pytest.benchmark import compare
+from pytest.benchmark import compute_stats
+
+
+def test_benchmark_fixture(benchmark):
+    benchmark.max_time = 0.01
+    result = benchmark(sorted, [3, 1, 2])
+
+    assert result == [1, 2, 3]
+    assert benchmark.stats['rounds'] >= 5
+    assert benchmark.stats['min'] <= benchmark.stats['median'] <= benchmark.stats['max']
+
+
+def test_benchmark_measures_once():
+    benchmark = Benchmark()
+    benchmark.pedantic(sum, args=([1, 2],), rounds=3, iterations=2)
+
+    assert benchmark.stats['rounds'] == 3
+    assert benchmark.stats['iterations'] == 2
+    with pytest.raises(Exception):
+        benchmark.pedantic(sum, args=([1, 2],))
+
+
+def test_compute_stats():
+    stats = compute_stats([4.0, 2.0, 6.0, 8.0], 2)
+
+    assert stats['min'] == 1.0
+    assert stats['max'] == 4.0
+    assert stats['mean'] == 2.5
+    assert stats['median'] == 2.5
+    assert abs(stats['stddev'] - 1.291) < 0.001
+
+
+def test_compare():
+    assert compare(dict(median=1.05), dict(median=1.0), 10) is None
+    assert compare(dict(median=1.2), dict(median=1.0), 10).startswith('Benchmark regressed')
+    assert compare(dict(median=1.2), None, 10) is None
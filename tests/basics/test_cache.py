@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from pytest.cache import Cache
+from pytest.test_runner import failed_selection
+from pytest.test_runner import prune_results
+
+
+@pytest.fixture
+def directory():
+    directory = tempfile.mkdtemp()
+    yield directory
+    shutil.rmtree(directory)
+
+
+def test_get_and_set(directory):
+    cache = Cache(os.path.join(directory, '.pytest_cache'))
+    assert cache.get('cache/lastfailed') is None
+    assert cache.get('cache/lastfailed', {}) == {}
+
+    cache.set('cache/lastfailed', {'test_a.py::test_one[1]': True})
+    cache.set('cache/lastfailed', {'test_a.py::test_two[1]': True})
+
+    assert cache.get('cache/lastfailed') == {'test_a.py::test_two[1]': True}
+    assert os.path.exists(os.path.join(directory, '.pytest_cache', '.gitignore'))
+    assert os.listdir(os.path.join(directory, '.pytest_cache', 'v', 'cache')) == ['lastfailed']
+
+
+def test_unreadable_value_is_default(directory):
+    cache = Cache(directory)
+    cache.set('cache/durations', {})
+    with open(os.path.join(directory, 'v', 'cache', 'durations'), 'w') as f:
+        f.write('{"truncated": ')
+
+    assert cache.get('cache/durations', {}) == {}
+
+
+def test_last_failed_selection():
+    lastfailed = {'test_b.py::test_one[1]': True, 'test_c.py': True}
+    test_modules = ['test_a.py', 'test_b.py', 'test_c.py']
+
+    assert failed_selection(test_modules, lastfailed, last_failed=True) == (['test_b.py', 'test_c.py'], set(lastfailed), None)
+    assert failed_selection(test_modules, {}, last_failed=True) == (test_modules, None, None)
+
+
+def test_failed_first_order():
+    lastfailed = {'test_c.py::test_one[1]': True}
+    test_modules = ['test_a.py', 'test_b.py', 'test_c.py']
+
+    assert failed_selection(test_modules, lastfailed, failed_first=True) == (['test_c.py', 'test_a.py', 'test_b.py'], None, set(lastfailed))
+    assert failed_selection(test_modules, lastfailed) == (test_modules, None, None)
+
+
+def test_prune_results(directory):
+    test_a = os.path.join(directory, 'test_a.py')
+    test_b = os.path.join(directory, 'test_b.py')
+    for path in (test_a, test_b):
+        open(path, 'w').close()
+    values = {
+        test_a + '::test_one[1]': 1.0,
+        test_a + '::test_removed[1]': 1.0,
+        test_b + '::test_one[1]': 1.0,
+        os.path.join(directory, 'test_deleted.py') + '::test_one[1]': 1.0,
+    }
+
+    assert sorted(prune_results(dict(values))) == sorted(values)[:3]
+    assert sorted(prune_results(values, [test_a], set([test_a + '::test_one[1]']))) == [test_a + '::test_one[1]', test_b + '::test_one[1]']
@@ -0,0 +1,43 @@
+from StringIO import StringIO
+
+from pytest.test_runner import SpooledCapture
+from pytest.test_runner import capture
+
+
+def test_short_output_is_kept_whole():
+    stream = SpooledCapture()
+    stream.write('hello\n')
+    stream.writelines([u'caf\xe9\n', 'bye\n'])
+
+    assert stream.getvalue() == 'hello\ncaf\xc3\xa9\nbye\n'
+    assert stream.getvalue(limit=100) == stream.getvalue()
+
+
+def test_head_and_tail_of_long_output():
+    stream = SpooledCapture(max_memory=16)
+    for i in range(10):
+        stream.write('line {}\n'.format(i))
+
+    assert stream.size == 70
+    assert stream.getvalue(limit=14) == 'line 0\n\n... 56 bytes truncated ...\nline 9\n'
+    assert stream.file._rolled
+
+
+def test_tee_passes_output_on():
+    tee = StringIO()
+    stream = SpooledCapture(tee)
+    stream.write('live\n')
+    stream.flush()
+
+    assert tee.getvalue() == 'live\n'
+    assert stream.getvalue() == 'live\n'
+
+
+def test_capture_modes():
+    with capture('sys', limit=8) as out:
+        print('captured output')
+    assert out == ['capt\n... 8 bytes truncated ...\nput\n', '']
+
+    with capture('no') as out:
+        pass
+    assert out is not None
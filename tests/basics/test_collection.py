@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from pytest.collection import StaticIndex
+from pytest.collection import compile_expression
+from pytest.collection import compile_selection
+from pytest.collection import select_tests
+from pytest.test_runner import ModuleRetention
+from pytest.test_runner import collect_test_module
+
+MODULE = '''
+import pytest
+from helpers import test_imported
+
+
+@pytest.mark.slow
+def test_intersection():
+    pass
+
+
+@pytest.mark.parametrize('value', [1, 2])
+def test_union(value):
+    pass
+
+
+@pytest.skip
+def test_skipped():
+    pass
+
+
+def helper():
+    pass
+'''
+
+
+@pytest.mark.slow
+def test_custom_mark():
+    assert test_custom_mark._marks == dict(slow=())
+
+
+def test_expressions():
+    expression = compile_expression('intersection and not (slow or network)', '-k')
+
+    assert expression(lambda name: name == 'intersection')
+    assert not expression(lambda name: name in ('intersection', 'slow'))
+    with pytest.raises(ValueError):
+        compile_expression('intersection and', '-k')
+
+
+def test_select_tests():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'test_geometry.py')
+        with open(path, 'w') as f:
+            f.write(MODULE)
+        index = StaticIndex()
+
+        assert index.tests(path) == [['test_imported', [], []], ['test_intersection', ['slow'], []],
+                                     ['test_union', ['parametrize'], []], ['test_skipped', ['skip'], []]]
+        assert select_tests([path], index, keyword='inter or uni', markexpr='not slow') == ([path], set([path + '::test_union']), 3)
+        assert select_tests([path], index, keyword='geometry and not test_') == ([], set(), 4)
+        assert select_tests([path], index, markexpr='slow')[1] == set([path + '::test_intersection'])
+    finally:
+        shutil.rmtree(directory)
+
+
+PARAM_MARKS = '''
+import pytest
+
+
+@pytest.mark.parametrize('size', [1, pytest.param(4, marks=pytest.mark.slow, id='four')])
+def test_grid(size):
+    pass
+
+
+@pytest.mark.parametrize('size', [pytest.param(2, marks=[pytest.mark.network])])
+def test_remote(size):
+    pass
+
+
+def test_other():
+    pass
+'''
+
+
+def test_select_param_marks():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'test_sizes.py')
+        with open(path, 'w') as f:
+            f.write(PARAM_MARKS)
+        index = StaticIndex()
+
+        assert index.tests(path)[:2] == [['test_grid', ['parametrize'], ['slow']], ['test_remote', ['parametrize'], ['network']]]
+        assert select_tests([path], index, markexpr='slow')[1] == set([path + '::test_grid'])
+        assert select_tests([path], index, keyword='grid and not slow')[1] == set([path + '::test_grid'])
+
+        # Cases are selected by their own marks once the module is imported
+        for keyword, markexpr, keys in [(None, 'slow', ['test_grid[four]']), ('grid and not slow', None, ['test_grid[1]']),
+                                        (None, 'not network', ['test_grid[1]', 'test_grid[four]', 'test_other[1]'])]:
+            selection = compile_selection(keyword, markexpr)
+            collected = collect_test_module(path, 0, ModuleRetention(), selection)
+            assert [key.split('::')[1] for key in collected] == keys
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+
+from pytest.dependencies import changed_modules
+from pytest.dependencies import fingerprints
+from pytest.dependencies import has_changed
+from pytest.dependencies import module_dependencies
+
+
+def _write(path, text, mtime=None):
+    with open(path, 'w') as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_has_changed():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'helper.py')
+        _write(path, 'X = 1\n', 1000000000)
+        recorded = fingerprints([path])[path]
+        assert not has_changed(path, recorded)
+
+        # Touched but with the same content
+        _write(path, 'X = 1\n', 1000000100)
+        assert not has_changed(path, recorded)
+
+        _write(path, 'X = 2\n', 1000000200)
+        assert has_changed(path, recorded)
+
+        os.remove(path)
+        assert has_changed(path, recorded)
+        assert has_changed(path, None)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_changed_modules():
+    directory = tempfile.mkdtemp()
+    try:
+        paths = dict((name, os.path.join(directory, name)) for name in ('test_a.py', 'test_b.py', 'helper.py', 'conftest.py'))
+        for path in paths.values():
+            _write(path, '', 1000000000)
+
+        helper = type(os)('helper')
+        helper.__file__ = paths['helper.py'] + 'c'
+        index = {
+            paths['test_a.py']: module_dependencies(paths['test_a.py'], ['test_a', 'helper'], dict(helper=helper)),
+            paths['test_b.py']: module_dependencies(paths['test_b.py'], [], {}),
+        }
+        for files in index.values():
+            files.update(fingerprints([paths['conftest.py']]))
+        assert paths['helper.py'] in index[paths['test_a.py']]
+
+        test_modules = [paths['test_a.py'], paths['test_b.py'], os.path.join(directory, 'test_new.py')]
+        assert changed_modules(test_modules, index) == test_modules[2:]
+
+        _write(paths['helper.py'], 'X = 1\n', 1000000100)
+        assert changed_modules(test_modules, index) == [test_modules[0], test_modules[2]]
+
+        _write(paths['conftest.py'], 'import helper\n', 1000000100)
+        assert changed_modules(test_modules, index) == test_modules
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+from pytest.test_runner import discover_tests
+
+FILES = ['test_top.py', 'helper.py', 'conftest.py', 'pkg/test_one.py', 'pkg/conftest.py', 'pkg/sub/test_two.py',
+         'node_modules/test_vendored.py', '.hidden/test_hidden.py', 'build/test_built.py']
+
+
+@pytest.fixture
+def tree():
+    directory = tempfile.mkdtemp()
+    for name in FILES:
+        path = os.path.join(directory, *name.split('/'))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        open(path, 'w').close()
+    # Old enough for their listings to be cached
+    for root, dirnames, _ in os.walk(directory):
+        os.utime(root, (1000000000, 1000000000))
+    yield directory
+    shutil.rmtree(directory)
+
+
+def _relative(directory, paths):
+    return [os.path.relpath(path, directory).replace(os.sep, '/') for path in paths]
+
+
+def test_pruned_directories(tree):
+    conftests = []
+    test_modules = list(discover_tests(tree, 'test_*.py', conftests))
+
+    assert _relative(tree, test_modules) == ['test_top.py', 'pkg/test_one.py', 'pkg/sub/test_two.py']
+    assert _relative(tree, conftests)[-2:] == ['conftest.py', 'pkg/conftest.py']
+
+    # Given patterns replace the default ones
+    test_modules = list(discover_tests(tree, 'test_*.py', norecursedirs=['sub', '.*']))
+    assert _relative(tree, test_modules) == ['test_top.py', 'build/test_built.py', 'node_modules/test_vendored.py', 'pkg/test_one.py']
+
+
+def test_single_file(tree):
+    path = os.path.join(tree, 'pkg', 'test_one.py')
+    assert list(discover_tests(path, 'test_*.py')) == [path]
+
+
+def test_collection_cache(tree):
+    collection = dict()
+    list(discover_tests(tree, 'test_*.py', collection=collection))
+    assert sorted(_relative(tree, collection)) == ['.', 'pkg', 'pkg/sub']
+
+    # Cached listings are used as long as the directory is not modified
+    collection[os.path.join(tree, 'pkg')][2] = ['test_cached.py']
+    assert _relative(tree, discover_tests(tree, 'test_*.py', collection=collection)) == [
+        'test_top.py', 'pkg/test_cached.py', 'pkg/sub/test_two.py']
+
+    os.utime(os.path.join(tree, 'pkg'), (1000000100, 1000000100))
+    assert _relative(tree, discover_tests(tree, 'test_*.py', collection=collection)) == [
+        'test_top.py', 'pkg/test_one.py', 'pkg/sub/test_two.py']
+
+
+def test_recent_listings_are_not_cached(tree):
+    collection = dict()
+    os.utime(os.path.join(tree, 'pkg'), None)
+    list(discover_tests(tree, 'test_*.py', collection=collection))
+
+    assert sorted(_relative(tree, collection)) == ['.', 'pkg/sub']
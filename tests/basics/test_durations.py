@@ -0,0 +1,31 @@
+import sys
+
+from StringIO import StringIO
+
+from pytest.test_runner import print_durations
+
+TIMINGS = [(0.5, 'call', 'test_a.py::test_slow[1]'), (0.001, 'setup', 'test_a.py::test_slow[1]'),
+           (1.25, 'import', 'test_b.py'), (0.02, 'teardown', 'test_a.py::test_fast[1]')]
+
+
+def _printed(*args):
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        print_durations(*args)
+        return sys.stdout.getvalue().splitlines()[1:]
+    finally:
+        sys.stdout = stdout
+
+
+def test_slowest_first():
+    assert _printed(TIMINGS, 2) == ['1.25s import   test_b.py', '0.50s call     test_a.py::test_slow[1]']
+
+
+def test_short_durations_hidden():
+    assert _printed(TIMINGS, 0) == [
+        '1.25s import   test_b.py',
+        '0.50s call     test_a.py::test_slow[1]',
+        '0.02s teardown test_a.py::test_fast[1]',
+        '(1 durations < 0.005s hidden)',
+    ]
@@ -0,0 +1,93 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+from pytest.fakes import StubManifest
+
+STUB = '''
+import typing
+
+VERSION: str
+
+class Point3d:
+    X: float
+    def __init__(self, x: float, y: float,
+                 z: float) -> None: ...
+    def DistanceTo(self, other: Point3d) -> float: ...
+    @staticmethod
+    def Unset() -> Point3d: ...
+
+def Load(path: str) -> bool: ...
+'''
+
+
+def test_fake_modules_from_dict():
+    pytest.load_fake_modules({'FakeKernel.Geometry': {'types': {'Sphere': {'Volume': '(self) -> float', 'Radius': None}},
+                                                      'functions': ['Intersect']}})
+    import FakeKernel.Geometry
+    from FakeKernel.Geometry import Sphere
+
+    assert FakeKernel.Geometry.Sphere is Sphere
+    sphere = Sphere(1.0)
+    assert sphere.Radius is None
+    assert sphere.Volume() is None
+    assert Sphere.Volume.__doc__ == 'Volume(self) -> float'
+    assert FakeKernel.Geometry.Intersect(sphere, sphere) is None
+
+    with pytest.raises(AttributeError):
+        FakeKernel.Geometry.Cube
+
+
+def test_fake_modules_are_lazy():
+    pytest.load_fake_modules({'FakeLazy.Geometry': {'types': ['Sphere']}, 'FakeLazy.Display': {}})
+    import FakeLazy
+
+    assert 'FakeLazy.Geometry' not in sys.modules
+    assert 'Sphere' not in vars(FakeLazy.Geometry)
+    assert FakeLazy.Geometry.Sphere.__module__ == 'FakeLazy.Geometry'
+    assert 'FakeLazy.Display' not in sys.modules
+
+
+def test_fake_modules_from_stubs():
+    stubs = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(stubs, 'FakeStubs'))
+        with open(os.path.join(stubs, 'FakeStubs', 'Geometry.pyi'), 'w') as f:
+            f.write(STUB)
+        pytest.load_fake_modules(stubs)
+
+        from FakeStubs.Geometry import Load
+        from FakeStubs.Geometry import Point3d
+        point = Point3d(1, 2, 3)
+        assert point.X is None
+        assert point.DistanceTo(point) is None
+        assert Point3d.Unset() is None
+        assert Point3d.DistanceTo._fake_signature == '(self, other: Point3d) -> float'
+        assert Load._fake_signature == '(path: str) -> bool'
+
+        import FakeStubs.Geometry
+        assert FakeStubs.Geometry.VERSION is None
+    finally:
+        shutil.rmtree(stubs)
+
+
+def test_stub_directory_only_claims_stubs():
+    stubs = tempfile.mkdtemp()
+    try:
+        for directory in ('FakeTree/Display', 'FakeTree/Empty', 'json'):
+            os.makedirs(os.path.join(stubs, *directory.split('/')))
+        for path in ('FakeTree/Display/Color.pyi', 'FakeTree/Display/__init__.pyi', 'json/README.txt'):
+            with open(os.path.join(stubs, *path.split('/')), 'w') as f:
+                f.write('def Load(path: str) -> bool: ...\n')
+        manifest = StubManifest(stubs)
+        os.rename(os.path.join(stubs, 'FakeTree'), os.path.join(stubs, 'Moved'))
+
+        # Listed once, not looked up on every import
+        assert sorted(manifest.stubs) == ['FakeTree', 'FakeTree.Display', 'FakeTree.Display.Color']
+        assert manifest.source_file('FakeTree') is None
+        assert manifest.source_file('FakeTree.Display').endswith('__init__.pyi')
+        assert not manifest.has_module('FakeTree.Empty') and not manifest.has_module('json')
+    finally:
+        shutil.rmtree(stubs)
@@ -0,0 +1,129 @@
+import pytest
+from pytest.fixtures import resolve_fixtures
+
+MODULE_SETUPS = []
+SETUPS = []
+TEARDOWNS = []
+
+
+@pytest.fixture(scope='module')
+def module_data():
+    MODULE_SETUPS.append(1)
+    return dict(name='module fixture')
+
+
+def test_module_fixture(module_data):
+    assert module_data['name'] == 'module fixture'
+    assert len(MODULE_SETUPS) == 1
+
+
+def test_module_fixture_cached(module_data):
+    assert len(MODULE_SETUPS) == 1
+
+
+@pytest.fixture
+def resource():
+    SETUPS.append(1)
+    yield 'resource'
+    TEARDOWNS.append(1)
+
+
+def test_yield_fixture(resource):
+    assert resource == 'resource'
+    assert len(TEARDOWNS) == len(SETUPS) - 1
+
+
+def test_yield_fixture_torn_down(resource):
+    assert len(TEARDOWNS) == len(SETUPS) - 1
+
+
+@pytest.fixture
+def shared(resource):
+    return resource
+
+
+def test_function_fixture_shared_within_test(resource, shared):
+    assert shared is resource
+    assert len(SETUPS) - len(TEARDOWNS) == 1
+
+
+def test_unknown_scope():
+    with pytest.raises(ValueError):
+        pytest.fixture(scope='galaxy')
+
+
+def test_conftest_fixture(conftest_data):
+    assert conftest_data['name'] == 'conftest fixture'
+
+
+@pytest.fixture
+def overridden():
+    return 'module'
+
+
+def test_module_fixture_overrides_conftest(overridden):
+    assert overridden == 'module'
+
+
+def _resolve_error(test_method, fixtures):
+    try:
+        resolve_fixtures(test_method.__name__, test_method, [fixtures])
+    except Exception as e:
+        return str(e)
+    raise AssertionError('Fixtures of {} resolved'.format(test_method.__name__))
+
+
+def test_resolve_in_setup_order():
+    @pytest.fixture(scope='session')
+    def config():
+        pass
+
+    @pytest.fixture
+    def client(config, request):
+        pass
+
+    def test_a(client, config, value):
+        pass
+
+    plan = resolve_fixtures('test_a', test_a, [dict(config=config, client=client)], provided=('value',))
+
+    assert plan.argnames == ['client', 'config']
+    assert [(name, scope, argnames) for name, _, scope, argnames in plan.steps] == [
+        ('config', 'session', ()), ('client', 'function', ('config', 'request'))]
+
+
+def test_resolve_cycle():
+    def first(second):
+        pass
+
+    def second(first):
+        pass
+
+    def test_a(first):
+        pass
+
+    assert _resolve_error(test_a, dict(first=first, second=second)) == \
+        'Test method "test_a" has a fixture dependency cycle: first -> second -> first'
+
+
+def test_resolve_missing():
+    def test_a(missing):
+        pass
+
+    assert _resolve_error(test_a, {}) == 'Test method "test_a" needs argument "missing" but no fixture with that name'
+
+
+def test_resolve_scope_mismatch():
+    @pytest.fixture
+    def narrow():
+        pass
+
+    @pytest.fixture(scope='module')
+    def wide(narrow):
+        pass
+
+    def test_a(wide):
+        pass
+
+    assert _resolve_error(test_a, dict(narrow=narrow, wide=wide)) == \
+        'Test method "test_a" uses function scoped fixture "narrow" from a module scoped fixture'
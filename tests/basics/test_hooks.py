@@ -0,0 +1,48 @@
+from pytest.hooks import PluginManager
+
+
+class Recorder(object):
+    def __init__(self):
+        self.calls = []
+
+    def pytest_runtest_setup(self, key):
+        self.calls.append(key)
+
+    def pytest_sessionfinish(self, counts):
+        self.calls.append(counts['failed'])
+
+    def pytest_runtest_logreport(self, report):
+        self.calls.append(report)
+
+
+def test_implementations_get_the_arguments_they_declare():
+    manager = PluginManager()
+    recorder = Recorder()
+    manager.register(recorder, 'recorder')
+
+    manager.call('pytest_runtest_setup', key='test_a.py::test[1]')
+    manager.call('pytest_sessionfinish', exitstatus=1, counts=dict(failed=1))
+    manager.call('pytest_runtest_logreport', result=dict())
+
+    assert recorder.calls == ['test_a.py::test[1]', 1]
+    assert manager.unsupported == [('recorder', 'pytest_runtest_logreport')]
+
+
+def test_hooks_without_implementations_are_empty():
+    manager = PluginManager()
+    manager.register(object(), 'empty')
+
+    assert not manager.hooks['pytest_runtest_call']
+
+
+def test_register_replaces_plugin_of_same_name():
+    manager = PluginManager()
+    first, second = Recorder(), Recorder()
+    manager.register(first, 'conftest.py')
+    manager.register(second, 'conftest.py')
+    manager.call('pytest_runtest_setup', key='key')
+
+    assert first.calls == [] and second.calls == ['key']
+
+    manager.unregister('conftest.py')
+    assert manager.hooks['pytest_runtest_setup'] == []
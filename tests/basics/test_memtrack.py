@@ -0,0 +1,29 @@
+from pytest.memtrack import MemoryTracker
+from pytest.memtrack import format_growth
+from pytest.memtrack import retained
+
+
+class Leaked(object):
+    pass
+
+
+def test_growth_of_retained_objects():
+    tracker = MemoryTracker()
+    if not tracker.count_objects:
+        return
+
+    leaked = []
+    before = tracker.snapshot()
+    leaked.extend(Leaked() for _ in range(100))
+    growth = tracker.growth(before, tracker.snapshot())
+
+    assert growth['types']['Leaked'] == 100
+    assert growth['objects'] >= 100
+    assert growth['modules'] == 0
+
+
+def test_format_growth():
+    growth = dict(objects=120, types={'Mock': 40, 'dict': 60}, modules=2, bytes=None)
+
+    assert format_growth(growth) == '+120 objects (dict +60, Mock +40), +2 modules'
+    assert retained(growth) > retained(dict(objects=10, types={}, modules=5, bytes=None))
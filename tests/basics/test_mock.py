@@ -62,3 +62,118 @@ def test_assert_called_with_args_kwargs_not_matching(mocker):
 
     with pytest.raises(AssertionError):
         obj.assert_called_with(1, 2, 3)
+
+
+def test_side_effect_exception(mocker):
+    obj = mocker.Mock(side_effect=ValueError("boom"))
+
+    with pytest.raises(ValueError):
+        obj()
+    assert obj.call_count == 1
+
+
+def test_side_effect_iterable(mocker):
+    obj = mocker.Mock(side_effect=[1, 2])
+
+    assert obj() == 1
+    assert obj() == 2
+
+
+def test_call_args_list(mocker):
+    obj = mocker.Mock()
+    obj(1)
+    obj(2, key="value")
+
+    assert obj.call_args_list == [mocker.call(1), mocker.call(2, key="value")]
+    assert obj.call_args == mocker.call(2, key="value")
+    obj.assert_has_calls([mocker.call(1), mocker.call(2, key="value")])
+    obj.assert_has_calls([mocker.call(2, key="value"), mocker.call(1)], any_order=True)
+
+    with pytest.raises(AssertionError):
+        obj.assert_has_calls([mocker.call(2, key="value"), mocker.call(1)])
+
+
+def test_max_calls(mocker):
+    obj = mocker.Mock(max_calls=2)
+    for i in range(5):
+        obj(i)
+
+    assert obj.call_count == 5
+    assert obj.call_args_list == [mocker.call(3), mocker.call(4)]
+
+
+def test_reset_mock(mocker):
+    obj = mocker.Mock(return_value="hello")
+    obj()
+    obj.child()
+    obj.reset_mock()
+
+    obj.assert_not_called()
+    obj.child.assert_not_called()
+    assert obj() == "hello"
+
+
+def test_spec(mocker):
+    from Queue import Queue
+    obj = mocker.Mock(spec=Queue)
+
+    assert isinstance(obj, Queue)
+    assert isinstance(obj.qsize, mocker.Mock)
+    with pytest.raises(AttributeError):
+        obj.not_an_attribute
+
+
+def test_autospec(mocker):
+    from Queue import Queue
+    obj = mocker.create_autospec(Queue)
+
+    assert isinstance(obj.put, mocker.Mock)
+    with pytest.raises(AttributeError):
+        obj.qsize.not_an_attribute
+
+
+def test_patch_multiple_targets(mocker):
+    from Queue import Queue
+    qsize, empty = Queue.qsize, Queue.empty
+    mocker.patch("Queue.Queue.qsize", return_value=10)
+    mocker.patch.object(Queue, "empty", return_value=True)
+
+    q = Queue()
+    assert q.qsize() == 10
+    assert q.empty() is True
+
+    mocker.stop()
+    assert Queue.qsize == qsize
+    assert Queue.empty == empty
+
+
+def test_patch_dict(mocker):
+    values = dict(a=1)
+    mocker.patch.dict(values, b=2)
+    assert values == dict(a=1, b=2)
+
+    mocker.patch.stop()
+    assert values == dict(a=1)
+
+
+def test_patch_context_manager():
+    import os
+
+    from pytest.mock import patch
+
+    with patch("os.getcwd", return_value="here"):
+        assert os.getcwd() == "here"
+    assert os.getcwd() != "here"
+
+
+def test_patch_decorator(mocker):
+    import os
+
+    from pytest.mock import patch
+
+    @patch.object(os, "getcwd", return_value="here")
+    def check(value):
+        return os.getcwd() == value
+
+    assert check("here")
+    assert os.getcwd() != "here"
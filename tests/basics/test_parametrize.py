@@ -0,0 +1,64 @@
+import pytest
+from pytest.test_runner import parametrized_cases
+
+
+@pytest.mark.parametrize('value', [1, 2, 3])
+def test_single_argument(value):
+    assert value in (1, 2, 3)
+
+
+@pytest.mark.parametrize('a,b', [(1, 2), (2, 3)])
+def test_multiple_arguments(a, b):
+    assert b == a + 1
+
+
+@pytest.mark.parametrize('value', [1, pytest.param(2, marks=pytest.mark.skip)])
+def test_param_marks(value):
+    assert value == 1
+
+
+def grid():
+    for x in range(3):
+        yield x
+
+
+@pytest.mark.parametrize('x', grid)
+@pytest.mark.parametrize('y', range(2))
+def test_stacked_generator(x, y):
+    assert x in range(3) and y in range(2)
+
+
+@pytest.fixture
+def doubled(request):
+    return request.param * 2
+
+
+@pytest.mark.parametrize('doubled', [1, 2], indirect=True)
+def test_indirect(doubled):
+    assert doubled in (2, 4)
+
+
+def test_cases_are_lazy_and_ordered():
+    cases = parametrized_cases(test_stacked_generator)
+
+    assert not isinstance(cases, list)
+    assert [(case.kwargs['y'], case.kwargs['x']) for case in cases] == [(y, x) for y in range(2) for x in range(3)]
+
+
+def test_case_ids():
+    @pytest.mark.parametrize('value', [1, pytest.param(2, id='two')])
+    @pytest.mark.parametrize('name', ['a', 'b'], ids=lambda name: name.upper())
+    def check(name, value):
+        pass
+
+    assert [case.id for case in parametrized_cases(check)] == ['A-1', 'A-two', 'B-1', 'B-two']
+    assert [case.id for case in parametrized_cases(test_single_argument)] == [None, None, None]
+    assert [case.params for case in parametrized_cases(test_indirect)] == [dict(doubled=1), dict(doubled=2)]
+
+
+def test_param_custom_marks():
+    @pytest.mark.parametrize('value', [1, pytest.param(2, marks=[pytest.mark.slow, pytest.mark.platform('cli')])])
+    def check(value):
+        pass
+
+    assert [case.marks for case in parametrized_cases(check)] == [dict(), dict(_marks=dict(slow=(), platform=('cli',)))]
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import time
+
+from pytest.profiling import ProfileReport
+from pytest.profiling import SamplingProfiler
+
+
+def _busy(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+def _profiled(profiler):
+    profiler.sample('call')
+    _busy(0.05)
+    return profiler.collect()
+
+
+def test_sampled_stacks_start_below_root():
+    if not SamplingProfiler.is_supported():
+        return
+    profiler = SamplingProfiler(_profiled.__code__, interval=0.001)
+    samples = _profiled(profiler)
+
+    assert all(stack.startswith('call;') for stack in samples)
+    assert max(samples, key=samples.get).startswith('call;_busy (test_profiling.py:')
+    assert profiler.collect() == dict()
+
+
+def test_profile_report():
+    directory = tempfile.mkdtemp()
+    try:
+        report = ProfileReport(directory, 0.005)
+        report.add('tests/test_a.py::test[1]', {'call;test (test_a.py:1);slow (test_a.py:5)': 3, 'call;test (test_a.py:1)': 1})
+        report.add('tests/test_a.py::empty[1]', dict())
+        report.close()
+
+        assert sorted(os.listdir(directory)) == ['all.collapsed', 'tests_test_a.py_test[1].collapsed']
+        with open(os.path.join(directory, 'all.collapsed')) as f:
+            assert f.read().splitlines() == ['tests/test_a.py::test[1];call;test (test_a.py:1) 1',
+                                             'tests/test_a.py::test[1];call;test (test_a.py:1);slow (test_a.py:5) 3']
+        assert report.count == 4
+        assert report.hot_functions(1) == [('slow (test_a.py:5)', 3, 3)]
+        assert report.hot_functions(5)[1] == ('test (test_a.py:1)', 1, 4)
+    finally:
+        shutil.rmtree(directory)
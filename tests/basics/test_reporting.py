@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+
+import pytest
+from pytest.reporting import JSONLinesReporter
+from pytest.reporting import JUnitXMLReporter
+
+RESULTS = [
+    dict(key='tests/test_a.py::test_pass[1]', test_module='tests/test_a.py', test_method='test_pass', result='.',
+         out=['', ''], duration=0.5, durations=dict(call=0.5)),
+    dict(key='tests/test_a.py::test_fail[1]', test_module='tests/test_a.py', test_method='test_fail', result='F',
+         exception='Traceback\nAssertionError: <1 & 2>', exception_message=AssertionError('<1 & 2>'),
+         out=[u'caf\xe9 \x1b[0m\n', 'error\n'], duration=0.25, durations=dict(call=0.25)),
+    dict(key='tests/test_b.py::test_skip[1]', test_module='tests/test_b.py', test_method='test_skip', result='s',
+         out=['', ''], duration=0.0, durations=dict()),
+]
+
+
+@pytest.fixture
+def directory():
+    directory = tempfile.mkdtemp()
+    yield directory
+    shutil.rmtree(directory)
+
+
+def test_junitxml_is_valid_after_every_flush(directory):
+    path = os.path.join(directory, 'reports', 'junit.xml')
+    reporter = JUnitXMLReporter(path, flush_count=1)
+    assert ET.parse(path).getroot().find('testsuite').get('tests') == '0'
+
+    for count, result in enumerate(RESULTS, 1):
+        reporter.add(result)
+        suite = ET.parse(path).getroot().find('testsuite')
+        assert suite.get('tests') == str(count)
+        assert len(suite.findall('testcase')) == count
+    reporter.close(1.5)
+
+    suite = ET.parse(path).getroot().find('testsuite')
+    assert (suite.get('tests'), suite.get('failures'), suite.get('skipped'), suite.get('time')) == ('3', '1', '1', '1.500')
+    passed, failed, skipped = suite.findall('testcase')
+    assert (passed.get('classname'), passed.get('name')) == ('tests.test_a', 'test_pass[1]')
+    assert failed.find('failure').get('message') == '<1 & 2>'
+    assert failed.find('system-out').text == u'caf\xe9 \ufffd[0m\n'
+    assert skipped.find('skipped') is not None
+
+
+def test_jsonl_is_valid_after_every_flush(directory):
+    path = os.path.join(directory, 'results.jsonl')
+    reporter = JSONLinesReporter(path, flush_count=1)
+
+    for count, result in enumerate(RESULTS, 1):
+        reporter.add(result)
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        assert [record['key'] for record in records] == [r['key'] for r in RESULTS[:count]]
+    reporter.close(1.5)
+
+    with open(path) as f:
+        passed, failed, skipped, session = [json.loads(line) for line in f]
+    assert (passed['outcome'], failed['outcome'], skipped['outcome']) == ('passed', 'failed', 'skipped')
+    assert 'stdout' not in passed
+    assert failed['message'] == '<1 & 2>' and failed['stdout'] == u'caf\xe9 \x1b[0m\n'
+    assert session == dict(type='session', duration=1.5)
+
+
+def test_unicode_messages(directory):
+    result = dict(RESULTS[1], exception_message=ValueError(u'caf\xe9'))
+    junit = JUnitXMLReporter(os.path.join(directory, 'junit.xml'))
+    junit.add(result)
+    junit.close(0.25)
+    jsonl = JSONLinesReporter(os.path.join(directory, 'results.jsonl'))
+    jsonl.add(result)
+    jsonl.close(0.25)
+
+    assert ET.parse(os.path.join(directory, 'junit.xml')).getroot().find('testsuite/testcase/failure').get('message') == u'caf\xe9'
+    with open(os.path.join(directory, 'results.jsonl')) as f:
+        assert json.loads(f.readline())['message'] == u'caf\xe9'
@@ -0,0 +1,49 @@
+import sys
+
+from pytest.test_runner import ModuleRetention
+
+
+def _load(*names):
+    for name in names:
+        sys.modules[name] = type(sys)(name)
+
+
+def test_should_unload():
+    retention = ModuleRetention(keep_modules=['numpy', 'vendor_*'])
+    assert retention.should_unload('mypackage.core')
+    assert not retention.should_unload('numpy')
+    assert not retention.should_unload('numpy.linalg')
+    assert retention.should_unload('numpyish')
+    assert not retention.should_unload('vendor_six')
+
+    retention = ModuleRetention(isolate_modules=['mypackage'])
+    assert retention.should_unload('mypackage')
+    assert retention.should_unload('mypackage.core')
+    assert not retention.should_unload('numpy')
+
+
+def test_unload_returns_retained_modules():
+    retention = ModuleRetention(keep_modules=['retention_kept'])
+    try:
+        _load('test_first_0', 'retention_helper', 'retention_kept')
+        loaded = retention.unload('test_first_0')
+        assert sorted(loaded) == ['retention_helper', 'retention_kept', 'test_first_0']
+        assert 'retention_helper' not in sys.modules and 'test_first_0' not in sys.modules
+        assert 'retention_kept' in sys.modules
+
+        # A later test module sees the kept module without importing it again
+        _load('test_second_1')
+        assert sorted(retention.unload('test_second_1')) == ['retention_kept', 'test_second_1']
+    finally:
+        sys.modules.pop('retention_kept', None)
+
+
+def test_unload_isolated_modules():
+    retention = ModuleRetention(isolate_modules=['retention_package'])
+    try:
+        _load('test_isolated_0', 'retention_package', 'retention_package.core', 'retention_other')
+        loaded = retention.unload('test_isolated_0')
+        assert sorted(loaded) == ['retention_other', 'retention_package', 'retention_package.core', 'test_isolated_0']
+        assert [name for name in loaded if name in sys.modules] == ['retention_other']
+    finally:
+        sys.modules.pop('retention_other', None)
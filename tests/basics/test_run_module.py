@@ -0,0 +1,193 @@
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from StringIO import StringIO
+
+import pytest
+from pytest.test_runner import ModuleRetention
+from pytest.test_runner import run
+from pytest.test_runner import run_test_module
+from pytest.timeout import Watchdog
+
+FAILING_TEARDOWN = '''
+import pytest
+
+
+@pytest.fixture(scope='module')
+def resource():
+    yield 1
+    raise ValueError('teardown of resource')
+
+
+def test_a(resource):
+    pass
+
+
+def test_b(resource):
+    pass
+'''
+
+
+@contextlib.contextmanager
+def _test_module(source):
+    # Not a fixture: running a module tears down the fixtures of the current scopes, i.e. of the running test
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'test_module.py')
+    with open(path, 'w') as f:
+        f.write(source)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_failed_module_teardown_is_reported():
+    with _test_module(FAILING_TEARDOWN) as path:
+        results = list(run_test_module(path, 0, ModuleRetention(), seed=0))
+
+        assert [result['result'] for result in results] == ['.', '.', 'F']
+        assert results[-1]['key'] == path
+        assert 'teardown of resource' in results[-1]['exception']
+        assert not any(name.startswith(path) for name in sys.modules)
+
+
+MODULE_TEARDOWN = '''
+import pytest
+
+TEARDOWNS = []
+
+
+@pytest.fixture(scope='module')
+def resource():
+    yield 1
+    TEARDOWNS.append('resource')
+
+
+def test_a(resource):
+    pass
+
+
+def test_b(resource):
+    pass
+'''
+
+
+def test_module_is_torn_down_when_closed_early():
+    with _test_module(MODULE_TEARDOWN) as path:
+        results = run_test_module(path, 0, ModuleRetention(), seed=0)
+        next(results)
+        module = [module for name, module in sys.modules.items() if name.startswith(path)][0]
+        results.close()
+
+        assert module.TEARDOWNS == ['resource']
+        assert not any(name.startswith(path) for name in sys.modules)
+
+
+def test_failed_teardown_is_raised_when_closed_early():
+    with _test_module(FAILING_TEARDOWN) as path:
+        results = run_test_module(path, 0, ModuleRetention(), seed=0)
+        next(results)
+        with pytest.raises(ValueError):
+            results.close()
+        assert not any(name.startswith(path) for name in sys.modules)
+
+
+def test_import_error_is_reported():
+    with _test_module('import os\n\n\ndef test_a(:\n    pass\n') as path:
+        [result] = list(run_test_module(path, 0, ModuleRetention(), seed=0))
+
+        assert result['result'] == 'F' and result['key'] == path
+        assert 'SyntaxError' in result['exception']
+
+
+def test_collect_only_reports_import_errors():
+    with _test_module('def test_a():\n    pass\n') as path:
+        directory = os.path.dirname(path)
+        with open(os.path.join(directory, 'test_bad.py'), 'w') as f:
+            f.write('def test_b(:\n    pass\n')
+
+        stdout = sys.stdout
+        sys.stdout = out = StringIO()
+        try:
+            run(directory, collect_only=True, cache_dir=os.path.join(directory, '.cache'), seed=0)
+        except SystemExit as e:
+            exit_code = e.code
+        finally:
+            sys.stdout = stdout
+
+        assert exit_code == 1
+        assert path + '::test_a[1]' in out.getvalue().splitlines()
+        assert 'ERROR {} - invalid syntax'.format(os.path.join(directory, 'test_bad.py')) in out.getvalue()
+        assert not any(name.startswith(directory) for name in sys.modules)
+
+
+FAILING_PARAMETERS = '''
+import pytest
+
+
+def values():
+    raise IOError('values.csv not found')
+
+
+@pytest.mark.parametrize('v', values)
+def test_computed(v):
+    pass
+
+
+@pytest.mark.parametrize('v', [1, 2, 3], ids=['one', 'two'])
+def test_missing_id(v):
+    pass
+
+
+def test_other():
+    pass
+'''
+
+
+def test_parameter_errors_are_reported():
+    with _test_module(FAILING_PARAMETERS) as path:
+        results = dict((result['key'], result) for result in run_test_module(path, 0, ModuleRetention(), seed=0))
+
+        assert sorted(key.split('::')[1] for key in results) == ['test_computed', 'test_missing_id', 'test_missing_id[one]',
+                                                                 'test_missing_id[two]', 'test_other[1]']
+        assert 'values.csv not found' in results[path + '::test_computed']['exception']
+        assert results[path + '::test_computed']['result'] == 'F'
+        assert 'IndexError' in results[path + '::test_missing_id']['exception']
+        assert results[path + '::test_other[1]']['result'] == '.'
+
+
+SLOW_EXPLANATION = '''
+import time
+
+import pytest
+
+CALLS = []
+
+
+def value():
+    CALLS.append(1)
+    if len(CALLS) > 1:
+        # Hangs when evaluated again to explain the assert
+        end = time.time() + 5
+        while time.time() < end:
+            pass
+    return 1
+
+
+@pytest.mark.timeout(0.2)
+def test_a():
+    assert value() == 2
+'''
+
+
+def test_explanation_runs_under_the_watchdog():
+    with _test_module(SLOW_EXPLANATION) as path:
+        start = time.time()
+        [result] = list(run_test_module(path, 0, ModuleRetention(), watchdog=Watchdog(), seed=0))
+
+        assert time.time() - start < 2
+        assert result['result'] == 'F' and result['timeout']
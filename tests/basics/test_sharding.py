@@ -0,0 +1,28 @@
+import pytest
+from pytest.sharding import assign_shards
+from pytest.sharding import parse_shard
+
+
+def test_parse_shard():
+    assert parse_shard('2/3') == (2, 3)
+    assert parse_shard((1, 1)) == (1, 1)
+
+    with pytest.raises(ValueError):
+        parse_shard('4/3')
+    with pytest.raises(ValueError):
+        parse_shard('first')
+
+
+def test_shards_are_balanced():
+    durations = {'a.py::test[1]': 8.0, 'b.py::test[1]': 5.0, 'b.py::other[1]': 2.0, 'c.py::test[1]': 4.0, 'd.py::test[1]': 3.0}
+    shards, loads = assign_shards(['a.py', 'b.py', 'c.py', 'd.py'], 2, durations)
+
+    assert shards == [['a.py', 'd.py'], ['b.py', 'c.py']]
+    assert loads == [11.0, 11.0]
+
+
+def test_modules_without_durations():
+    shards, loads = assign_shards(['a.py', 'b.py', 'c.py'], 2, {'a.py::test[1]': 4.0})
+
+    assert sorted(sum(shards, [])) == ['a.py', 'b.py', 'c.py']
+    assert loads == [8.0, 4.0]
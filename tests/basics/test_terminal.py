@@ -0,0 +1,67 @@
+from __future__ import print_function
+
+from pytest.terminal import TerminalReporter
+
+
+class Stream(object):
+    def __init__(self):
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        pass
+
+
+RESULTS = [dict(key='test_a.py::test_one[1]', result='.'), dict(key='test_a.py::test_two[1]', result='F')]
+
+
+def _report(verbosity, progress=False):
+    stream = Stream()
+    terminal = TerminalReporter(stream, verbosity, progress, modules=2, flush_interval=60)
+    for test_module in ('test_a.py', 'test_b.py'):
+        terminal.module_start(test_module)
+        for result in RESULTS:
+            terminal.test_result(result)
+        terminal.module_end()
+    terminal.session_end()
+    return stream.writes
+
+
+def test_output_is_buffered_until_next_module():
+    assert _report(0) == ['test_a.py ', '.F\ntest_b.py ', '.F\n']
+
+
+def test_quiet():
+    assert ''.join(_report(-1)) == '.F.F\n'
+
+
+def test_verbose_with_progress():
+    lines = ''.join(_report(1, progress=True)).splitlines()
+
+    assert lines[0] == 'test_a.py::test_one[1] PASSED'.ljust(74) + '[ 50%]'
+    assert lines[3] == 'test_a.py::test_two[1] FAILED'.ljust(74) + '[100%]'
+
+
+def test_redirect():
+    stream = Stream()
+    terminal = TerminalReporter(stream, flush_interval=60)
+    with terminal.redirect():
+        print('report')
+        print('summary')
+
+    assert stream.writes == ['report\nsummary\n']
+
+
+def test_redirect_keeps_order_with_results():
+    stream = Stream()
+    terminal = TerminalReporter(stream, flush_interval=60)
+    with terminal.redirect():
+        terminal.module_start('test_a.py')
+        terminal.test_result(RESULTS[0])
+        print('module teardown')
+        terminal.module_end()
+    terminal.session_end()
+
+    assert ''.join(stream.writes) == 'test_a.py .module teardown\n\n'
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from pytest.timeout import Watchdog
+from pytest.timeout import interrupt_main
+
+
+def _sleep(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        time.sleep(0.001)
+
+
+def test_disarmed_in_time():
+    watchdog = Watchdog(0.5)
+    watchdog.arm('test_a', 0.5)
+    assert watchdog.disarm() is None
+
+
+def test_interrupts_test_with_its_stack():
+    watchdog = Watchdog()
+    interrupted = False
+    try:
+        watchdog.arm('test_a', 0.05)
+        _sleep(2)
+    except KeyboardInterrupt:
+        interrupted = True
+    stack = watchdog.disarm()
+
+    assert interrupted
+    assert '_sleep' in stack
+
+
+def test_hang_is_reported_after_grace():
+    hangs = []
+    hung = threading.Event()
+
+    def on_hang(key, seconds, stack):
+        hangs.append((key, seconds))
+        hung.set()
+
+    watchdog = Watchdog(on_hang=on_hang, grace=0.05)
+    watchdog.arm('test_a', 0.05)
+    try:
+        _sleep(2)
+    except KeyboardInterrupt:
+        # A test ignoring the interrupt
+        hung.wait(2)
+    watchdog.disarm()
+
+    assert hangs == [('test_a', 0.05)]
+
+
+def test_late_interrupt_lands_in_wait_interrupt():
+    watchdog = Watchdog()
+    interrupted = False
+    try:
+        interrupt_main()
+        watchdog.wait_interrupt()
+    except KeyboardInterrupt:
+        interrupted = True
+    assert interrupted
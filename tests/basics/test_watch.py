@@ -0,0 +1,54 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from StringIO import StringIO
+
+import pytest
+from pytest import watch
+
+
+def test_session_survives_errors(mocker):
+    mocker.patch('pytest.watch.run', side_effect=ImportError('no module named helper'))
+    stdout = StringIO()
+
+    assert watch._session('tests', {}, stdout) == 1
+    assert 'ImportError: no module named helper' in stdout.getvalue()
+
+
+SESSIONS = '''
+import sys
+
+from pytest import watch
+
+options = dict(cache_dir='.cache', workers=0)
+first = watch._session('tests', options)
+with open('mypkg/__init__.py', 'w') as f:
+    f.write('VALUE = 2\\n')
+second = watch._session('tests', options)
+sys.exit(first * 10 + second)
+'''
+
+
+def test_sessions_reload_user_code():
+    directory = tempfile.mkdtemp()
+    try:
+        for name, source in [('mypkg/__init__.py', 'VALUE = 1\n'), ('tests/conftest.py', 'import mypkg\n'),
+                             ('tests/test_value.py', 'import mypkg\n\n\ndef test_value():\n    assert mypkg.VALUE == 2\n')]:
+            path = os.path.join(directory, *name.split('/'))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(source)
+
+        # In an interpreter of its own, as sessions tear down the fixtures and plugins of the running one
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(pytest.__file__))), PYTHONDONTWRITEBYTECODE='1')
+        process = subprocess.Popen([sys.executable, '-c', SESSIONS], cwd=directory, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+
+        # The first session fails, the second one passes with the edited package
+        assert process.returncode == 10, output
+    finally:
+        shutil.rmtree(directory)
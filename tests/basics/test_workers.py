@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+
+from Queue import Queue
+
+from pytest.workers import Worker
+from pytest.workers import run_parallel
+
+STRAY_OUTPUT = '''
+import os
+
+
+def test_stray_output():
+    os.write(1, b'not a result\\n')
+
+
+def test_fail():
+    assert 1 == 2
+'''
+
+NON_ASCII = '''
+# -*- coding: utf-8 -*-
+import sys
+
+
+def test_a():
+    pass
+
+
+def test_unicode_message():
+    raise ValueError(u'caf\\xe9')
+
+
+def test_undecodable_output():
+    sys.stdout.write(b'\\xff\\n')
+    assert 1 == 2
+
+
+def test_c():
+    pass
+'''
+
+
+class FakeProcess(object):
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.stdin = self
+        self.stdout = self
+        self.returncode = 1
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        pass
+
+    def readline(self):
+        line = self.lines.pop(0)
+        if isinstance(line, Exception):
+            raise line
+        return line
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        pass
+
+
+def test_output_bypassing_sys_stdout():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'test_stray.py')
+        with open(path, 'w') as f:
+            f.write(STRAY_OUTPUT)
+
+        [(test_module, results)] = list(run_parallel([path], 1))
+        outcomes = dict((result['test_method'], result['result']) for result in results)
+
+        assert test_module == path
+        assert outcomes == {'test_stray_output': '.', 'test_fail': 'F'}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_results_which_cannot_be_serialized():
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'test_non_ascii.py')
+        with open(path, 'w') as f:
+            f.write(NON_ASCII)
+
+        for seed in range(2, 6):
+            [(test_module, results)] = list(run_parallel([path], 1, seed=seed))
+            results = dict((result['test_method'], result) for result in results)
+
+            assert sorted(results) == ['test_a', 'test_c', 'test_undecodable_output', 'test_unicode_message']
+            assert results['test_unicode_message']['exception_message'] == 'caf\\xe9'
+            assert results['test_undecodable_output']['result'] == 'F'
+            assert results['test_c']['result'] == '.'
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_unexpected_lines_are_reported():
+    worker = Worker(dict(), Queue(), Queue())
+    worker.process = FakeProcess(['garbage\n', '{"type": "done"}\n'])
+
+    [result] = worker.run_module(0, 'test_a.py')
+
+    assert result['result'] == 'F'
+    assert 'garbage' in result['exception_message']
+
+
+def test_errors_of_the_worker_thread_are_reported():
+    modules = Queue()
+    results = Queue()
+    modules.put((0, 'test_a.py'))
+    modules.put(None)
+    worker = Worker(dict(), modules, results)
+    worker.process = FakeProcess([IOError('broken pipe')])
+    worker.loop()
+
+    test_module, [result] = results.get()
+    assert test_module == 'test_a.py'
+    assert result['result'] == 'F' and 'broken pipe' in result['exception']
+    assert results.get() is None